@@ -8,22 +8,56 @@
 import os
 import re
 import sys
+import time
+import hashlib
 import colorama
 import logging
 import yaml
+from io import BytesIO
+from copy import deepcopy
 from lxml import etree
 from jnpr.jsnapy.operator import Operator
 from jnpr.jsnapy.sqlite_get import SqliteExtractXml
-from icdiff import diff, codec_print, get_options, ConsoleDiff
 from jnpr.jsnapy.xml_comparator import XmlComparator
+from jnpr.jsnapy.snap_index import get_test_key, read_index, get_projection_keys
+from jnpr.jsnapy.sqlite_store import make_digest
+from jnpr.jsnapy.result_cache import ResultCache, get_result_key
+from jnpr.jsnapy.snap_layout import Manifest, get_shard_dir
 from jnpr.jsnapy import get_path
+from jnpr.jsnapy import setup_logging
 
 
 class Comparator:
 
-    def __init__(self):
+    def __init__(self, replies=None, test_callback=None, fleet_results=None):
+        """
+        :param replies: replies collected by --snapcheck, keyed by snap file
+                        name, these are tested without reading snap files
+        :param test_callback: function called with hostname, command/rpc,
+                              result and duration as soon as a test is done
+        :param fleet_results: result_cache.MemoryCache shared by all devices
+                              of the run, tests on snapshots identical to
+                              those of another device are not evaluated again
+        """
         self.logger_check = logging.getLogger(__name__)
+        self.test_callback = test_callback
         self.log_detail = {'hostname': None}
+        self.replies = replies if replies is not None else {}
+        # snap file -> (size, mtime, sha1), so every file is hashed only once
+        self.fingerprints = {}
+        # snapshots parsed for tests of one device, or of one iterate/item block
+        self.trees = None
+        # key of tests being run, their index of snap files is used if present
+        self.index_key = None
+        # results of tests on unchanged snapshots are taken from this cache
+        self.result_cache = None
+        self.fleet_results = fleet_results
+        # snap name -> sha1 of reply collected by --snapcheck
+        self.reply_fingerprints = {}
+        # shard directory -> snap_layout.Manifest, None if there is none
+        self.manifests = {}
+        # snap file of sharded layout -> (manifest, name in manifest)
+        self.manifest_files = {}
     
 
     def is_op(self, op):
@@ -55,21 +89,40 @@ class Comparator:
 
     def generate_snap_file(self, device, prefix, name, reply_format):
         """
-        This function generates name of snapshot files
+        This function generates name of snapshot files. Snap files of sharded
+        layout are looked up in manifest of their shard, others are in flat
+        layout, see snap_layout
         """
         if os.path.isfile(prefix):
             return prefix
         else:
             cmd_rpc_name = re.sub('/|\*|\.|-', '_', name)
-            sfile = str(device) + '_' + prefix + '_' + \
-                cmd_rpc_name + '.' + reply_format
-            snapfile = os.path.join(
-                get_path(
-                    'DEFAULT',
-                    'snapshot_path'),
-                sfile)
+            snapshot_path = get_path('DEFAULT', 'snapshot_path')
+            snap_name = cmd_rpc_name + '.' + reply_format
+            shard_dir = get_shard_dir(snapshot_path, device, prefix)
+            snapfile = os.path.join(shard_dir, snap_name)
+            # replies of --snapcheck are not written in manifest
+            if snapfile in self.replies:
+                return snapfile
+            manifest = self.get_manifest(snapshot_path, device, prefix)
+            if manifest is not None and manifest.get_file(snap_name) is not None:
+                self.manifest_files[snapfile] = (manifest, snap_name)
+                return snapfile
+            sfile = str(device) + '_' + prefix + '_' + snap_name
+            snapfile = os.path.join(snapshot_path, sfile)
             return snapfile
 
+    def get_manifest(self, snapshot_path, device, prefix):
+        """
+        Return manifest of snap files of device and tag, read once
+        :return: snap_layout.Manifest or None if snap files are not sharded
+        """
+        shard_dir = get_shard_dir(snapshot_path, device, prefix)
+        if shard_dir not in self.manifests:
+            manifest = Manifest(snapshot_path, device, prefix)
+            self.manifests[shard_dir] = manifest if manifest.files else None
+        return self.manifests[shard_dir]
+
 
     def get_err_mssg(self, path, ele_list):
         """
@@ -102,6 +155,102 @@ class Comparator:
         :param snap: snapfile
         :return: parsed snapshot
         """
+        if self.index_key is not None and db.get(
+                'check_from_sqlite') is not True and snap not in self.replies:
+            key = (snap, self.index_key)
+            if self.trees is not None and key in self.trees:
+                xml_value = self.trees[key]
+            else:
+                xml_value = self.read_index(snap)
+                if self.trees is not None:
+                    self.trees[key] = xml_value
+            if xml_value is not None:
+                return xml_value
+        if self.trees is not None and snap in self.trees:
+            xml_value = self.trees[snap]
+        else:
+            xml_value = self.parse_reply(db, snap)
+            if self.trees is not None and xml_value is not None:
+                self.trees[snap] = xml_value
+        return xml_value
+
+    def get_snap_projection(self, db, snap):
+        """
+        Return keys of tests for which snapshot is projected or filtered,
+        only its root element is read
+        :param db: database handler
+        :param snap: snapfile
+        :return: list of keys or None if snapshot holds full reply
+        """
+        if snap in self.replies:
+            reply = self.replies[snap]
+            return None if reply is True else get_projection_keys(reply)
+        if self.trees is not None and snap in self.trees:
+            return get_projection_keys(self.trees[snap])
+        if db.get('check_from_sqlite') is True:
+            if snap == str(None):
+                return None
+            source = BytesIO(snap.encode('utf-8') if isinstance(snap, unicode) else snap)
+        elif os.path.isfile(snap) and os.stat(snap).st_size > 0:
+            source = snap
+        else:
+            return None
+        for _, elem in etree.iterparse(source, events=('start',)):
+            return get_projection_keys(elem)
+        return None
+
+    def check_projection(self, db, snap):
+        """
+        Check that snapshot is not projected or filtered only for tests other
+        than those being run, as nodes read by these tests may be missing in
+        it, see snap_index
+        :param db: database handler
+        :param snap: snapfile
+        :return: False if tests can not be run on snapshot
+        """
+        if snap is None or self.index_key is None:
+            return True
+        try:
+            keys = self.get_snap_projection(db, snap)
+        except (IOError, OSError, TypeError, etree.LxmlError):
+            # unreadable snapshots are reported while running tests
+            return True
+        if keys is None or self.index_key in keys:
+            return True
+        self.logger_check.error(
+            colorama.Fore.RED +
+            "ERROR!! Snapshot %s holds only nodes read by other tests, take it again "
+            "to run these tests" % ("from database" if db.get('check_from_sqlite') is True else snap),
+            extra=self.log_detail)
+        return False
+
+    def read_index(self, snap):
+        """
+        Return index of snap file written at snap time for tests being run,
+        it holds only nodes these tests read, see snap_index
+        :param snap: snapfile
+        :return: parsed index or None if there is no index for these tests
+        """
+        try:
+            if not os.path.isfile(snap):
+                return None
+            xml_value = read_index(snap, self.get_fingerprint, self.index_key)
+        except (IOError, OSError):
+            return None
+        if xml_value is not None:
+            self.logger_check.debug(
+                colorama.Fore.BLUE +
+                "Using index of snapshot %s" % snap,
+                extra=self.log_detail)
+        return xml_value
+
+    def parse_reply(self, db, snap):
+        """
+        Parse snapshot, see get_xml_reply
+        :param db: name of database
+        :param snap: snapfile
+        :return: parsed snapshot
+        """
         if db.get('check_from_sqlite') is True:
             if snap != str(None):
                 xml_value = etree.fromstring(snap)
@@ -111,6 +260,19 @@ class Comparator:
                     "ERROR, Database for either pre or post snapshot is not present in given path !!",
                     extra=self.log_detail)
                 return
+        elif snap in self.replies:
+            xml_value = self.replies[snap]
+            if xml_value is True:
+                self.logger_check.error(
+                    colorama.Fore.RED +
+                    "ERROR, Snapshot file is empty !!",
+                    extra=self.log_detail)
+                return
+            # reply is part of rpc-reply document, so copy it to a document
+            # of its own, as if it was parsed from snap file
+            if not hasattr(xml_value, 'getroot'):
+                xml_value = etree.ElementTree(deepcopy(xml_value))
+                self.replies[snap] = xml_value
         elif os.path.isfile(snap) and os.stat(snap).st_size > 0:
             xml_value = etree.parse(snap)
         ##### sometimes snapshot files are empty, when cmd/rpc reply do not contain any value
@@ -129,6 +291,89 @@ class Comparator:
         return xml_value
 
 
+    def get_fingerprint(self, snap):
+        """
+        Return sha1 of snap file, taken from manifest of sharded layout or
+        read in chunks, and cached until its size or modification time changes
+        :param snap: snap file name
+        :return: hex digest
+        """
+        stat = os.stat(snap)
+        cached = self.fingerprints.get(snap)
+        if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime):
+            return cached[2]
+        if snap in self.manifest_files:
+            manifest, name = self.manifest_files[snap]
+            digest = manifest.get_digest(name, stat)
+            if digest is not None:
+                self.fingerprints[snap] = (stat.st_size, stat.st_mtime, digest)
+                return digest
+        sha = hashlib.sha1()
+        with open(snap, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                sha.update(chunk)
+        self.fingerprints[snap] = (stat.st_size, stat.st_mtime, sha.hexdigest())
+        return sha.hexdigest()
+
+    def is_unchanged(self, db, snap1, snap2):
+        """
+        Fast check whether pre and post snapshots have identical content,
+        without parsing them. Snap files taken with dedup are hard links to
+        same blob when their content is identical, otherwise sizes and then
+        hashes of files are compared.
+        :param db: database handler
+        :param snap1: pre snapshot file name or data from database
+        :param snap2: post snapshot file name or data from database
+        :return: True if both snapshots are known to be identical
+        """
+        if db.get('check_from_sqlite') is True:
+            return snap1 != str(None) and snap1 == snap2
+        try:
+            if os.path.samefile(snap1, snap2):
+                return True
+            if os.path.getsize(snap1) != os.path.getsize(snap2):
+                return False
+            return self.get_fingerprint(snap1) == self.get_fingerprint(snap2)
+        except (OSError, IOError, TypeError):
+            return False
+
+
+    def get_group_fields(self, testcases):
+        """
+        Return elements and messages of all elementary tests in given test
+        cases, including tests nested in and/or/not
+        :param testcases: test cases of iterate/item block
+        :return: tuple of list of elementary tests, elements and messages
+        """
+        tests = []
+        elements = []
+        messages = []
+        for elem in testcases:
+            if not isinstance(elem, dict):
+                continue
+            op_list = [k for k in elem.keys() if self.is_op(k)]
+            if op_list:
+                sub_expr = elem[op_list[0]]
+                if isinstance(sub_expr, list):
+                    sub_tests, sub_elements, sub_messages = self.get_group_fields(
+                        sub_expr)
+                    tests.extend(sub_tests)
+                    elements.extend(sub_elements)
+                    messages.extend(sub_messages)
+                continue
+            testop1 = [
+                tvalue for tvalue in elem.keys() if tvalue not in ['err', 'info']]
+            ele = elem.get(testop1[0]) if testop1 else None
+            if isinstance(ele, basestring):
+                ele_list = [name.strip() for name in ele.split(',')]
+            else:
+                ele_list = ['no node']
+            tests.append(elem)
+            elements.append(ele_list[0])
+            messages.append(self.get_err_mssg(elem, ele_list))
+            messages.append(self.get_info_mssg(elem, ele_list))
+        return tests, elements, messages
+
     def expression_evaluator(self, elem_test, op, x_path, id_list, iter, teston,
                                 check, db, snap1, snap2=None, action=None, top_ignore_null=None):
         """
@@ -174,8 +419,10 @@ class Comparator:
         if testop in [
                 'no-diff', 'list-not-less', 'list-not-more', 'delta']:
             if check is True or action is "check":
+                # identical snapshots are parsed once and passed as one tree
                 xml1 = self.get_xml_reply(db, snap1)
-                xml2 = self.get_xml_reply(db, snap2)
+                xml2 = xml1 if self.is_unchanged(
+                    db, snap1, snap2) else self.get_xml_reply(db, snap2)
                 if xml2 is None:
                     is_skipped = True
                 else:
@@ -203,7 +450,8 @@ class Comparator:
             # second snapshot file
             if check is True or action is "check":
                 pre_snap = self.get_xml_reply(db, snap1)
-                post_snap = self.get_xml_reply(db, snap2)
+                post_snap = pre_snap if self.is_unchanged(
+                    db, snap1, snap2) else self.get_xml_reply(db, snap2)
             else:
                 pre_snap = None
                 post_snap = self.get_xml_reply(db, snap1)
@@ -225,7 +473,7 @@ class Comparator:
                     post_snap,
                     ignore_null)
         if is_skipped:
-            op.test_details[teston].append({'result': None})
+            op.add_test_result(teston, {'result': None})
 
 
     def expression_builder(self, sub_expr, parent_op=None, **kwargs):
@@ -255,6 +503,11 @@ class Comparator:
                 if sub_expr_ret is None or sub_expr_ret == str(None):
                     continue
                 ret_expr.append(str(sub_expr_ret))
+                # top level tests are joined by 'and', so first failure decides
+                if parent_op is None and kwargs['op'].fail_fast and sub_expr_ret and eval(
+                        sub_expr_ret) is False:
+                    kwargs['op'].truncated = True
+                    break
             elif len(op_list) == 0:
                 #supposed to be the elementary operation
                 self.expression_evaluator(elem,**kwargs)
@@ -282,6 +535,9 @@ class Comparator:
                     break
                 if res is False and parent_op and parent_op.lower() == 'and':
                     break
+                if res is False and parent_op is None and kwargs['op'].fail_fast:
+                    kwargs['op'].truncated = True
+                    break
             else:
                 self.logger_check.info(
                     colorama.Fore.RED +
@@ -307,9 +563,117 @@ class Comparator:
         return expr
     
 
+    def get_result_key(self, op, tests, test_name, teston, check, db, snap1, snap2, action):
+        """
+        Return key of results of test in result cache, see result_cache.
+        Key does not depend on device, so devices with identical snapshots
+        share results.
+        :return: key or None if snapshots can not be fingerprinted
+        """
+        fingerprints = []
+        for snap in [snap1, snap2]:
+            if snap is None:
+                fingerprints.append(None)
+            elif snap in self.replies:
+                if snap not in self.reply_fingerprints:
+                    reply = self.replies[snap]
+                    self.reply_fingerprints[snap] = make_digest(
+                        '' if reply is True else etree.tostring(reply))
+                fingerprints.append(self.reply_fingerprints[snap])
+            elif db.get('check_from_sqlite') is True:
+                if snap == str(None):
+                    return None
+                fingerprints.append(make_digest(snap))
+            elif os.path.isfile(snap):
+                fingerprints.append(self.get_fingerprint(snap))
+            else:
+                return None
+        # logs kept with results depend on quiet_nodes and handler levels
+        settings = [op.fail_fast, op.retention, op.max_records, op.quiet_nodes,
+                    setup_logging.get_capture_level()]
+        return get_result_key(tests, test_name, teston, check is True or action == "check",
+                              fingerprints, settings)
+
+    def get_results(self, key):
+        """
+        Return results of test from results shared by devices of the run or
+        from result cache
+        :param key: key returned by get_result_key
+        :return: results or None if test is not evaluated yet
+        """
+        for cache in [self.fleet_results, self.result_cache]:
+            if cache is not None:
+                results = cache.get(key)
+                if results is not None:
+                    return results
+        return None
+
     def compare_reply(
             self, op, tests, test_name, teston, check, db, snap1, snap2=None, action=None):
         """
+        Evaluate tests of command/rpc, see _compare_reply. If results of tests
+        on identical snapshots are known, from another device of the run or
+        from result cache, then they are used instead.
+        """
+        key = None
+        results = None
+        if self.fleet_results is not None or self.result_cache is not None:
+            try:
+                key = self.get_result_key(
+                    op, tests, test_name, teston, check, db, snap1, snap2, action)
+                if key is not None:
+                    results = self.get_results(key)
+            except Exception as ex:
+                self.logger_check.debug(
+                    colorama.Fore.BLUE +
+                    "Not able to read result cache: %s" % ex, extra=self.log_detail)
+                key = results = None
+        if results is not None:
+            self.logger_check.debug(
+                colorama.Fore.BLUE +
+                "Results of %s taken from cache" % test_name, extra=self.log_detail)
+            # messages logged when tests were evaluated, logged again with
+            # hostname of this device
+            setup_logging.replay(results.get('logs', []), op.device)
+            op.no_passed = op.no_passed + results['no_passed']
+            op.no_failed = op.no_failed + results['no_failed']
+            for tresult in results['test_details']:
+                op.add_test_result(teston, deepcopy(tresult))
+            op.result_dict[test_name] = results['result']
+            op.truncated = op.truncated or results['truncated']
+            return
+        passed, failed = op.no_passed, op.no_failed
+        count = len(op.test_details[teston])
+        truncated = op.truncated
+        capture = None
+        if key is not None:
+            capture = setup_logging.RecordCapture(op.device).start()
+        try:
+            self._compare_reply(
+                op, tests, test_name, teston, check, db, snap1, snap2, action)
+        finally:
+            logs = capture.stop() if capture is not None else None
+        if key is None:
+            return
+        results = {'no_passed': op.no_passed - passed,
+                   'no_failed': op.no_failed - failed,
+                   'test_details': deepcopy(op.test_details[teston][count:]),
+                   'result': op.result_dict.get(test_name),
+                   'truncated': op.truncated and not truncated,
+                   'logs': logs}
+        if self.result_cache is not None:
+            try:
+                self.result_cache.put(key, results)
+            except Exception as ex:
+                self.logger_check.debug(
+                    colorama.Fore.BLUE +
+                    "Not able to write result cache: %s" % ex, extra=self.log_detail)
+        if self.fleet_results is not None:
+            self.fleet_results.put(key, results)
+
+    def _compare_reply(
+            self, op, tests, test_name, teston, check, db, snap1, snap2=None, action=None):
+        """
         Analyse test files and call respective methods in operator file
         like is_equal() or no_diff()
         call operator.Operator methods to compare snapshots based on given test cases
@@ -326,11 +690,13 @@ class Comparator:
         :param action: action taken in JSNAPy module version
         """
 
+        self.index_key = None
         top_ignore_null = False
         ignore_null_list = [t for t in tests if 'ignore-null' in t]
         if ignore_null_list:
             top_ignore_null =  ignore_null_list[0].get('ignore-null')
         ####     extract all test cases in given test file     ####
+        all_tests = tests
         tests = [t for t in tests if ('iterate' in t or 'item' in t)]
         if not len(tests) and (check is True or action is "check"):
             res = self.compare_xml(op, db, teston, snap1, snap2)
@@ -341,6 +707,13 @@ class Comparator:
         else:
             #this result is going to be associated with the whole test case   
             final_result = None
+            self.index_key = get_test_key(all_tests)
+            # tests are not run on snapshots missing nodes they read
+            if not all([self.check_projection(db, snap) for snap in [snap1, snap2]]):
+                self.index_key = None
+                op.no_failed = op.no_failed + 1
+                op.result_dict[test_name] = False
+                return
 
             for test in tests:
                 if 'iterate' in test:
@@ -382,7 +755,22 @@ class Comparator:
                           'action': action,
                           'top_ignore_null': top_ignore_null
                           }
-                final_boolean_expr = self.expression_builder(testcases, None, **kwargs)
+                # tests of the block share xpath and ids, so snapshots are
+                # parsed and their nodes are traversed once for all of them
+                group_tests, elements, messages = self.get_group_fields(testcases)
+                own_trees = False
+                if len(group_tests) > 1:
+                    # snapshots are cached for whole device by generate_test_files
+                    if self.trees is None:
+                        self.trees = {}
+                        own_trees = True
+                    op.start_group(x_path, iter, id_list, elements, messages)
+                try:
+                    final_boolean_expr = self.expression_builder(testcases, None, **kwargs)
+                finally:
+                    op.end_group()
+                    if own_trees:
+                        self.trees = None
                 #for cases where skip was encountered due to ignore-null 
                 if final_boolean_expr is '' or final_boolean_expr is None or final_boolean_expr == str(None): 
                     continue
@@ -393,13 +781,19 @@ class Comparator:
                 if final_result is None:
                     final_result = True # making things normal
                 final_result = final_result and result
+                if final_result is False and op.fail_fast:
+                    op.truncated = True
+                    break
             
+            self.index_key = None
             op.result_dict[test_name] = final_result
 
     def compare_diff(self, pre_snap_file, post_snap_file, check_from_sqlite):
         """
         This function is called when --diff is used
         """
+        # icdiff is needed only for --diff, so import it here
+        from icdiff import diff, codec_print, get_options, ConsoleDiff
         if check_from_sqlite:
             lines_a = pre_snap_file.splitlines(True)
             lines_b = post_snap_file.splitlines(True)
@@ -443,6 +837,18 @@ class Comparator:
             30 *
             '-',
             extra=self.log_detail)
+        if self.is_unchanged(db, pre_snap_value, post_snap_value):
+            self.logger_check.info(
+                colorama.Fore.BLUE +
+                "    No difference, pre and post snapshots are identical   ",
+                extra=self.log_detail)
+            self.logger_check.info(
+                colorama.Fore.GREEN +
+                "Final result of --diff without test operator: PASSED",
+                extra=self.log_detail)
+            op.add_test_result(
+                teston, {'result': True, 'diff_on': [], 'testoperation': "simple-diff"})
+            return True
         pre_snap = self.get_xml_reply(db, pre_snap_value)
         post_snap = self.get_xml_reply(db, post_snap_value)
         flag = False
@@ -504,10 +910,38 @@ class Comparator:
                         "] " +
                         res,
                         extra=self.log_detail)
-            op.test_details[teston].append(tres)
+            op.add_test_result(teston, tres)
         return flag
 
 
+    def get_sqlite_replies(self, db, device, tests_files, snaps, snap_id=False):
+        """
+        Fetch snapshots of all commands and RPCs used in test files from
+        database at once
+        :param db: database object
+        :param device: device name
+        :param tests_files: list of test files
+        :param snaps: snap names or snap ids to be fetched
+        :param snap_id: True if snaps are snap ids
+        :return: dictionary mapping (command, snap) to data and data format
+        """
+        names = []
+        for tests in tests_files:
+            for val in tests.get('tests_include', tests):
+                try:
+                    test = tests[val][0]
+                    if 'command' in test:
+                        name = '_'.join(test['command'].split('|')[0].split())
+                    else:
+                        name = test['rpc']
+                except (KeyError, IndexError, TypeError, AttributeError):
+                    continue
+                if name not in names:
+                    names.append(name)
+        a = SqliteExtractXml(db.get('db_name'))
+        return a.get_xml_bulk(str(device), names, snaps, snap_id)
+
+
     def generate_test_files(
             self, main_file, device, check, diff, db, snap_del, pre=None, action=None, post=None):
         """
@@ -526,10 +960,36 @@ class Comparator:
         :param action: given by module version, either snap, snapcheck or check
         :return: object of operator.Operator containing test details
         """
+        start = time.time()
         op = Operator()
         op.device = device
+        op.test_callback = self.test_callback
         tests_files = []
         self.log_detail['hostname'] = device
+        # node records kept in test details, to bound memory of fleet runs
+        retention = main_file.get('result_retention', 'full')
+        if retention in ['full', 'failures', 'counts']:
+            op.retention = retention
+        else:
+            self.logger_check.error(
+                colorama.Fore.RED +
+                "ERROR!! result_retention should be one of full, failures or counts, using full",
+                extra=self.log_detail)
+        max_records = main_file.get('max_records')
+        if isinstance(max_records, int) and not isinstance(max_records, bool) and max_records >= 0:
+            op.max_records = max_records
+        # log only result of every test, not messages of single nodes
+        op.quiet_nodes = main_file.get('quiet_nodes') is True
+        # results of tests on unchanged snapshots are kept, true or max no of
+        # results can be given
+        result_cache = main_file.get('result_cache')
+        if result_cache is True or (isinstance(result_cache, int) and result_cache > 0):
+            try:
+                self.result_cache = ResultCache() if result_cache is True else ResultCache(result_cache)
+            except Exception as ex:
+                self.logger_check.error(
+                    colorama.Fore.RED +
+                    "ERROR!! Not able to open result cache: %s" % ex, extra=self.log_detail)
         # get the test files from config.yml
         if main_file.get('tests') is None:
             self.logger_check.error(
@@ -554,18 +1014,56 @@ class Comparator:
                         tfile,
                         extra=self.log_detail)
 
+            # fetch snapshots of all commands from database in one go
+            if db.get(
+                    'check_from_sqlite') is True and (check is True or diff is True or action in ["check", "diff"]):
+                # while checking from database, preference is given
+                # to id and then snap name
+                if (db['first_snap_id'] is not None) and (
+                        db['second_snap_id'] is not None):
+                    snap1, snap2 = db['first_snap_id'], db['second_snap_id']
+                    sqlite_replies = self.get_sqlite_replies(
+                        db, device, tests_files, [snap1, snap2], True)
+                else:
+                    snap1, snap2 = pre, post
+                    sqlite_replies = self.get_sqlite_replies(
+                        db, device, tests_files, [snap1, snap2])
+            elif db.get('check_from_sqlite') is True:
+                snap1 = pre
+                sqlite_replies = self.get_sqlite_replies(
+                    db, device, tests_files, [snap1])
+
+            # snapshots, their nodes and ids are shared by all test files of
+            # the device and released once its tests are done
+            self.trees = {}
+            op.open_cache()
+
             # check what all test cases need to be included, if nothing given
             # then include all test cases ####
             for tests in tests_files:
+                # fail_fast can be given for whole run or for single test file
+                op.fail_fast = main_file.get('fail_fast') is True or tests.get('fail_fast') is True
                 tests_included = []
                 if 'tests_include' in tests:
                     tests_included = tests.get('tests_include')
                 else:
                     for t in tests:
-                        tests_included.append(t)
+                        if t != 'fail_fast':
+                            tests_included.append(t)
                 message= self._print_testmssg("Device: "+device, "*")
                 self.logger_check.info(colorama.Fore.BLUE + message, extra=self.log_detail)
+                # tests of this test file already run
+                done = []
                 for val in tests_included:
+                    # once test file, or device if fail_fast is given for
+                    # whole run, has failed, its verdict is known
+                    if op.fail_fast and (
+                            False in [op.result_dict.get(v) for v in done] or
+                            (main_file.get('fail_fast') is True and
+                             False in op.result_dict.values())):
+                        op.truncated = True
+                        break
+                    done.append(val)
                     self.logger_check.info(
                         "Tests Included: %s " %
                         (val),
@@ -602,20 +1100,10 @@ class Comparator:
                         # extract snap files, if check from sqlite is true t
                         if db.get(
                                 'check_from_sqlite') is True and (check is True or diff is True or action in ["check", "diff"]):
-                            a = SqliteExtractXml(db.get('db_name'))
-                            # while checking from database, preference is given
-                            # to id and then snap name
-                            if (db['first_snap_id'] is not None) and (
-                                    db['second_snap_id'] is not None):
-                                snapfile1, data_format1 = a.get_xml_using_snap_id(
-                                    str(device), name, db['first_snap_id'])
-                                snapfile2, data_format2 = a.get_xml_using_snap_id(
-                                    str(device), name, db['second_snap_id'])
-                            else:
-                                snapfile1, data_format1 = a.get_xml_using_snapname(
-                                    str(device), name, pre)
-                                snapfile2, data_format2 = a.get_xml_using_snapname(
-                                    str(device), name, post)
+                            snapfile1, data_format1 = sqlite_replies.get(
+                                (name, snap1), (str(None), None))
+                            snapfile2, data_format2 = sqlite_replies.get(
+                                (name, snap2), (str(None), None))
                             if reply_format != data_format1 or reply_format != data_format2:
                                 self.logger_check.error(colorama.Fore.RED + "ERROR!! Data stored in database is not in %s format."
                                                         % reply_format, extra=self.log_detail)
@@ -623,9 +1111,8 @@ class Comparator:
                                 # sys.exit(1)
                         ###### taking snapshot for --snapcheck operation ####
                         elif db.get('check_from_sqlite') is True:
-                            a = SqliteExtractXml(db.get('db_name'))
-                            snapfile1, data_format1 = a.get_xml_using_snapname(
-                                str(device), name, pre)
+                            snapfile1, data_format1 = sqlite_replies.get(
+                                (name, snap1), (str(None), None))
                             if reply_format != data_format1:
                                 self.logger_check.error(
                                     colorama.Fore.RED +
@@ -702,6 +1189,10 @@ class Comparator:
                                 colorama.Fore.RED +
                                 "ERROR!! for checking snapshots in text format use '--diff' option ", extra=self.log_detail)
 
+            self.trees = None
+            op.release_cache()
+            op.duration = time.time() - start
+
             # print final result, if operation is --diff then message gets
             # printed compare_diff function only ####
             if (diff is not True):
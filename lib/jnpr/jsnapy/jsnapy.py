@@ -8,32 +8,57 @@
 import argparse
 import getpass
 import logging
+import multiprocessing
 import os
 import Queue
 import sys
 import textwrap
 from copy import deepcopy
-from threading import Thread
+from threading import Thread, Lock
 
 import yaml
 from jnpr.jsnapy import get_path, version, get_config_location, DirStore
 from jnpr.jsnapy.check import Comparator
-from jnpr.jsnapy.notify import Notification
-from jnpr.junos import Device
-from jnpr.jsnapy import version
 from jnpr.jsnapy.operator import Operator
 from jnpr.jsnapy.snap import Parser
-from jnpr.junos.exception import ConnectAuthError
+from jnpr.jsnapy.result_cache import ResultCache, MemoryCache
 
 import colorama
 import setup_logging
 
+#### PyEZ (jnpr.junos) and notify are imported only by the operations needing them ####
 logging.getLogger("paramiko").setLevel(logging.WARNING)
+logging.getLogger("ncclient").setLevel(logging.WARNING)
+
+# results of tests shared by devices evaluated in a worker process, set by
+# init_worker
+worker_results = None
+
+
+def init_worker():
+    """
+    Initialize worker process of SnapAdmin.evaluate_in_pool, records are
+    written directly as queue of parent process is not read in worker
+    """
+    global worker_results
+    setup_logging.reset_queue()
+    worker_results = MemoryCache()
+
+
+def evaluate_device(args):
+    """
+    Evaluate tests of one device in worker process, see SnapAdmin.evaluate_in_pool
+    :param args: arguments of Comparator.generate_test_files
+    :return: picklable test results, returned by Operator.get_results
+    """
+    fleet_results = worker_results if args[0].get('fleet_dedup') is True else None
+    return Comparator(fleet_results=fleet_results).generate_test_files(*args).get_results()
+
 
 class SnapAdmin:
 
-    # need to call this function to initialize logging
-    setup_logging.setup_logging()
+    # set once logging is initialized from logging.yml
+    logging_configured = False
 
     def __init__(self):
         """
@@ -41,6 +66,28 @@ class SnapAdmin:
         """
         self.q = Queue.Queue()
         self.snap_q = Queue.Queue()
+        # hostname -> replies collected by --snapcheck, handed to comparator
+        self.live_replies = {}
+        # hostname -> Parser still writing snap files of --snapcheck, flushed
+        # once tests of device are done
+        self.writers = {}
+        # (hostname, pre snap, post snap) -> results evaluated by worker processes
+        self.evaluated = {}
+        # results of tests shared by devices with identical snapshots, used
+        # if "fleet_dedup" is set in main config file
+        self.fleet_results = MemoryCache()
+        # stop tests at first failure, set by check() and snapcheck()
+        self.fail_fast = False
+        # sinks receiving results as soon as they are produced, see add_sink
+        self.sinks = []
+        # if False, module functions do not collect results of all devices,
+        # they are only passed to sinks
+        self.keep_results = True
+        # file name -> sink writing results given by "export" in main config
+        self.exports = {}
+        # sends mails of the run, see get_notification
+        self.notification = None
+        self.notification_lock = Lock()
         self.log_detail = {'hostname': None}
         self.snap_del = False
         self.logger = logging.getLogger(__name__)
@@ -99,6 +146,11 @@ class SnapAdmin:
             action="store_true",
             help="displays version"
         )
+        group.add_argument(
+            "--clear-cache",
+            action="store_true",
+            help="remove test results kept by result_cache"
+        )
 
         self.parser.add_argument(
             "pre_snapfile",
@@ -172,6 +224,28 @@ class SnapAdmin:
         self.db['second_snap_id'] = None
         
         DirStore.custom_dir=self.args.folder
+        if self.args.version is not True:
+            self.setup_logging()
+
+    @classmethod
+    def setup_logging(cls):
+        """
+        Initialize logging using logging.yml, it is done only once per process
+        """
+        if cls.logging_configured is False:
+            setup_logging.setup_logging()
+            cls.logging_configured = True
+
+    def is_device(self, dev):
+        """
+        Check if dev is a PyEZ Device object, PyEZ is not imported when no device is given
+        :param dev: object passed by module version
+        :return: True if dev is jnpr.junos.Device object
+        """
+        if dev is None:
+            return False
+        from jnpr.junos import Device
+        return isinstance(dev, Device)
 
     def get_version(self):
         """
@@ -216,10 +290,11 @@ class SnapAdmin:
 
     def set_verbosity(self, val):
         self.logger.root.setLevel(val)
-        handlers = self.logger.root.handlers
+        handlers = setup_logging.get_handlers()
         for handle in handlers:
             if handle.__class__.__name__=='StreamHandler':
                 handle.setLevel(val)
+        setup_logging.sync_level()
 
     def chk_database(self, config_file, pre_snapfile,
                      post_snapfile, check=None, snap=None, action=None):
@@ -244,6 +319,8 @@ class SnapAdmin:
                                             # "check")):
             if d.__contains__('database_name'):
                 self.db['db_name'] = d['database_name']
+                if d.__contains__('keyframe_interval'):
+                    self.db['keyframe_interval'] = d['keyframe_interval']
 
             else:
                 self.logger.error(
@@ -345,14 +422,20 @@ class SnapAdmin:
                 self.parser.print_help()
                 sys.exit(1)
         self.login(output_file)
+        self.close_writers()
+        self.close_notification()
+        self.close_exports()
 
-    def generate_rpc_reply(self, dev, output_file, hostname, config_data):
+    def generate_rpc_reply(self, dev, output_file, hostname, config_data, action=None):
         """
         Generates rpc-reply based on command/rpc given and stores them in snap_files
+        For snapcheck, replies are also kept in memory for testing, and snap files
+        are written in background or not at all if "persist_snapcheck" is False
         :param dev: device handler
         :param output_file: filename to store snapshots
         :param hostname: hostname of device
         :param config_data : data of main config file
+        :param action: "snapcheck" if replies are going to be tested right away
         """
         val = None
         test_files = []
@@ -372,47 +455,242 @@ class SnapAdmin:
                     "ERROR!! File %s is not found for taking snapshots" %
                     tfile, extra=self.log_detail)
 
-        g = Parser()
-        for tests in test_files:
-            val = g.generate_reply(tests, dev, output_file, hostname, self.db)
+        snapcheck = action == "snapcheck"
+        persist = not snapcheck or config_data.get('persist_snapcheck') is not False
+        g = Parser(config_data.get('dedup') is True, persist, snapcheck,
+                   config_data.get('index') is True, config_data.get('project') is True,
+                   config_data.get('auto_filter') is True, config_data.get('shard') is True)
+        # tests of all files sharing a snap file are known before it is taken
+        g.add_tests(test_files)
+        try:
+            for tests in test_files:
+                val = g.generate_reply(tests, dev, output_file, hostname, self.db)
+        except Exception:
+            g.flush()
+            raise
+        if snapcheck:
+            # snap files are written while replies are tested
+            self.live_replies[hostname] = g.snap_replies
+            self.writers[hostname] = g
+        else:
+            g.flush()
         return val
 
-    def compare_tests(
+    def flush_writer(self, hostname):
+        """
+        Wait till snap files of device are written and release its replies
+        :param hostname: device name
+        """
+        self.live_replies.pop(hostname, None)
+        writer = self.writers.pop(hostname, None)
+        if writer is not None:
+            writer.flush()
+
+    def close_writers(self):
+        """
+        Wait till snap files of all devices are written, also of devices whose
+        tests were not run
+        """
+        for hostname in self.writers.keys():
+            self.flush_writer(hostname)
+        self.live_replies.clear()
+
+    def get_comparison_args(
             self, hostname, config_data, pre_snap=None, post_snap=None, action=None):
         """
-        called by check and snapcheck argument, to compare snap files
-        calls the function to compare snapshots based on arguments given
-        (--check, --snapcheck, --diff)
+        Return arguments for Comparator.generate_test_files, based on arguments
+        given (--check, --snapcheck, --diff)
         :param hostname: device name
-        :return: return object of Operator containing test details
+        :return: tuple of arguments
         """
-        comp = Comparator()
         chk = self.args.check
         diff = self.args.diff
+        if self.fail_fast is True and config_data.get('fail_fast') is not True:
+            config_data = dict(config_data, fail_fast=True)
         pre_snap_file = self.args.pre_snapfile if pre_snap is None else pre_snap
+        post_snap_file = None
         if (chk or diff or action in ["check", "diff"]):
             post_snap_file = self.args.post_snapfile if post_snap is None else post_snap
-            test_obj = comp.generate_test_files(
-                config_data,
-                hostname,
-                chk,
-                diff,
-                self.db,
-                self.snap_del,
-                pre_snap_file,
-                action,
-                post_snap_file)
+        return (config_data, hostname, chk, diff, self.db, self.snap_del,
+                pre_snap_file, action, post_snap_file)
+
+    def compare_tests(
+            self, hostname, config_data, pre_snap=None, post_snap=None, action=None):
+        """
+        called by check and snapcheck argument, to compare snap files
+        calls the function to compare snapshots based on arguments given
+        (--check, --snapcheck, --diff)
+        :param hostname: device name
+        :return: return object of Operator containing test details
+        """
+        args = self.get_comparison_args(
+            hostname,
+            config_data,
+            pre_snap,
+            post_snap,
+            action)
+        # already evaluated by worker process
+        results = self.evaluated.pop((hostname, args[6], args[8]), None)
+        if results is not None:
+            test_obj = Operator()
+            test_obj.merge_results(results)
+            for teston, details in test_obj.test_details.items():
+                for tresult in details:
+                    self.emit_test_result(hostname, teston, tresult)
+            return test_obj
+        comp = Comparator(self.live_replies.pop(hostname, None),
+                          self.emit_test_result if self.sinks else None,
+                          self.fleet_results if config_data.get('fleet_dedup') is True else None)
+        try:
+            return comp.generate_test_files(*args)
+        finally:
+            self.flush_writer(hostname)
+
+    def get_notification(self):
+        """
+        Return Notification object shared by all devices of the run, so that
+        mails are sent over one SMTP session and digest mails can be made
+        :return: object of notify.Notification
+        """
+        with self.notification_lock:
+            if self.notification is None:
+                from jnpr.jsnapy.notify import Notification
+                self.notification = Notification()
+            return self.notification
+
+    def close_notification(self):
+        """
+        Send digest mails and wait till all mails of the run are sent
+        """
+        if self.notification is not None:
+            self.notification.close()
+            self.notification = None
+
+    def clear_cache(self):
+        """
+        Remove test results kept by result_cache, so that all tests are
+        evaluated again
+        :return: number of results removed
+        """
+        count = ResultCache().clear()
+        self.logger.info(
+            colorama.Fore.BLUE +
+            "Removed %d cached test results" % count, extra=self.log_detail)
+        return count
+
+    def export_results(self, config_data):
+        """
+        Write results as json lines to file given by "export" in main config
+        file, results are appended as soon as tests are done
+        :param config_data: data of main config file
+        """
+        export = config_data.get('export')
+        if not export or export in self.exports:
+            return
+        from jnpr.jsnapy.sinks import JsonLinesSink
+        try:
+            sink = JsonLinesSink(export, tests=True)
+        except IOError as ex:
+            self.logger.error(
+                colorama.Fore.RED +
+                "ERROR!! can not export results to %s, Complete message: %s" %
+                (export, ex),
+                extra=self.log_detail)
         else:
-            test_obj = comp.generate_test_files(
-                config_data,
-                hostname,
-                chk,
-                diff,
-                self.db,
-                self.snap_del,
-                pre_snap_file,
-                action)
-        return test_obj
+            self.exports[export] = sink
+            self.add_sink(sink)
+
+    def close_exports(self):
+        """
+        Close files written by export_results at end of the run, next run
+        opens them again
+        """
+        for sink in self.exports.values():
+            self.remove_sink(sink)
+            sink.close()
+        self.exports = {}
+
+    def add_sink(self, sink):
+        """
+        Register sink which receives result of every test and device as soon
+        as it is produced
+        :param sink: object of sinks.ResultSink
+        """
+        self.sinks.append(sink)
+
+    def remove_sink(self, sink):
+        """
+        Unregister sink added by add_sink
+        :param sink: object of sinks.ResultSink
+        """
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+
+    def emit_test_result(self, hostname, teston, tresult, duration=None):
+        """
+        Pass result of a test to all sinks
+        """
+        for sink in list(self.sinks):
+            try:
+                sink.test_result(hostname, teston, tresult, duration)
+            except Exception as ex:
+                self.logger.error(
+                    colorama.Fore.RED +
+                    "ERROR!! in result sink: %s" % ex,
+                    extra=self.log_detail)
+
+    def emit_device_result(self, hostname, res):
+        """
+        Pass result of a device to all sinks
+        """
+        for sink in list(self.sinks):
+            try:
+                sink.device_result(hostname, res)
+            except Exception as ex:
+                self.logger.error(
+                    colorama.Fore.RED +
+                    "ERROR!! in result sink: %s" % ex,
+                    extra=self.log_detail)
+
+    def evaluate_in_pool(self, hosts, config_data, pre_snaps, post_snap=None, action=None):
+        """
+        Evaluate tests of all devices in a pool of worker processes, if "processes"
+        is given in main config file. Only snapshots already stored, locally or in
+        database, are evaluated, i.e for --check or for --snapcheck using local
+        snapshots. Results are used by compare_tests.
+        :param hosts: list of device names
+        :param config_data: data of main config file
+        :param pre_snaps: list of pre snapshot filenames or file tags
+        :param post_snap: post snapshot filename or file tag
+        :param action: action to be taken, check or snapcheck
+        """
+        processes = config_data.get('processes')
+        if not isinstance(processes, int) or processes < 2 or self.args.diff is True:
+            return
+        local = self.args.local is True or 'local' in config_data
+        if not (self.args.check is True or action == "check" or
+                ((self.args.snapcheck is True or action == "snapcheck") and local)):
+            return
+        jobs = [self.get_comparison_args(hostname, config_data, pre_snap, post_snap, action)
+                for hostname in hosts for pre_snap in pre_snaps]
+        if len(jobs) < 2:
+            return
+        try:
+            pool = multiprocessing.Pool(min(processes, len(jobs)), init_worker)
+            try:
+                results = pool.map(evaluate_device, jobs)
+            finally:
+                pool.close()
+                pool.join()
+        except Exception as ex:
+            self.logger.error(
+                colorama.Fore.RED +
+                "ERROR!! Evaluation in worker processes failed, evaluating one by one: %s" %
+                ex,
+                extra=self.log_detail)
+        else:
+            for args, result in zip(jobs, results):
+                self.evaluated[(args[1], args[6], args[8])] = result
 
     def get_values(self, key_value):
         del_value = ['device', 'username', 'passwd' ]
@@ -499,6 +777,10 @@ class SnapAdmin:
                                 # host.pop('device')
                                 host_dict[hostname] = deepcopy(host)
 
+            self.evaluate_in_pool(
+                self.host_list,
+                self.main_file,
+                self.main_file.get('local', [output_file]))
             for hostname, key_value in host_dict.iteritems():
                 #The file config takes precedence over cmd line params -- no changes made
                 username = self.args.login or key_value.get('username') 
@@ -544,6 +826,7 @@ class SnapAdmin:
         :param action: action to be taken (check, snapcheck, snap)
         :return: object of testop.Operator containing test details
         """
+        self.export_results(config_data)
         res = Operator()
 
         res = self.compare_tests(
@@ -588,8 +871,7 @@ class SnapAdmin:
                     else:
                         passwd = mail_file['passwd']
                 
-                    send_mail = Notification()
-                    send_mail.notify(mail_file, hostname, passwd, res)
+                    self.get_notification().notify(mail_file, hostname, passwd, res)
                 else:
                     self.logger.error(
                         colorama.Fore.RED +
@@ -602,6 +884,7 @@ class SnapAdmin:
         #         post_snap,
         #         action)
 
+        self.emit_device_result(hostname, res)
         self.q.put(res)
         return res
 
@@ -628,6 +911,8 @@ class SnapAdmin:
             self.logger.info(
                 colorama.Fore.BLUE +
                 "Connecting to device %s ................", hostname, extra=self.log_detail)
+            from jnpr.junos import Device
+            from jnpr.junos.exception import ConnectAuthError
             if username is None:
                 username = raw_input("\nEnter User name: ")
             dev = Device(
@@ -669,7 +954,8 @@ class SnapAdmin:
                     dev,
                     output_file,
                     hostname,
-                    config_data)
+                    config_data,
+                    "snapcheck" if self.args.snapcheck is True else action)
                 self.snap_q.put(res)
                 dev.close()
         if self.args.check is True or self.args.snapcheck is True or self.args.diff is True or action in [
@@ -759,6 +1045,12 @@ class SnapAdmin:
                         self.host_list.append(hostname)
                         host_dict[hostname] = deepcopy(host)
 
+        self.evaluate_in_pool(
+            self.host_list,
+            config_data,
+            config_data.get('local', [pre_name]),
+            post_name,
+            action)
         for hostname, key_value in host_dict.iteritems():
             username = key_value.get('username')
             password = key_value.get('passwd')
@@ -779,7 +1071,8 @@ class SnapAdmin:
             if action == "snap":
                 res_obj.append(self.snap_q.get())
             elif action in ["snapcheck", "check"]:
-                res_obj.append(self.q.get())
+                res = self.q.get()
+                res_obj.append(res if self.keep_results else None)
             else:
                 res_obj.append(None)
             t.join()
@@ -915,7 +1208,8 @@ class SnapAdmin:
                         dev,
                         pre_name,
                         hostname,
-                        config_data))
+                        config_data,
+                        action))
                 except Exception as ex:
                     self.logger.error(colorama.Fore.RED +
                                       "\nERROR occurred %s" %
@@ -954,32 +1248,37 @@ class SnapAdmin:
         :param folder: custom directory path to use for lookup
         """
         DirStore.custom_dir = folder
-        if isinstance(dev, Device):
+        if self.is_device(dev):
             res = self.extract_dev_data(dev, data, file_name, "snap")
         else:
             res = self.extract_data(data, file_name, "snap")
         return res
 
-    def snapcheck(self, data, file_name=None, dev=None, local= False, folder=None):
+    def snapcheck(self, data, file_name=None, dev=None, local= False, folder=None, fail_fast=False):
         """
         Function equivalent to --snapcheck operator, for module version
         :param data: either main config file or string containing details of main config file
         :param pre_file: pre snap file, either complete filename or file tag
         :param dev: device object
         :param folder: custom directory path to use for lookup
+        :param fail_fast: stop tests at first failure, only verdict is needed. Defaults to False
         :return: return list of object of testop.Operator containing test details or list of dictionary of object of testop.Operator containing test details for each stored snapshot
         """
         DirStore.custom_dir = folder
+        self.fail_fast = fail_fast
         if file_name is None:
             file_name = "snap_temp"
             self.snap_del = True
-        if isinstance(dev, Device):
+        if self.is_device(dev):
             res = self.extract_dev_data(dev, data, file_name, "snapcheck", local=local)
         else:
             res = self.extract_data(data, file_name, "snapcheck", local=local)
+        self.close_writers()
+        self.close_notification()
+        self.close_exports()
         return res
 
-    def check(self, data, pre_file=None, post_file=None, dev=None, folder=None):
+    def check(self, data, pre_file=None, post_file=None, dev=None, folder=None, fail_fast=False):
         """
         Function equivalent to --check operator, for module version
         :param data: either main config file or string containing details of main config file
@@ -987,10 +1286,12 @@ class SnapAdmin:
         :param post_file: post snap file, either complete filename or file tag
         :param dev: device object
         :param folder: custom directory path to use for lookup
+        :param fail_fast: stop tests at first failure, only verdict is needed. Defaults to False
         :return: return object of testop.Operator containing test details
         """
         DirStore.custom_dir = folder
-        if isinstance(dev, Device):
+        self.fail_fast = fail_fast
+        if self.is_device(dev):
             res = self.extract_dev_data(
                 dev,
                 data,
@@ -999,8 +1300,82 @@ class SnapAdmin:
                 post_file)
         else:
             res = self.extract_data(data, pre_file, "check", post_file)
+        self.close_writers()
+        self.close_notification()
+        self.close_exports()
         return res
 
+    def snapcheck_iter(self, data, file_name=None, dev=None, local=False, folder=None, fail_fast=False):
+        """
+        Same as snapcheck(), but yields result of every device as soon as its
+        tests are done, results of all devices are not collected
+        :param data: either main config file or string containing details of main config file
+        :param file_name: snap file, either complete filename or file tag
+        :param dev: device object
+        :param local: reuse exisiting snapshot when true. Defaults to False
+        :param folder: custom directory path to use for lookup
+        :param fail_fast: stop tests at first failure, only verdict is needed. Defaults to False
+        :return: generator of tuples of hostname and object of testop.Operator
+        """
+        return self.iter_results(
+            self.snapcheck, data, file_name, dev, local, folder, fail_fast)
+
+    def check_iter(self, data, pre_file=None, post_file=None, dev=None, folder=None, fail_fast=False):
+        """
+        Same as check(), but yields result of every device as soon as its
+        tests are done, results of all devices are not collected
+        :param data: either main config file or string containing details of main config file
+        :param pre_file: pre snap file, either complete filename or file tag
+        :param post_file: post snap file, either complete filename or file tag
+        :param dev: device object
+        :param folder: custom directory path to use for lookup
+        :param fail_fast: stop tests at first failure, only verdict is needed. Defaults to False
+        :return: generator of tuples of hostname and object of testop.Operator
+        """
+        return self.iter_results(
+            self.check, data, pre_file, post_file, dev, folder, fail_fast)
+
+    def iter_results(self, func, *args):
+        """
+        Run given module function in a thread and yield results of devices
+        as they are passed to sinks. If generator is closed early, it waits
+        for remaining devices to finish.
+        :param func: module function like check or snapcheck
+        :param args: arguments of function
+        :return: generator of tuples of hostname and object of testop.Operator
+        """
+        from jnpr.jsnapy.sinks import CallbackSink
+        results = Queue.Queue()
+        done = object()
+        error = []
+        sink = CallbackSink(lambda hostname, res: results.put((hostname, res)))
+
+        def run():
+            try:
+                func(*args)
+            except BaseException as ex:
+                error.append(ex)
+            finally:
+                results.put(done)
+
+        self.add_sink(sink)
+        keep_results = self.keep_results
+        self.keep_results = False
+        t = Thread(target=run)
+        t.start()
+        try:
+            while True:
+                item = results.get()
+                if item is done:
+                    break
+                yield item
+        finally:
+            t.join()
+            self.keep_results = keep_results
+            self.remove_sink(sink)
+        if error:
+            raise error[0]
+
     #######  generate init folder ######
     '''
     def generate_init(self):
@@ -1043,7 +1418,8 @@ class SnapAdmin:
         :return: print message in command line, regarding correct usage of JSNAPy
         """
         ## only four test operation is permitted, if given anything apart from this, then it should print error message
-        if (self.args.snap is False and self.args.snapcheck is False and self.args.check is False and self.args.diff is False and self.args.version is False):
+        if (self.args.snap is False and self.args.snapcheck is False and self.args.check is False and self.args.diff is False and self.args.version is False
+                and self.args.clear_cache is False):
             self.logger.error(colorama.Fore.RED +
                               "Arguments not given correctly, Please refer help message", extra=self.log_detail)
             self.parser.print_help()
@@ -1081,6 +1457,8 @@ def main():
         js.check_arguments()
         if js.args.version is True:
             print "JSNAPy version:", version.__version__
+        elif js.args.clear_cache is True:
+            js.clear_cache()
         else:
             if js.args.verbosity:
                 js.set_verbosity(10*js.args.verbosity)
@@ -6,7 +6,9 @@
 #
 
 import os
+import Queue
 import smtplib
+import threading
 import jinja2
 import logging
 import colorama
@@ -14,59 +16,203 @@ import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+# templates are compiled once by this environment and reused for every mail
+template_env = jinja2.Environment(
+    loader=jinja2.FileSystemLoader(searchpath=os.path.dirname(__file__)))
 
-class Notification:
+
+class MailSender:
+
+    """
+    Send mails from background thread, keeping one SMTP session open for
+    every server and sender, so mails of all devices share one login
+    """
+
+    _sentinel = None
 
     def __init__(self):
         self.logger_notify = logging.getLogger(__name__)
-        self.log_details = {'hostame': None}
+        self.log_details = {'hostname': None}
+        self.queue = Queue.Queue()
+        # (server, port, from) -> SMTP session, None if login failed
+        self.sessions = {}
+        self.thread = threading.Thread(target=self._run)
+        self.thread.setDaemon(True)
+        self.thread.start()
 
-    def notify(self, mail_file, hostname, password, test_obj):
+    def send(self, mail_file, password, msg, hostname=None):
         """
-        function to generate email, using jinja template in content.html
-        :param m_file: main config file
-        :param hostname: device name
+        Queue mail to be sent by background thread
+        :param mail_file: data of mail file
+        :param password: password of sender
+        :param msg: MIME message
+        :param hostname: device name used in logs
+        """
+        self.queue.put((mail_file, password, msg, hostname))
+
+    def _connect(self, mail_file, password):
+        """
+        Open SMTP session, STARTTLS is used unless starttls is False in mail
+        file and login is done only if password is given
+        :return: SMTP session or None if it can not be opened
         """
-        self.log_details['hostname'] = hostname
-        self.logger_notify.debug(
-            colorama.Fore.BLUE +
-            "Sending mail............", extra=self.log_details)
-        testdetails = test_obj.test_details
-        templateLoader = jinja2.FileSystemLoader(searchpath="/")
-        templateEnv = jinja2.Environment(loader=templateLoader)
-        TEMPLATE_FILE = os.path.join(os.path.dirname(__file__), 'content.html')
-        template = templateEnv.get_template(TEMPLATE_FILE)
-        outputText = template.render(device=hostname, name=mail_file['recipient_name'], tests=testdetails, 
-                                     date=time.ctime(),
-                                     tpassed=test_obj.no_passed, tfailed=test_obj.no_failed,
-                                     fresult=test_obj.result, sname=mail_file['sender_name'])
-        msg = MIMEMultipart()
-        part2 = MIMEText('outputText1', 'html')
-        part2.set_payload(outputText)
-        msg.attach(part2)
-        from_mail = mail_file['from']
-        to = mail_file['to']
-        msg['Subject'] = hostname + ' : ' + mail_file['sub']
         port = mail_file['port']if 'port' in mail_file else 587
         servername = mail_file[
             'server'] if 'server' in mail_file else 'smtp.gmail.com'
-        server = smtplib.SMTP(servername, port)
-        server.ehlo()
-        server.starttls()
         try:
-            server.login(from_mail, password)
+            server = smtplib.SMTP(servername, port)
+            server.ehlo()
+            if mail_file.get('starttls', True) is not False:
+                server.starttls()
+                server.ehlo()
+            if password:
+                server.login(mail_file['from'], password)
         except Exception as ex:
             self.logger_notify.error(
                 colorama.Fore.RED +
                 "ERROR occurred: %s" % str(ex), extra=self.log_details)
+            return None
+        return server
+
+    def _deliver(self, mail_file, password, msg):
+        key = (mail_file.get('server'), mail_file.get('port'), mail_file['from'])
+        if key not in self.sessions:
+            self.sessions[key] = self._connect(mail_file, password)
+        server = self.sessions[key]
+        if server is None:
             return
         ms = msg.as_string()
         try:
-            server.sendmail(from_mail, to, ms)
-        except Exception as ex:
-            self.logger_notify.error(
-                colorama.Fore.RED +
-                "ERROR!!  in sending mail: %s" %
-                ex.message,
-                extra=self.log_details)
-        server.quit()
+            server.sendmail(mail_file['from'], mail_file['to'], ms)
+        except smtplib.SMTPServerDisconnected:
+            # server may close idle session, open it again once
+            server = self.sessions[key] = self._connect(mail_file, password)
+            if server is not None:
+                server.sendmail(mail_file['from'], mail_file['to'], ms)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is self._sentinel:
+                break
+            mail_file, password, msg, hostname = item
+            self.log_details['hostname'] = hostname
+            try:
+                self._deliver(mail_file, password, msg)
+            except Exception as ex:
+                self.logger_notify.error(
+                    colorama.Fore.RED +
+                    "ERROR!!  in sending mail: %s" %
+                    str(ex),
+                    extra=self.log_details)
+
+    def close(self):
+        """
+        Send queued mails and close all SMTP sessions
+        """
+        self.queue.put(self._sentinel)
+        self.thread.join()
+        for server in self.sessions.values():
+            if server is not None:
+                try:
+                    server.quit()
+                except Exception:
+                    pass
+        self.sessions = {}
+
+
+class Notification:
+
+    def __init__(self):
+        self.logger_notify = logging.getLogger(__name__)
+        self.log_details = {'hostame': None}
+        self.sender = None
+        # results kept for digest mails, keyed by mail
+        self.digests = {}
+        self.lock = threading.Lock()
+
+    def get_sender(self):
+        with self.lock:
+            if self.sender is None:
+                self.sender = MailSender()
+            return self.sender
+
+    def render(self, mail_file, hostname, test_obj):
+        """
+        Create mail of one device using jinja template in content.html
+        :param mail_file: data of mail file
+        :param hostname: device name
+        :param test_obj: object of operator.Operator containing test details
+        :return: MIME message
+        """
+        template = template_env.get_template('content.html')
+        outputText = template.render(device=hostname, name=mail_file['recipient_name'], tests=test_obj.test_details,
+                                     date=time.ctime(),
+                                     tpassed=test_obj.no_passed, tfailed=test_obj.no_failed,
+                                     fresult=test_obj.result, sname=mail_file['sender_name'])
+        return self.get_message(mail_file, outputText, hostname + ' : ' + mail_file['sub'])
+
+    def render_digest(self, mail_file, results):
+        """
+        Create one mail for all devices using jinja template in digest.html
+        :param mail_file: data of mail file
+        :param results: list of tuples of device name and object of operator.Operator
+        :return: MIME message
+        """
+        template = template_env.get_template('digest.html')
+        outputText = template.render(name=mail_file['recipient_name'], results=results,
+                                     date=time.ctime(),
+                                     tpassed=sum(res.no_passed for hostname, res in results),
+                                     tfailed=sum(res.no_failed for hostname, res in results),
+                                     dfailed=len([hostname for hostname, res in results if res.result == "Failed"]),
+                                     sname=mail_file['sender_name'])
+        return self.get_message(
+            mail_file, outputText, '%d devices : %s' % (len(results), mail_file['sub']))
+
+    def get_message(self, mail_file, text, subject):
+        msg = MIMEMultipart()
+        part2 = MIMEText('outputText1', 'html')
+        part2.set_payload(text)
+        msg.attach(part2)
+        msg['Subject'] = subject
+        msg['From'] = mail_file['from']
+        to = mail_file['to']
+        msg['To'] = to if isinstance(to, basestring) else ', '.join(to)
+        return msg
+
+    def notify(self, mail_file, hostname, password, test_obj):
+        """
+        function to generate email, using jinja template in content.html
+        Mail is sent by background thread, if digest is True in mail file then
+        result is kept and sent in one mail for all devices by close()
+        :param m_file: main config file
+        :param hostname: device name
+        """
+        self.log_details['hostname'] = hostname
+        if mail_file.get('digest') is True:
+            key = (mail_file['from'], str(mail_file['to']), mail_file['sub'])
+            with self.lock:
+                self.digests.setdefault(
+                    key, (mail_file, password, []))[2].append((hostname, test_obj))
+            return
+        self.logger_notify.debug(
+            colorama.Fore.BLUE +
+            "Sending mail............", extra=self.log_details)
+        self.get_sender().send(
+            mail_file, password, self.render(mail_file, hostname, test_obj), hostname)
+
+    def close(self):
+        """
+        Send digest mails and wait for all mails to be sent
+        """
+        for mail_file, password, results in self.digests.values():
+            self.logger_notify.debug(
+                colorama.Fore.BLUE +
+                "Sending mail of %d devices............" % len(results),
+                extra={'hostname': None})
+            self.get_sender().send(
+                mail_file, password, self.render_digest(mail_file, results))
+        self.digests = {}
+        if self.sender is not None:
+            self.sender.close()
+            self.sender = None
@@ -6,6 +6,8 @@
 #
 
 import re
+import time
+import bisect
 import colorama
 import jinja2
 import logging
@@ -17,6 +19,9 @@ import traceback
 
 class Operator:
 
+    # compiled jinja templates of info and err messages, keyed by message
+    templates = {}
+
     def __init__(self):
         self.result = None
         self.no_failed = 0
@@ -26,11 +31,84 @@ class Operator:
         self.test_details = defaultdict(list)
         self.logger_testop = logging.getLogger(__name__)
         self.result_dict = {} #unlike test_details this is keyed on test_name
+        # if True, tests stop at first failure and passed nodes are not recorded
+        self.fail_fast = False
+        # True if some tests were stopped early because of fail_fast
+        self.truncated = False
+        # called with hostname, command/rpc, result and duration of the test
+        # as soon as a test is done
+        self.test_callback = None
+        # start time of running test and time taken by tests of the device
+        self.test_start = None
+        self.duration = None
+        # node records kept in test details: 'full', 'failures' or 'counts',
+        # and maximum number of records kept for each test
+        self.retention = 'full'
+        self.max_records = None
+        # if True, messages of single nodes are not logged, only result of
+        # every test
+        self.quiet_nodes = False
+        # lowest level written by handlers of logger, see _is_emitted
+        self.handler_level = None
+        # values of nodes shared by tests of one iterate/item block, see start_group
+        self.group = None
+        # empty node standing for every missing pre node
+        self.placeholder = etree.XML('<sample></sample>')
+        # nodes of xpaths evaluated on each snapshot and ids of nodes, shared
+        # by all tests of the device, see open_cache
+        self.node_cache = None
+        self.id_cache = None
 
     @property
     def test_results(self):
         return dict(self.test_details)
 
+    def add_test_result(self, teston, tresult):
+        """
+        Add result of a test to test details and pass it to test_callback
+        :param teston: command or rpc on which test is performed
+        :param tresult: dictionary containing result of the test
+        """
+        self.test_details[teston].append(tresult)
+        if self.test_callback is not None:
+            duration = None
+            if self.test_start is not None:
+                duration = time.time() - self.test_start
+            self.test_callback(self.device, teston, tresult, duration)
+        self.test_start = None
+
+    def get_results(self):
+        """
+        Return test results as picklable dictionary, used to send results
+        of a device from worker process
+        :return: dictionary containing results of all tests
+        """
+        return {'device': self.device,
+                'result': self.result,
+                'no_passed': self.no_passed,
+                'no_failed': self.no_failed,
+                'test_details': dict(self.test_details),
+                'result_dict': self.result_dict,
+                'truncated': self.truncated,
+                'duration': self.duration}
+
+    def merge_results(self, results):
+        """
+        Add results returned by get_results() to this object
+        :param results: dictionary returned by get_results()
+        """
+        self.device = results['device']
+        self.log_detail = {'hostname': results['device']}
+        self.no_passed = self.no_passed + results['no_passed']
+        self.no_failed = self.no_failed + results['no_failed']
+        for teston, details in results['test_details'].items():
+            self.test_details[teston].extend(details)
+        self.result_dict.update(results['result_dict'])
+        self.truncated = self.truncated or results.get('truncated', False)
+        self.duration = results.get('duration')
+        if self.result != "Failed":
+            self.result = results['result']
+
     def define_operator(
             self, logdetail, testop, x_path, ele_list, err_mssg, info_mssg, teston, iter, id, *args):
         """
@@ -49,6 +127,8 @@ class Operator:
         :return:
         """
         self.log_detail = logdetail
+        self.test_start = time.time()
+        self.handler_level = None
         try:
             getattr(
                 self,
@@ -99,19 +179,186 @@ class Operator:
             testmssg,
             extra=self.log_detail)
 
+    def _is_emitted(self, mode):
+        """
+        Check if message of given level would be written by some handler, so
+        that messages are not built only to be dropped
+        :param mode: "debug", "info" or "error"
+        :return: True if message is written
+        """
+        level = getattr(logging, mode.upper())
+        if not self.logger_testop.isEnabledFor(level):
+            return False
+        if self.handler_level is None:
+            levels = []
+            logger = self.logger_testop
+            while logger is not None:
+                levels.extend(handler.level for handler in logger.handlers)
+                if not logger.propagate:
+                    break
+                logger = logger.parent
+            self.handler_level = min(levels) if levels else logging.WARNING
+        return level >= self.handler_level
+
+    def _log_node(self, mode, mssg, *args):
+        """
+        Log message about single node, message is formatted with args by
+        logging module only if it is written
+        """
+        if not self.quiet_nodes:
+            getattr(self.logger_testop, mode)(mssg, *args, extra=self.log_detail)
+
     def _print_message(self, mssg, iddict, predict, postdict, mode="info"):
+        # info messages of passed nodes are not needed in fail_fast mode
+        if mode == "debug" and self.fail_fast:
+            return
+        if self.quiet_nodes or not self._is_emitted(mode):
+            return
         getattr(
             self.logger_testop,
             mode)(
-            jinja2.Template(mssg).render(
-                iddict,
-                pre=predict,
-                post=postdict),
+            self._render(mssg, iddict, predict, postdict),
             extra=self.log_detail)
 
+    def _render(self, mssg, iddict, predict, postdict):
+        """
+        Render message template, every template is compiled only once
+        """
+        template = self.templates.get(mssg)
+        if template is None:
+            template = self.templates[mssg] = jinja2.Template(mssg)
+        return template.render(iddict, pre=predict, post=postdict)
+
 # two for loops, one for xpath, other for iterating nodes inside xpath, if value is not
 # given for comparision, then it will take first value
 
+    def _stop_at_failure(self, tresult, res):
+        """
+        In fail_fast mode test is stopped once it has failed, remaining nodes
+        are not tested and test result is marked as truncated
+        :param tresult: result of test
+        :param res: result of test so far
+        :return: True if test should stop
+        """
+        if res is False and self.fail_fast:
+            tresult['truncated'] = True
+            self.truncated = True
+            return True
+        return False
+
+    def _add_passed(self, tresult, node_value_passed):
+        """
+        Record passed node in test result, skipped in fail_fast mode where
+        only failures matter and if only counts or failures are retained
+        """
+        if not self.fail_fast and self.retention == 'full':
+            self._add_record(tresult, 'passed', node_value_passed)
+
+    def _add_failed(self, tresult, node_value_failed):
+        """
+        Record failed node in test result, skipped if only counts are retained
+        """
+        if self.retention != 'counts':
+            self._add_record(tresult, 'failed', node_value_failed)
+
+    def _add_record(self, tresult, key, record):
+        """
+        Add copy of record to test result, unless test already has max_records
+        records, in which case only number of dropped records is kept
+        """
+        if self.max_records is not None and len(
+                tresult['passed']) + len(tresult['failed']) >= self.max_records:
+            tresult['dropped'] = tresult.get('dropped', 0) + 1
+        else:
+            tresult[key].append(deepcopy(record))
+
+    def open_cache(self):
+        """
+        Cache nodes found for xpaths on each snapshot and ids of nodes, so
+        same xpath used in different test files and test cases is evaluated
+        only once on a snapshot. Cache holds parsed snapshots, so it should
+        be released once tests of the device are done.
+        """
+        self.node_cache = {}
+        self.id_cache = {}
+
+    def release_cache(self):
+        """
+        Release nodes and ids cached by open_cache
+        """
+        self.node_cache = None
+        self.id_cache = None
+
+    def start_group(self, x_path, iter, id_list, elements, messages):
+        """
+        Tests of one iterate/item block share xpath and ids, so nodes, ids and
+        all referenced elements are extracted in a single pass over the node
+        set, done by first test of the block. Following tests only read
+        extracted values.
+        :param x_path: Xpath in test file
+        :param iter: if true, all nodes are tested, ow only first node
+        :param id_list: id list given in test file
+        :param elements: elements tested by tests of the block
+        :param messages: info and error messages of tests of the block
+        """
+        paths = list(id_list) + [e for e in elements if e not in id_list]
+        fields = []
+        for mssg in messages:
+            for _, field in self._get_fields(mssg):
+                if field not in fields:
+                    fields.append(field)
+        self.group = {'x_path': x_path,
+                      'iter': iter,
+                      'paths': paths,
+                      'fields': fields,
+                      'snaps': None,
+                      'nodes': None,
+                      'values': {}}
+
+    def end_group(self):
+        """
+        Release values extracted for tests of the block
+        """
+        self.group = None
+
+    def _extract_group(self, pre_nodes, post_nodes):
+        """
+        Single pass over pre and post nodes, extracting values of ids,
+        elements and message fields of all tests in the group
+        """
+        values = self.group['values']
+        for node in pre_nodes + post_nodes:
+            for path in self.group['paths']:
+                if (node, path) not in values:
+                    try:
+                        values[(node, path)] = node.xpath(path)
+                    except etree.XPathError:
+                        # left to the test, so it reports the error as usual
+                        pass
+            for field in self.group['fields']:
+                try:
+                    values[(node, field, 'text')] = node.findtext(field)
+                except (SyntaxError, KeyError):
+                    pass
+
+    def _node_xpath(self, node, path):
+        """
+        Return node.xpath(path), from values extracted for the group if present
+        """
+        if self.group is not None and (node, path) in self.group['values']:
+            found = self.group['values'][(node, path)]
+            # tests append placeholder nodes to node lists, so they get copies
+            return list(found) if isinstance(found, list) else found
+        return node.xpath(path)
+
+    def _node_text(self, node, path):
+        """
+        Return node.findtext(path), from values extracted for the group if present
+        """
+        if self.group is not None and (node, path, 'text') in self.group['values']:
+            return self.group['values'][(node, path, 'text')]
+        return node.findtext(path)
+
     def _find_xpath(self, iter, x_path, xml1=None, xml2=None):
         """
         this function will find pre and post nodes for given Xpath
@@ -121,25 +368,111 @@ class Operator:
         :param xml2: post snapshot
         :return: return prenodes and postnodes in given xpath
         """
-        if xml1 is not None:
-            pre_nodes = xml1.xpath(x_path)if iter else xml1.xpath(x_path)[0:1]
+        group = self.group
+        if group is not None and (group['x_path'], group['iter']) == (x_path, iter):
+            if group['snaps'] is None or group['snaps'][0] is not xml1 or group['snaps'][1] is not xml2:
+                group['values'] = {}
+                group['nodes'] = None
+                pre_nodes, post_nodes = self._search_xpath(iter, x_path, xml1, xml2)
+                group['snaps'] = (xml1, xml2)
+                group['nodes'] = (pre_nodes, post_nodes)
+                self._extract_group(pre_nodes, post_nodes)
+            pre_nodes, post_nodes = group['nodes']
+            # tests append placeholder nodes to these lists, so they get copies
+            post_nodes = list(post_nodes)
+            pre_nodes = post_nodes if group['nodes'][0] is group['nodes'][1] else list(pre_nodes)
+            return pre_nodes, post_nodes
+        return self._search_xpath(iter, x_path, xml1, xml2)
+
+    def _search_xpath(self, iter, x_path, xml1=None, xml2=None):
+        """
+        Evaluate given Xpath on pre and post snapshots, see _find_xpath
+        """
+        post_nodes = self._xpath_nodes(xml2, x_path, iter)
+        # identical pre and post snapshots are passed as one parsed tree
+        if xml1 is None or xml1 is xml2:
+            pre_nodes = post_nodes
         else:
-            pre_nodes = xml2.xpath(x_path) if iter else xml2.xpath(x_path)[0:1]
-        post_nodes = xml2.xpath(x_path) if iter else xml2.xpath(x_path)[0:1]
+            pre_nodes = self._xpath_nodes(xml1, x_path, iter)
         return pre_nodes, post_nodes
 
+    def _xpath_nodes(self, xml, x_path, iter):
+        """
+        Return nodes of snapshot in given Xpath, all of them if iter is true
+        ow only first one. Nodes are taken from cache if it is open.
+        """
+        if self.node_cache is None:
+            nodes = xml.xpath(x_path)
+        else:
+            if (xml, x_path) not in self.node_cache:
+                self.node_cache[(xml, x_path)] = xml.xpath(x_path)
+            nodes = self.node_cache[(xml, x_path)]
+            # tests append placeholder nodes to node lists, so they get copies
+            if isinstance(nodes, list):
+                nodes = list(nodes)
+        return nodes if iter else nodes[0:1]
+
+    def _get_ids(self, node, id_list):
+        """
+        Return values of ids for given node, taken from cache if it is open
+        """
+        key = ('xpath', node, tuple(id_list))
+        if self.id_cache is not None and key in self.id_cache:
+            return self.id_cache[key]
+        values = []
+        for id in id_list:
+            id_nodes = self._node_xpath(node, id)
+            values.append(id_nodes[0].text.strip() if id_nodes else None)
+        if self.id_cache is not None:
+            self.id_cache[key] = values
+        return values
+
+    def _align_nodes(self, id_list, pre_nodes, post_nodes):
+        """
+        Return pre node for every post node. Nodes are matched by values of
+        ids, if no id is given or ids of post node are not found then by
+        position. Missing pre nodes are replaced by placeholder node.
+        :param id_list: id list given in test file
+        :param pre_nodes: nodes of pre snapshot
+        :param post_nodes: nodes of post snapshot
+        :return: list of pre nodes, of same length as post nodes
+        """
+        if pre_nodes is post_nodes:
+            return pre_nodes
+        if not id_list:
+            return pre_nodes + [self.placeholder] * (len(post_nodes) - len(pre_nodes))
+        index = {}
+        for node in pre_nodes:
+            try:
+                key = tuple(self._get_ids(node, id_list))
+            except AttributeError:
+                continue
+            if any(val is not None for val in key):
+                index.setdefault(key, node)
+        aligned = []
+        for i in range(len(post_nodes)):
+            try:
+                key = tuple(self._get_ids(post_nodes[i], id_list))
+            except AttributeError:
+                key = (None,)
+            if any(val is not None for val in key):
+                aligned.append(index.get(key, self.placeholder))
+            else:
+                aligned.append(
+                    pre_nodes[i] if i < len(pre_nodes) else self.placeholder)
+        return aligned
+
     def _find_element(self, id_list, iddict, element, pre_node, post_node):
         """
         get element node for test operation
         Not used by "no-diff", "list-not-less", "list-not-more" and "delta" functions
         """
-        prenode = pre_node.xpath(element)
-        postnode = post_node.xpath(element)
+        prenode = self._node_xpath(pre_node, element)
+        postnode = self._node_xpath(post_node, element)
         id_val = {}
+        values = self._get_ids(post_node, id_list)
         for j in range(len(id_list)):
-            val = post_node.xpath(
-                id_list[j])[0].text.strip() if post_node.xpath(
-                id_list[j]) else None
+            val = values[j]
             iddict[
                 'id_' +
                 str(j)] = val
@@ -176,50 +509,112 @@ class Operator:
         :return: return dictionary containing ids and their respective values
         """
         data = {}
+        skip_null = self._is_ignore_null(ignore_null)
         #i = 0
         for path in nodes:
          #   i = i + 1
-            xlist = []
-            for id in id_list:
-                id_nodes = path.findall(id)
-                if self._is_ignore_null(ignore_null) and not id_nodes:
-                    continue
-                xlist.append(id_nodes)
-            # xlist = [path.findall(id) for id in id_list]
-            val = []
-            for values in xlist:
-                if values is not None:
-                    if isinstance(values, list):
-                        val1 = [v.text for v in values]
-                        val.append(tuple(val1))
-                    else:
-                        val.append(values.text)
+            key = ('findall', path, tuple(id_list), skip_null)
+            if self.id_cache is not None and key in self.id_cache:
+                val = self.id_cache[key]
+            else:
+                val = self._get_id_tuple(id_list, path, skip_null)
+                if self.id_cache is not None:
+                    self.id_cache[key] = val
           #  val.append(i)
             if val:
                 data[tuple(val)] = path
         
         return data
 
+    def _get_id_tuple(self, id_list, path, skip_null):
+        """
+        Return values of ids for given node, used as key by _get_data
+        """
+        xlist = []
+        for id in id_list:
+            id_nodes = path.findall(id)
+            if skip_null and not id_nodes:
+                continue
+            xlist.append(id_nodes)
+        # xlist = [path.findall(id) for id in id_list]
+        val = []
+        for values in xlist:
+            if values is not None:
+                if isinstance(values, list):
+                    val1 = [v.text for v in values]
+                    val.append(tuple(val1))
+                else:
+                    val.append(values.text)
+        return val
+
     def _get_nodevalue(
             self, predict, postdict, pre_nodes, post_nodes, x_path, element, mssg):
         """
         Used to calculate value of any node mentioned inside info and error messages
         """
-        mssg = re.findall('{{\s?(.*?)\s?}}', mssg)
-        for e in mssg:
-            if (e.startswith("post") or e.startswith("Post")):
-                val = e[6:-2]
-                if val not in [x_path, element]:
-                    postdict[val] = post_nodes.findtext(
-                        val).strip()if post_nodes.findtext(val) is not None else None
+        for side, val in self._get_fields(mssg):
+            if val in [x_path, element]:
+                continue
+            if side == 'post':
+                text = self._node_text(post_nodes, val)
+                postdict[val] = text.strip() if text is not None else None
+            else:
+                text = self._node_text(pre_nodes, val)
+                predict[val] = text.strip() if text is not None else None
+        return predict, postdict
 
+    def _get_fields(self, mssg):
+        """
+        Return nodes referred in info or error message as list of
+        ('pre' or 'post', node name)
+        """
+        fields = []
+        for e in re.findall('{{\s?(.*?)\s?}}', mssg):
+            if (e.startswith("post") or e.startswith("Post")):
+                fields.append(('post', e[6:-2]))
             if (e.startswith("pre") or e.startswith("PRE")):
-                val = e[5:-2]
-                if val not in [x_path, element]:
-                    predict[val] = pre_nodes.findtext(
-                        val).strip() if pre_nodes.findtext(val) is not None else None
-        return predict, postdict
+                fields.append(('pre', e[5:-2]))
+        return fields
+
+
+    def _compile_values(self, value_list):
+        """
+        Compile values of is-in and not-in into a set, numeric ranges like
+        100-200 are also compiled into sorted and merged intervals
+        :param value_list: values given in test file
+        :return: tuple of set of values, starts and ends of intervals
+        """
+        intervals = []
+        for value in value_list:
+            match = re.match('^\s*(\d+)\s*-\s*(\d+)\s*$', value)
+            if match:
+                start, end = int(match.group(1)), int(match.group(2))
+                intervals.append((min(start, end), max(start, end)))
+        starts = []
+        ends = []
+        for start, end in sorted(intervals):
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        return set(value_list), starts, ends
 
+    def _match_value(self, values, node_value):
+        """
+        Check if node value is one of values compiled by _compile_values
+        """
+        value_set, starts, ends = values
+        if node_value in value_set:
+            return True
+        if not starts or node_value is None:
+            return False
+        try:
+            number = float(node_value)
+        except ValueError:
+            return False
+        i = bisect.bisect_right(starts, number) - 1
+        return i >= 0 and number <= ends[i]
 
     def _is_ignore_null(self, ignore_null):
         if ignore_null and ((type(ignore_null) is bool and ignore_null is True) \
@@ -280,15 +675,15 @@ class Operator:
                         'post': postdict,
                         'actual_node_value': None,
                         'xpath_error': True}
-                    tresult['failed'].append(deepcopy(node_value_failed))
+                    self._add_failed(tresult, node_value_failed)
 
             else:
+                # pre node of every post node, matched by values of ids
+                pre_nodes = self._align_nodes(id_list, pre_nodes, post_nodes)
                 for i in range(len(post_nodes)):
+                    if self._stop_at_failure(tresult, res):
+                        break
                     #### get element node for test operation ####
-                    # if length of pre node is less than post node, assign
-                    # sample node
-                    if i >= len(pre_nodes):
-                        pre_nodes.append(etree.XML('<sample></sample>'))
                     iddict, prenode, postnode, id_val = self._find_element(
                         id_list, iddict, element, pre_nodes[i], post_nodes[i])
                     # calculate value of any node mentioned inside info and
@@ -302,9 +697,9 @@ class Operator:
 
                         for k in range(len(postnode)):
                             # if length of pre node is less than post node,
-                            # assign sample node
+                            # assign placeholder node
                             if k >= len(prenode):
-                                prenode.append(etree.XML('<sample></sample>'))
+                                prenode.append(self.placeholder)
 
                             predict, postdict, post_nodevalue, pre_nodevalue = self._find_value(
                                 predict, postdict, element, postnode[k], prenode[k])
@@ -314,8 +709,7 @@ class Operator:
                                 'pre': predict,
                                 'post': postdict,
                                 'actual_node_value': post_nodevalue}
-                            tresult['passed'].append(
-                                deepcopy(node_value_passed))
+                            self._add_passed(tresult, node_value_passed)
                             self._print_message(
                                 info_mssg,
                                 iddict,
@@ -336,7 +730,7 @@ class Operator:
                             'id': id_val,
                             'pre': predict,
                             'post': postdict}
-                        tresult['failed'].append(deepcopy(node_value_failed))
+                        self._add_failed(tresult, node_value_failed)
 
         if res is False:
             msg = 'All "%s" do not exists at xpath "%s" [ %d matched / %d failed ]' % (
@@ -351,7 +745,7 @@ class Operator:
         #tresult['err'] = err_mssg
         tresult['result'] = res
         tresult['count'] = {'pass': count_pass, 'fail': count_fail}
-        self.test_details[teston].append(tresult)
+        self.add_test_result(teston, tresult)
 
     def not_exists(self, x_path, ele_list, err_mssg, info_mssg,
                    teston, iter, id_list, xml1, xml2, ignore_null=None):
@@ -400,14 +794,14 @@ class Operator:
                         'post': postdict,
                         'actual_node_value': None,
                         'xpath_error': True}
-                    tresult['failed'].append(deepcopy(node_value_failed))
+                    self._add_failed(tresult, node_value_failed)
 
             else:
+                # pre node of every post node, matched by values of ids
+                pre_nodes = self._align_nodes(id_list, pre_nodes, post_nodes)
                 for i in range(len(post_nodes)):
-                    # if length of pre node is less than post node, assign
-                    # sample node
-                    if i >= len(pre_nodes):
-                        pre_nodes.append(etree.XML('<sample></sample>'))
+                    if self._stop_at_failure(tresult, res):
+                        break
                     iddict, prenode, postnode, id_val = self._find_element(
                         id_list, iddict, element, pre_nodes[i], post_nodes[i])
                     predict, postdict = self._get_nodevalue(
@@ -417,9 +811,9 @@ class Operator:
                     if postnode:
                         for k in range(len(postnode)):
                             # if length of pre node is less than post node,
-                            # assign sample node
+                            # assign placeholder node
                             if k >= len(prenode):
-                                prenode.append(etree.XML('<sample></sample>'))
+                                prenode.append(self.placeholder)
 
                             predict, postdict, post_nodevalue, pre_nodevalue = self._find_value(
                                 predict, postdict, element, postnode[k], prenode[k])
@@ -436,8 +830,7 @@ class Operator:
                                 'pre': predict,
                                 'post': postdict,
                                 'actual_node_value': post_nodevalue}
-                            tresult['failed'].append(
-                                deepcopy(node_value_failed))
+                            self._add_failed(tresult, node_value_failed)
                     else:
                         self._print_message(
                             info_mssg,
@@ -450,7 +843,7 @@ class Operator:
                             'id': id_val,
                             'PRE': predict,
                             'POST': postdict}
-                        tresult['passed'].append(deepcopy(node_value_passed))
+                        self._add_passed(tresult, node_value_passed)
         if res is False:
             msg = ' "%s" exists at xpath "%s" [ %d matched / %d failed ]' % (
                 element, x_path, count_pass, count_fail)
@@ -464,7 +857,7 @@ class Operator:
         #tresult['err'] = err_mssg
         tresult['result'] = res
         tresult['count'] = {'pass': count_pass, 'fail': count_fail}
-        self.test_details[teston].append(tresult)
+        self.add_test_result(teston, tresult)
 
     def all_same(
             self, x_path, ele_list, err_mssg, info_mssg, teston, iter, id_list, xml1, xml2, ignore_null=None):
@@ -512,7 +905,7 @@ class Operator:
                         'post': postdict,
                         'actual_node_value': None,
                         'xpath_error': True}
-                    tresult['failed'].append(deepcopy(node_value_failed))
+                    self._add_failed(tresult, node_value_failed)
 
             else:
                 if len(ele_list) >= 2:
@@ -548,17 +941,16 @@ class Operator:
                             'post': postdict,
                             'actual_node_value': None,
                             'xpath_error': True}
-                        tresult['failed'].append(deepcopy(node_value_failed))
+                        self._add_failed(tresult, node_value_failed)
 
                 else:
                     
                     tresult['expected_node_value'] = value
+                    # pre node of every post node, matched by values of ids
+                    pre_nodes = self._align_nodes(id_list, pre_nodes, post_nodes)
                     for i in range(len(post_nodes)):
-                        # if length of pre node is less than post node, assign
-                        # sample xml element node
-                        if i >= len(pre_nodes):
-                            pre_nodes.append(etree.XML('<sample></sample>'))
-
+                        if self._stop_at_failure(tresult, res):
+                            break
                         iddict, prenode, postnode, id_val = self._find_element(
                             id_list, iddict, element, pre_nodes[i], post_nodes[i])
                         predict, postdict = self._get_nodevalue(
@@ -568,9 +960,9 @@ class Operator:
                         if postnode:
                             for k in range(len(postnode)):
                                 # if length of pre node is less than post node,
-                                # assign sample node
+                                # assign placeholder node
                                 if k >= len(prenode):
-                                    prenode.append(etree.XML('<sample></sample>'))
+                                    prenode.append(self.placeholder)
 
                                 predict, postdict, post_nodevalue, pre_nodevalue = self._find_value(
                                     predict, postdict, element, postnode[k], prenode[k])
@@ -588,8 +980,7 @@ class Operator:
                                         'pre': predict,
                                         'post': postdict,
                                         'actual_node_value': post_nodevalue}
-                                    tresult['failed'].append(
-                                        deepcopy(node_value_failed))
+                                    self._add_failed(tresult, node_value_failed)
                                 else:
                                     count_pass = count_pass + 1
                                     self._print_message(
@@ -603,29 +994,24 @@ class Operator:
                                         'pre': predict,
                                         'post': postdict,
                                         'actual_node_value': post_nodevalue}
-                                    tresult['passed'].append(
-                                        deepcopy(node_value_passed))
+                                    self._add_passed(tresult, node_value_passed)
                         else:
                             #this condition arises when certain parent nodes don't have the searched child node.
                             #If ignore-null is True then we skip those cases else raise an error
                             if self._is_ignore_null(ignore_null):
-                                self.logger_testop.debug(colorama.Fore.YELLOW +
-                                            "SKIPPING!! Node <{}> not found at xpath <{}> for IDs: {}".format(
-                                                element, 
-                                                x_path, 
-                                                id_val),
-                                            extra=self.log_detail)
+                                self._log_node("debug", colorama.Fore.YELLOW + "SKIPPING!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                               element, x_path, id_val)
                                 is_skipped = True
                                 continue
                             
-                            self.logger_testop.error(colorama.Fore.RED +
-                                                    "ERROR!! Node <{}> not found at xpath <{}> for IDs: {}".format(element, x_path, id_val), extra=self.log_detail)
+                            self._log_node("error", colorama.Fore.RED + "ERROR!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                           element, x_path, id_val)
                             node_value_failed = {
                                 'id': id_val,
                                 'pre': predict,
                                 'post': postdict,
                                 'actual_node_value': None}
-                            tresult['failed'].append(deepcopy(node_value_failed))
+                            self._add_failed(tresult, node_value_failed)
                             res = False
                             count_fail = count_fail + 1
 
@@ -644,7 +1030,7 @@ class Operator:
         #tresult['err'] = err_mssg
         tresult['result'] = res
         tresult['count'] = {'pass': count_pass, 'fail': count_fail}
-        self.test_details[teston].append(tresult)
+        self.add_test_result(teston, tresult)
 
     def is_equal(
             self, x_path, ele_list, err_mssg, info_mssg, teston, iter, id_list, xml1, xml2, ignore_null=None):
@@ -696,16 +1082,14 @@ class Operator:
                         'post': postdict,
                         'actual_node_value': None,
                         'xpath_error': True}
-                    tresult['failed'].append(deepcopy(node_value_failed))
+                    self._add_failed(tresult, node_value_failed)
 
             else:
+                # pre node of every post node, matched by values of ids
+                pre_nodes = self._align_nodes(id_list, pre_nodes, post_nodes)
                 for i in range(len(post_nodes)):
-                    # if length of pre node is less than post node, assign
-                    # sample xml element node
-
-                    if i >= len(pre_nodes):
-                        pre_nodes.append(etree.XML('<sample></sample>'))
-
+                    if self._stop_at_failure(tresult, res):
+                        break
                     iddict, prenode, postnode, id_val = self._find_element(
                         id_list, iddict, element, pre_nodes[i], post_nodes[i])
                     predict, postdict = self._get_nodevalue(
@@ -716,9 +1100,9 @@ class Operator:
                     if postnode:
                         for k in range(len(postnode)):
                             # if length of pre node is less than post node,
-                            # assign sample node
+                            # assign placeholder node
                             if k >= len(prenode):
-                                prenode.append(etree.XML('<sample></sample>'))
+                                prenode.append(self.placeholder)
 
                             predict, postdict, post_nodevalue, pre_nodevalue = self._find_value(
                                 predict, postdict, element, postnode[k], prenode[k])
@@ -729,8 +1113,7 @@ class Operator:
                                     'pre': predict,
                                     'post': postdict,
                                     'actual_node_value': post_nodevalue}
-                                tresult['passed'].append(
-                                    deepcopy(node_value_passed))
+                                self._add_passed(tresult, node_value_passed)
                                 count_pass = count_pass + 1
                                 self._print_message(
                                     info_mssg,
@@ -744,8 +1127,7 @@ class Operator:
                                     'pre': predict,
                                     'post': postdict,
                                     'actual_node_value': post_nodevalue}
-                                tresult['failed'].append(
-                                    deepcopy(node_value_failed))
+                                self._add_failed(tresult, node_value_failed)
                                 res = False
                                 count_fail = count_fail + 1
                                 self._print_message(
@@ -757,23 +1139,19 @@ class Operator:
                     else:
                         ##
                         if self._is_ignore_null(ignore_null):
-                            self.logger_testop.debug(colorama.Fore.YELLOW +
-                                        "SKIPPING!! Node <{}> not found at xpath <{}> for IDs: {}".format(
-                                            element, 
-                                            x_path, 
-                                            id_val),
-                                        extra=self.log_detail)
+                            self._log_node("debug", colorama.Fore.YELLOW + "SKIPPING!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                           element, x_path, id_val)
                             is_skipped = True
                             continue
 
-                        self.logger_testop.error(colorama.Fore.RED +
-                                                 "ERROR!! Node <{}> not found at xpath <{}> for IDs: {}".format(element, x_path, id_val), extra=self.log_detail)
+                        self._log_node("error", colorama.Fore.RED + "ERROR!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                       element, x_path, id_val)
                         node_value_failed = {
                             'id': id_val,
                             'pre': predict,
                             'post': postdict,
                             'actual_node_value': None}
-                        tresult['failed'].append(deepcopy(node_value_failed))
+                        self._add_failed(tresult, node_value_failed)
                         res = False
                         count_fail = count_fail + 1
         
@@ -791,7 +1169,7 @@ class Operator:
         #tresult['err'] = err_mssg
         tresult['result'] = res
         tresult['count'] = {'pass': count_pass, 'fail': count_fail}
-        self.test_details[teston].append(tresult)
+        self.add_test_result(teston, tresult)
 
     def not_equal(
             self, x_path, ele_list, err_mssg, info_mssg, teston, iter, id_list, xml1, xml2, ignore_null=None):
@@ -842,15 +1220,14 @@ class Operator:
                         'post': postdict,
                         'actual_node_value': None,
                         'xpath_error': True}
-                    tresult['failed'].append(deepcopy(node_value_failed))
+                    self._add_failed(tresult, node_value_failed)
 
             else:
+                # pre node of every post node, matched by values of ids
+                pre_nodes = self._align_nodes(id_list, pre_nodes, post_nodes)
                 for i in range(len(post_nodes)):
-                    # if length of pre node is less than post node, assign
-                    # sample xml element node
-                    if i >= len(pre_nodes):
-                        pre_nodes.append(etree.XML('<sample></sample>'))
-
+                    if self._stop_at_failure(tresult, res):
+                        break
                     iddict, prenode, postnode, id_val = self._find_element(
                         id_list, iddict, element, pre_nodes[i], post_nodes[i])
                     predict, postdict = self._get_nodevalue(
@@ -860,9 +1237,9 @@ class Operator:
                     if postnode:
                         for k in range(len(postnode)):
                             # if length of pre node is less than post node,
-                            # assign sample node
+                            # assign placeholder node
                             if k >= len(prenode):
-                                prenode.append(etree.XML('<sample></sample>'))
+                                prenode.append(self.placeholder)
 
                             predict, postdict, post_nodevalue, pre_nodevalue = self._find_value(
                                 predict, postdict, element, postnode[k], prenode[k])
@@ -872,8 +1249,7 @@ class Operator:
                                     'pre': predict,
                                     'post': postdict,
                                     'actual_node_value': post_nodevalue}
-                                tresult['passed'].append(
-                                    deepcopy(node_value_passed))
+                                self._add_passed(tresult, node_value_passed)
                                 self._print_message(
                                     info_mssg,
                                     iddict,
@@ -887,8 +1263,7 @@ class Operator:
                                     'pre': predict,
                                     'post': postdict,
                                     'actual_node_value': post_nodevalue}
-                                tresult['failed'].append(
-                                    deepcopy(node_value_failed))
+                                self._add_failed(tresult, node_value_failed)
                                 res = False
                                 self._print_message(
                                     err_mssg,
@@ -902,17 +1277,13 @@ class Operator:
                         
                         ##
                         if self._is_ignore_null(ignore_null):
-                            self.logger_testop.debug(colorama.Fore.YELLOW +
-                                        "SKIPPING!! Node <{}> not found at xpath <{}> for IDs: {}".format(
-                                            element, 
-                                            x_path,
-                                            id_val),
-                                        extra=self.log_detail)
+                            self._log_node("debug", colorama.Fore.YELLOW + "SKIPPING!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                           element, x_path, id_val)
                             is_skipped = True
                             continue
                         
-                        self.logger_testop.error(colorama.Fore.RED + "ERROR!! Node <{}> not found at xpath <{}> for IDs: {}".format(element, x_path,
-                                                                                                                                    id_val), extra=self.log_detail)
+                        self._log_node("error", colorama.Fore.RED + "ERROR!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                       element, x_path, id_val)
                         res = False
                         count_fail = count_fail + 1
                         node_value_failed = {
@@ -920,7 +1291,7 @@ class Operator:
                             'pre': predict,
                             'post': postdict,
                             'actual_node_value': None}
-                        tresult['failed'].append(deepcopy(node_value_failed))
+                        self._add_failed(tresult, node_value_failed)
 
         if not( is_skipped and count_fail == 0 and count_pass == 0 ):
             if res is False:
@@ -936,7 +1307,7 @@ class Operator:
         #tresult['err'] = err_mssg
         tresult['result'] = res
         tresult['count'] = {'pass': count_pass, 'fail': count_fail}
-        self.test_details[teston].append(tresult)
+        self.add_test_result(teston, tresult)
 
     def in_range(
             self, x_path, ele_list, err_mssg, info_mssg, teston, iter, id_list, xml1, xml2, ignore_null=None):
@@ -995,15 +1366,14 @@ class Operator:
                             'post': postdict,
                             'actual_node_value': None,
                             'xpath_error': True}
-                        tresult['failed'].append(deepcopy(node_value_failed))
+                        self._add_failed(tresult, node_value_failed)
 
                 else:
+                    # pre node of every post node, matched by values of ids
+                    pre_nodes = self._align_nodes(id_list, pre_nodes, post_nodes)
                     for i in range(len(post_nodes)):
-                        # if length of pre node is less than post node, assign
-                        # sample xml element node
-                        if i >= len(pre_nodes):
-                            pre_nodes.append(etree.XML('<sample></sample>'))
-
+                        if self._stop_at_failure(tresult, res):
+                            break
                         iddict, prenode, postnode, id_val = self._find_element(
                             id_list, iddict, element, pre_nodes[i], post_nodes[i])
                         predict, postdict = self._get_nodevalue(
@@ -1013,10 +1383,9 @@ class Operator:
                         if postnode:
                             for k in range(len(postnode)):
                                 # if length of pre node is less than post node,
-                                # assign sample node
+                                # assign placeholder node
                                 if k >= len(prenode):
-                                    prenode.append(
-                                        etree.XML('<sample></sample>'))
+                                    prenode.append(self.placeholder)
 
                                 predict, postdict, post_nodevalue, pre_nodevalue = self._find_value(
                                     predict, postdict, element, postnode[k], prenode[k])
@@ -1034,8 +1403,7 @@ class Operator:
                                         'pre': predict,
                                         'post': postdict,
                                         'actual_node_value': post_nodevalue}
-                                    tresult['passed'].append(
-                                        deepcopy(node_value_passed))
+                                    self._add_passed(tresult, node_value_passed)
                                 else:
                                     res = False
                                     self._print_message(
@@ -1050,23 +1418,18 @@ class Operator:
                                         'pre': predict,
                                         'post': postdict,
                                         'actual_node_value': post_nodevalue}
-                                    tresult['failed'].append(
-                                        deepcopy(node_value_failed))
+                                    self._add_failed(tresult, node_value_failed)
 
                         else:
                             ##
                             if self._is_ignore_null(ignore_null):
-                                self.logger_testop.debug(colorama.Fore.YELLOW +
-                                            "SKIPPING!! Node <{}> not found at xpath <{}> for IDs: {}".format(
-                                                element, 
-                                                x_path, 
-                                                id_val),
-                                            extra=self.log_detail)
+                                self._log_node("debug", colorama.Fore.YELLOW + "SKIPPING!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                               element, x_path, id_val)
                                 is_skipped = True
                                 continue
                             
-                            self.logger_testop.error(colorama.Fore.RED + "ERROR!! Node <{}> not found at xpath <{}> for IDs: {}".format(element, x_path,
-                                                                                                                                        id_val), extra=self.log_detail)
+                            self._log_node("error", colorama.Fore.RED + "ERROR!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                           element, x_path, id_val)
                             res = False
                             count_fail = count_fail + 1
                             node_value_failed = {
@@ -1074,8 +1437,7 @@ class Operator:
                                 'pre': predict,
                                 'post': postdict,
                                 'actual_node_value': None}
-                            tresult['failed'].append(
-                                deepcopy(node_value_failed))
+                            self._add_failed(tresult, node_value_failed)
         
         if not ( is_skipped and count_fail == 0 and count_pass == 0 ): 
             if res is False:
@@ -1091,7 +1453,7 @@ class Operator:
         #tresult['err'] = err_mssg
         tresult['result'] = res
         tresult['count'] = {'pass': count_pass, 'fail': count_fail}
-        self.test_details[teston].append(tresult)
+        self.add_test_result(teston, tresult)
 
     def not_range(
             self, x_path, ele_list, err_mssg, info_mssg, teston, iter, id_list, xml1, xml2, ignore_null=None):
@@ -1151,15 +1513,14 @@ class Operator:
                             'post': postdict,
                             'actual_node_value': None,
                             'xpath_error': True}
-                        tresult['failed'].append(deepcopy(node_value_failed))
+                        self._add_failed(tresult, node_value_failed)
 
                 else:
+                    # pre node of every post node, matched by values of ids
+                    pre_nodes = self._align_nodes(id_list, pre_nodes, post_nodes)
                     for i in range(len(post_nodes)):
-                        # if length of pre node is less than post node, assign
-                        # sample xml element node
-                        if i >= len(pre_nodes):
-                            pre_nodes.append(etree.XML('<sample></sample>'))
-
+                        if self._stop_at_failure(tresult, res):
+                            break
                         iddict, prenode, postnode, id_val = self._find_element(
                             id_list, iddict, element, pre_nodes[i], post_nodes[i])
                         predict, postdict = self._get_nodevalue(
@@ -1169,10 +1530,9 @@ class Operator:
                         if postnode:
                             for k in range(len(postnode)):
                                 # if length of pre node is less than post node,
-                                # assign sample node
+                                # assign placeholder node
                                 if k >= len(prenode):
-                                    prenode.append(
-                                        etree.XML('<sample></sample>'))
+                                    prenode.append(self.placeholder)
 
                                 predict, postdict, post_nodevalue, pre_nodevalue = self._find_value(
                                     predict, postdict, element, postnode[k], prenode[k])
@@ -1190,8 +1550,7 @@ class Operator:
                                         'pre': predict,
                                         'post': postdict,
                                         'actual_node_value': post_nodevalue}
-                                    tresult['passed'].append(
-                                        deepcopy(node_value_passed))
+                                    self._add_passed(tresult, node_value_passed)
                                 else:
                                     res = False
                                     count_fail = count_fail + 1
@@ -1206,23 +1565,18 @@ class Operator:
                                         'pre': predict,
                                         'post': postdict,
                                         'actual_node_value': post_nodevalue}
-                                    tresult['failed'].append(
-                                        deepcopy(node_value_failed))
+                                    self._add_failed(tresult, node_value_failed)
                         else:
                             ##
                             if self._is_ignore_null(ignore_null):
-                                self.logger_testop.debug(colorama.Fore.YELLOW +
-                                            "SKIPPING!! Node <{}> not found at xpath <{}> for IDs: {}".format(
-                                                element, 
-                                                x_path, 
-                                                id_val),
-                                            extra=self.log_detail)
+                                self._log_node("debug", colorama.Fore.YELLOW + "SKIPPING!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                               element, x_path, id_val)
                                 is_skipped = True
                                 continue
                             
                             
-                            self.logger_testop.error(colorama.Fore.RED + "ERROR!! Node <{}> not found at xpath <{}> for IDs: {}".format(element, x_path,
-                                                                                                                                        id_val), extra=self.log_detail)
+                            self._log_node("error", colorama.Fore.RED + "ERROR!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                           element, x_path, id_val)
                             res = False
                             count_fail = count_fail + 1
                             node_value_failed = {
@@ -1230,8 +1584,7 @@ class Operator:
                                 'pre': predict,
                                 'post': postdict,
                                 'actual_node_value': None}
-                            tresult['failed'].append(
-                                deepcopy(node_value_failed))
+                            self._add_failed(tresult, node_value_failed)
         
         if not ( is_skipped and count_fail == 0 and count_pass == 0 ):
             if res is False:
@@ -1247,7 +1600,7 @@ class Operator:
         #tresult['err'] = err_mssg
         tresult['result'] = res
         tresult['count'] = {'pass': count_pass, 'fail': count_fail}
-        self.test_details[teston].append(tresult)
+        self.add_test_result(teston, tresult)
 
     def is_gt(self, x_path, ele_list, err_mssg,
               info_mssg, teston, iter, id_list, xml1, xml2, ignore_null=None):
@@ -1297,15 +1650,14 @@ class Operator:
                         'post': postdict,
                         'actual_node_value': None,
                         'xpath_error': True}
-                    tresult['failed'].append(deepcopy(node_value_failed))
+                    self._add_failed(tresult, node_value_failed)
 
             else:
+                # pre node of every post node, matched by values of ids
+                pre_nodes = self._align_nodes(id_list, pre_nodes, post_nodes)
                 for i in range(len(post_nodes)):
-                    # if length of pre node is less than post node, assign
-                    # sample xml element node
-                    if i >= len(pre_nodes):
-                        pre_nodes.append(etree.XML('<sample></sample>'))
-
+                    if self._stop_at_failure(tresult, res):
+                        break
                     iddict, prenode, postnode, id_val = self._find_element(
                         id_list, iddict, element, pre_nodes[i], post_nodes[i])
                     predict, postdict = self._get_nodevalue(
@@ -1315,9 +1667,9 @@ class Operator:
                     if postnode:
                         for j in range(len(postnode)):
                             # if length of pre node is less than post node,
-                            # assign sample node
+                            # assign placeholder node
                             if j >= len(prenode):
-                                prenode.append(etree.XML('<sample></sample>'))
+                                prenode.append(self.placeholder)
 
                             predict, postdict, post_nodevalue, pre_nodevalue = self._find_value(
                                 predict, postdict, element, postnode[j], prenode[j])
@@ -1334,8 +1686,7 @@ class Operator:
                                     'pre': predict,
                                     'post': postdict,
                                     'actual_node_value': post_nodevalue}
-                                tresult['passed'].append(
-                                    deepcopy(node_value_passed))
+                                self._add_passed(tresult, node_value_passed)
                             else:
                                 res = False
                                 self._print_message(
@@ -1350,23 +1701,18 @@ class Operator:
                                     'pre': predict,
                                     'post': postdict,
                                     'actual_node_value': post_nodevalue}
-                                tresult['failed'].append(
-                                    deepcopy(node_value_failed))
+                                self._add_failed(tresult, node_value_failed)
 
                     else:
                         ##
                         if self._is_ignore_null(ignore_null):
-                            self.logger_testop.debug(colorama.Fore.YELLOW +
-                                        "SKIPPING!! Node <{}> not found at xpath <{}> for IDs: {}".format(
-                                            element,
-                                            x_path, 
-                                            id_val),
-                                        extra=self.log_detail)
+                            self._log_node("debug", colorama.Fore.YELLOW + "SKIPPING!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                           element, x_path, id_val)
                             is_skipped = True
                             continue
 
-                        self.logger_testop.error(colorama.Fore.RED + "ERROR!! Node <{}> not found at xpath <{}> for IDs: {}".format(element, x_path,
-                                                                                                                                    id_val), extra=self.log_detail)
+                        self._log_node("error", colorama.Fore.RED + "ERROR!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                       element, x_path, id_val)
                         res = False
                         count_fail = count_fail + 1
                         node_value_failed = {
@@ -1374,7 +1720,7 @@ class Operator:
                             'pre': predict,
                             'post': postdict,
                             'actual_node_value': None}
-                        tresult['failed'].append(deepcopy(node_value_failed))
+                        self._add_failed(tresult, node_value_failed)
 
         if not ( is_skipped and count_fail == 0 and count_pass == 0 ):
             if res is False:
@@ -1390,7 +1736,7 @@ class Operator:
         #tresult['err'] = err_mssg
         tresult['result'] = res
         tresult['count'] = {'pass': count_pass, 'fail': count_fail}
-        self.test_details[teston].append(tresult)
+        self.add_test_result(teston, tresult)
 
     def is_lt(self, x_path, ele_list, err_mssg,
               info_mssg, teston, iter, id_list, xml1, xml2, ignore_null=None):
@@ -1442,14 +1788,13 @@ class Operator:
                         'post': postdict,
                         'actual_node_value': None,
                         'xpath_error': True}
-                    tresult['failed'].append(deepcopy(node_value_failed))
+                    self._add_failed(tresult, node_value_failed)
             else:
+                # pre node of every post node, matched by values of ids
+                pre_nodes = self._align_nodes(id_list, pre_nodes, post_nodes)
                 for i in range(len(post_nodes)):
-                    # if length of pre node is less than post node, assign
-                    # sample xml element node
-                    if i >= len(pre_nodes):
-                        pre_nodes.append(etree.XML('<sample></sample>'))
-
+                    if self._stop_at_failure(tresult, res):
+                        break
                     iddict, prenode, postnode, id_val = self._find_element(
                         id_list, iddict, element, pre_nodes[i], post_nodes[i])
                     predict, postdict = self._get_nodevalue(
@@ -1459,9 +1804,9 @@ class Operator:
                     if postnode:
                         for k in range(len(postnode)):
                             # if length of pre node is less than post node,
-                            # assign sample node
+                            # assign placeholder node
                             if k >= len(prenode):
-                                prenode.append(etree.XML('<sample></sample>'))
+                                prenode.append(self.placeholder)
 
                             predict, postdict, post_nodevalue, pre_nodevalue = self._find_value(
                                 predict, postdict, element, postnode[k], prenode[k])
@@ -1478,8 +1823,7 @@ class Operator:
                                     'pre': predict,
                                     'post': postdict,
                                     'actual_node_value': post_nodevalue}
-                                tresult['passed'].append(
-                                    deepcopy(node_value_passed))
+                                self._add_passed(tresult, node_value_passed)
                             else:
                                 res = False
                                 self._print_message(
@@ -1494,22 +1838,17 @@ class Operator:
                                     'pre': predict,
                                     'post': postdict,
                                     'actual_node_value': post_nodevalue}
-                                tresult['failed'].append(
-                                    deepcopy(node_value_failed))
+                                self._add_failed(tresult, node_value_failed)
                     else:
                         ##
                         if self._is_ignore_null(ignore_null):
-                            self.logger_testop.debug(colorama.Fore.YELLOW +
-                                        "SKIPPING!! Node <{}> not found at xpath <{}> for IDs: {}".format(
-                                            element, 
-                                            x_path, 
-                                            id_val),
-                                        extra=self.log_detail)
+                            self._log_node("debug", colorama.Fore.YELLOW + "SKIPPING!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                           element, x_path, id_val)
                             is_skipped = True
                             continue
                         
-                        self.logger_testop.error(colorama.Fore.RED + "ERROR!! Node <{}> not found at xpath <{}> for IDs: {}".format(element, x_path,
-                                                                                                                                    id_val), extra=self.log_detail)
+                        self._log_node("error", colorama.Fore.RED + "ERROR!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                       element, x_path, id_val)
                         res = False
                         count_fail = count_fail + 1
                         node_value_failed = {
@@ -1517,7 +1856,7 @@ class Operator:
                             'pre': predict,
                             'post': postdict,
                             'actual_node_value': None}
-                        tresult['failed'].append(deepcopy(node_value_failed))
+                        self._add_failed(tresult, node_value_failed)
 
         if not ( is_skipped and count_fail == 0 and count_pass == 0 ):
             if res is False:
@@ -1533,7 +1872,7 @@ class Operator:
         #tresult['err'] = err_mssg
         tresult['result'] = res
         tresult['count'] = {'pass': count_pass, 'fail': count_fail}
-        self.test_details[teston].append(tresult)
+        self.add_test_result(teston, tresult)
 
     def contains(self, x_path, ele_list, err_mssg, info_mssg,
                  teston, iter, id_list, xml1, xml2, ignore_null=None):
@@ -1584,14 +1923,14 @@ class Operator:
                         'post': postdict,
                         'actual_node_value': None,
                         'xpath_error': True}
-                    tresult['failed'].append(deepcopy(node_value_failed))
+                    self._add_failed(tresult, node_value_failed)
 
             else:
+                # pre node of every post node, matched by values of ids
+                pre_nodes = self._align_nodes(id_list, pre_nodes, post_nodes)
                 for i in range(len(post_nodes)):
-                    # if length of pre node is less than post node, assign
-                    # sample xml element node
-                    if i >= len(pre_nodes):
-                        pre_nodes.append(etree.XML('<sample></sample>'))
+                    if self._stop_at_failure(tresult, res):
+                        break
                     iddict, prenode, postnode, id_val = self._find_element(
                         id_list, iddict, element, pre_nodes[i], post_nodes[i])
                     predict, postdict = self._get_nodevalue(
@@ -1602,9 +1941,9 @@ class Operator:
                     if postnode:
                         for k in range(len(postnode)):
                             # if length of pre node is less than post node,
-                            # assign sample node
+                            # assign placeholder node
                             if k >= len(prenode):
-                                prenode.append(etree.XML('<sample></sample>'))
+                                prenode.append(self.placeholder)
 
                             predict[element] = prenode[k].text
                             postdict[element] = postnode[k].text
@@ -1622,8 +1961,7 @@ class Operator:
                                     'pre': predict,
                                     'post': postdict,
                                     'actual_node_value': postnode[k].text}
-                                tresult['failed'].append(
-                                    deepcopy(node_value_failed))
+                                self._add_failed(tresult, node_value_failed)
                             else:
                                 count_pass = count_pass + 1
                                 self._print_message(
@@ -1637,24 +1975,18 @@ class Operator:
                                     'pre': predict,
                                     'post': postdict,
                                     'actual_node_value': postnode[k].text}
-                                tresult['passed'].append(
-                                    deepcopy(node_value_passed))
+                                self._add_passed(tresult, node_value_passed)
                     else:
                         
                         ##
                         if self._is_ignore_null(ignore_null):
-                            self.logger_testop.debug(colorama.Fore.YELLOW +
-                                        "SKIPPING!! Node <{}> not found at xpath <{}> for IDs: {}".format(
-                                            element, 
-                                            x_path, 
-                                            id_val
-                                            ),
-                                        extra=self.log_detail)
+                            self._log_node("debug", colorama.Fore.YELLOW + "SKIPPING!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                           element, x_path, id_val)
                             is_skipped = True
                             continue
                         
-                        self.logger_testop.error(colorama.Fore.RED + "ERROR!! Node <{}> not found at xpath <{}> for IDs: {}".format(element, x_path,
-                                                                                                                                    id_val), extra=self.log_detail)
+                        self._log_node("error", colorama.Fore.RED + "ERROR!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                       element, x_path, id_val)
                         res = False
                         count_fail = count_fail + 1
                         node_value_failed = {
@@ -1662,7 +1994,7 @@ class Operator:
                             'pre': predict,
                             'post': postdict,
                             'actual_node_value': None}
-                        tresult['failed'].append(deepcopy(node_value_failed))
+                        self._add_failed(tresult, node_value_failed)
         
         if not ( is_skipped and count_fail == 0 and count_pass == 0 ):
             if res is False:
@@ -1678,7 +2010,7 @@ class Operator:
         #tresult['err'] = err_mssg
         tresult['result'] = res
         tresult['count'] = {'pass': count_pass, 'fail': count_fail}
-        self.test_details[teston].append(tresult)
+        self.add_test_result(teston, tresult)
 
     def is_in(self, x_path, ele_list, err_mssg,
               info_mssg, teston, iter, id_list, xml1, xml2, ignore_null=None):
@@ -1702,6 +2034,7 @@ class Operator:
         try:
             element = ele_list[0]
             value_list = ele_list[1:]
+            values = self._compile_values(value_list)
         except IndexError as e:
             self.logger_testop.error(colorama.Fore.RED +
                                      "\nError occurred while accessing test element %s" % e.message, extra=self.log_detail)
@@ -1731,15 +2064,14 @@ class Operator:
                         'post': postdict,
                         'actual_node_value': None,
                         'xpath_error': True}
-                    tresult['failed'].append(deepcopy(node_value_failed))
+                    self._add_failed(tresult, node_value_failed)
 
             else:
+                # pre node of every post node, matched by values of ids
+                pre_nodes = self._align_nodes(id_list, pre_nodes, post_nodes)
                 for i in range(len(post_nodes)):
-                    # if length of pre node is less than post node, assign
-                    # sample xml element node
-                    if i >= len(pre_nodes):
-                        pre_nodes.append(etree.XML('<sample></sample>'))
-
+                    if self._stop_at_failure(tresult, res):
+                        break
                     iddict, prenode, postnode, id_val = self._find_element(
                         id_list, iddict, element, pre_nodes[i], post_nodes[i])
                     predict, postdict = self._get_nodevalue(
@@ -1750,13 +2082,13 @@ class Operator:
                     if postnode:
                         for k in range(len(postnode)):
                             # if length of pre node is less than post node,
-                            # assign sample node
+                            # assign placeholder node
                             if k >= len(prenode):
-                                prenode.append(etree.XML('<sample></sample>'))
+                                prenode.append(self.placeholder)
 
                             predict, postdict, post_nodevalue, pre_nodevalue = self._find_value(
                                 predict, postdict, element, postnode[k], prenode[k])
-                            if (post_nodevalue in value_list):
+                            if self._match_value(values, post_nodevalue):
                                 self._print_message(
                                     info_mssg,
                                     iddict,
@@ -1769,8 +2101,7 @@ class Operator:
                                     'pre': predict,
                                     'post': postdict,
                                     'actual_node_value': post_nodevalue}
-                                tresult['passed'].append(
-                                    deepcopy(node_value_passed))
+                                self._add_passed(tresult, node_value_passed)
                             else:
                                 res = False
                                 count_fail = count_fail + 1
@@ -1785,24 +2116,18 @@ class Operator:
                                     'pre': predict,
                                     'post': postdict,
                                     'actual_node_value': post_nodevalue}
-                                tresult['failed'].append(
-                                    deepcopy(node_value_failed))
+                                self._add_failed(tresult, node_value_failed)
                     else:
                         
                         ##
                         if self._is_ignore_null(ignore_null):
-                            self.logger_testop.debug(colorama.Fore.YELLOW +
-                                        "SKIPPING!! Node <{}> not found at xpath <{}> for IDs: {}".format(
-                                            element, 
-                                            x_path, 
-                                            id_val
-                                            ),
-                                        extra=self.log_detail)
+                            self._log_node("debug", colorama.Fore.YELLOW + "SKIPPING!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                           element, x_path, id_val)
                             is_skipped = True
                             continue
                             
-                        self.logger_testop.error(colorama.Fore.RED + "ERROR!! Node <{}> not found at xpath <{}> for IDs: {}".format(element, x_path,
-                                                                                                                                    id_val), extra=self.log_detail)
+                        self._log_node("error", colorama.Fore.RED + "ERROR!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                       element, x_path, id_val)
                         res = False
                         count_fail = count_fail + 1
                         node_value_failed = {
@@ -1810,7 +2135,7 @@ class Operator:
                             'pre': predict,
                             'post': postdict,
                             'actual_node_value': None}
-                        tresult['failed'].append(deepcopy(node_value_failed))
+                        self._add_failed(tresult, node_value_failed)
 
         if not( is_skipped and count_fail == 0 and count_pass == 0 ):
             if res is False:
@@ -1831,7 +2156,7 @@ class Operator:
         #tresult['err'] = err_mssg
         tresult['result'] = res
         tresult['count'] = {'pass': count_pass, 'fail': count_fail}
-        self.test_details[teston].append(tresult)
+        self.add_test_result(teston, tresult)
 
     def not_in(self, x_path, ele_list, err_mssg,
                info_mssg, teston, iter, id_list, xml1, xml2, ignore_null=None):
@@ -1855,6 +2180,7 @@ class Operator:
         try:
             element = ele_list[0]
             value_list = ele_list[1:]
+            values = self._compile_values(value_list)
         except IndexError as e:
             self.logger_testop.error(colorama.Fore.RED +
                                      "Error occurred while accessing test element %s" % e.message, extra=self.log_detail)
@@ -1884,15 +2210,14 @@ class Operator:
                         'post': postdict,
                         'actual_node_value': None,
                         'xpath_error': True}
-                    tresult['failed'].append(deepcopy(node_value_failed))
+                    self._add_failed(tresult, node_value_failed)
 
             else:
+                # pre node of every post node, matched by values of ids
+                pre_nodes = self._align_nodes(id_list, pre_nodes, post_nodes)
                 for i in range(len(post_nodes)):
-                    # if length of pre node is less than post node, assign
-                    # sample xml element node
-                    if i >= len(pre_nodes):
-                        pre_nodes.append(etree.XML('<sample></sample>'))
-
+                    if self._stop_at_failure(tresult, res):
+                        break
                     iddict, prenode, postnode, id_val = self._find_element(
                         id_list, iddict, element, pre_nodes[i], post_nodes[i])
                     predict, postdict = self._get_nodevalue(
@@ -1903,13 +2228,13 @@ class Operator:
                     if postnode:
                         for k in range(len(postnode)):
                             # if length of pre node is less than post node,
-                            # assign sample node
+                            # assign placeholder node
                             if k >= len(prenode):
-                                prenode.append(etree.XML('<sample></sample>'))
+                                prenode.append(self.placeholder)
 
                             predict, postdict, post_nodevalue, pre_nodevalue = self._find_value(
                                 predict, postdict, element, postnode[k], prenode[k])
-                            if (post_nodevalue not in value_list):
+                            if not self._match_value(values, post_nodevalue):
                                 self._print_message(
                                     info_mssg,
                                     iddict,
@@ -1922,8 +2247,7 @@ class Operator:
                                     'pre': predict,
                                     'post': postdict,
                                     'actual_node_value': post_nodevalue}
-                                tresult['passed'].append(
-                                    deepcopy(node_value_passed))
+                                self._add_passed(tresult, node_value_passed)
                             else:
                                 res = False
                                 count_fail = count_fail + 1
@@ -1938,23 +2262,17 @@ class Operator:
                                     'pre': predict,
                                     'post': postdict,
                                     'actual_node_value': post_nodevalue}
-                                tresult['failed'].append(
-                                    deepcopy(node_value_failed))
+                                self._add_failed(tresult, node_value_failed)
                     else:
                         
                         ##
                         if self._is_ignore_null(ignore_null):
-                            self.logger_testop.debug(colorama.Fore.YELLOW +
-                                        "SKIPPING!! Node <{}> not found at xpath <{}> for IDs: {}".format(
-                                            element, 
-                                            x_path, 
-                                            id_val
-                                            ),
-                                        extra=self.log_detail)
+                            self._log_node("debug", colorama.Fore.YELLOW + "SKIPPING!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                           element, x_path, id_val)
                             is_skipped = False
                             continue
-                        self.logger_testop.error(colorama.Fore.RED + "ERROR!! Node <{}> not found at xpath <{}> for IDs: {}".format(element, x_path,
-                                                                                                                                    id_val), extra=self.log_detail)
+                        self._log_node("error", colorama.Fore.RED + "ERROR!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                       element, x_path, id_val)
                         res = False
                         count_fail = count_fail + 1
                         node_value_failed = {
@@ -1962,7 +2280,7 @@ class Operator:
                             'pre': predict,
                             'post': postdict,
                             'actual_node_value': None}
-                        tresult['failed'].append(deepcopy(node_value_failed))
+                        self._add_failed(tresult, node_value_failed)
 
         if not( is_skipped and count_fail == 0 and count_pass == 0 ):
             if res is False:
@@ -1983,7 +2301,7 @@ class Operator:
         #tresult['err'] = err_mssg
         tresult['result'] = res
         tresult['count'] = {'pass': count_pass, 'fail': count_fail}
-        self.test_details[teston].append(tresult)
+        self.add_test_result(teston, tresult)
 
     ################## operator requiring two snapshots, pre and post ########
     def no_diff(self, x_path, ele_list, err_mssg,
@@ -2032,14 +2350,15 @@ class Operator:
                         'post': postdict,
                         'actual_node_value': None,
                         'xpath_error': True}
-                    tresult['failed'].append(deepcopy(node_value_failed))
+                    self._add_failed(tresult, node_value_failed)
 
             else:
                 # assuming one iterator has unique set of ids, i.e only one node matching to id
                 # making dictionary for id and its corresponding xpath
                 # one xpath has only one set of id
                 data1 = self._get_data(id_list, pre_nodes, ignore_null)
-                data2 = self._get_data(id_list, post_nodes, ignore_null)
+                data2 = data1 if post_nodes is pre_nodes else self._get_data(
+                    id_list, post_nodes, ignore_null)
                 # making union of id keys
                 data1_key = set(data1.keys())
                 data2_key = set(data2.keys())
@@ -2054,6 +2373,8 @@ class Operator:
                 # iterating through ids which are present either in pre
                 # snapshot or post snapshot or both
                 for k in keys_union:
+                    if self._stop_at_failure(tresult, res):
+                        break
                     for length in range(len(k)):
                         # making dictionary of ids for given xpath, ex id_0,
                         # id_1 ..etc
@@ -2094,8 +2415,7 @@ class Operator:
                                 'post': postdict,
                                 'pre_node_value': val_list1,
                                 'post_node_value': val_list2}
-                            tresult['failed'].append(
-                                deepcopy(node_value_failed))
+                            self._add_failed(tresult, node_value_failed)
 
                         else:
                             count_pass = count_pass + 1
@@ -2111,34 +2431,25 @@ class Operator:
                                 'post': postdict,
                                 'pre_node_value': val_list1,
                                 'post_node_value': val_list2}
-                            tresult['passed'].append(
-                                deepcopy(node_value_passed))
+                            self._add_passed(tresult, node_value_passed)
 
                     else:
-                        self.logger_testop.error(colorama.Fore.RED +
-                                                 "ID gone missing!!!", extra=self.log_detail)
+                        self._log_node("error", colorama.Fore.RED + "ID gone missing!!!")
                         # mapping id name to its value
                         for length in range(len(k)):
                             id_val[id_list[length]] = k[length][0].strip()
                         if k in data1:
-                            self.logger_testop.error(
-                                "ID list '%s' is not present in post snapshot" %
-                                iddict, extra=self.log_detail)
-                            tresult['failed'].append(
-                                {'id_missing_post': deepcopy(id_val)})
+                            self._log_node("error", "ID list '%s' is not present in post snapshot", iddict)
+                            self._add_failed(tresult, {'id_missing_post': id_val})
                         else:
-                            self.logger_testop.error(
-                                "ID list '%s' is not present in pre snapshot" %
-                                iddict, extra=self.log_detail)
-                            tresult['failed'].append(
-                                {'id_missing_pre': deepcopy(id_val)})
+                            self._log_node("error", "ID list '%s' is not present in pre snapshot", iddict)
+                            self._add_failed(tresult, {'id_missing_pre': id_val})
                         # tresult['id_miss_match'].append(iddict.copy())
-                        self.logger_testop.debug(colorama.Fore.RED +
-                                                 jinja2.Template(
-                                                     err_mssg).render(
-                                                     iddict,
-                                                     pre=predict,
-                                                     post=postdict), extra=self.log_detail)
+                        if not self.quiet_nodes and self._is_emitted("debug"):
+                            self.logger_testop.debug(
+                                colorama.Fore.RED +
+                                self._render(err_mssg, iddict, predict, postdict),
+                                extra=self.log_detail)
                         res = False
                         count_fail = count_fail + 1
         if res is False:
@@ -2157,7 +2468,7 @@ class Operator:
         #tresult['err'] = err_mssg
         tresult['result'] = res
         tresult['count'] = {'pass': count_pass, 'fail': count_fail}
-        self.test_details[teston].append(tresult)
+        self.add_test_result(teston, tresult)
 
     def list_not_less(
             self, x_path, ele_list, err_mssg, info_mssg, teston, iter, id_list, xml1, xml2, ignore_null=None):
@@ -2202,13 +2513,14 @@ class Operator:
                     'post': postdict,
                     'actual_node_value': None,
                     'xpath_error': True}
-                tresult['failed'].append(deepcopy(node_value_failed))
+                self._add_failed(tresult, node_value_failed)
         else:
             # assuming one iterator has unique set of ids, i.e only one node matching to id
             # making dictionary for id and its corresponding xpath
 
             predata = self._get_data(id_list, pre_nodes, ignore_null)
-            postdata = self._get_data(id_list, post_nodes, ignore_null)
+            postdata = predata if post_nodes is pre_nodes else self._get_data(
+                id_list, post_nodes, ignore_null)
 
             if not predata:
                 self.logger_testop.debug(colorama.Fore.YELLOW +
@@ -2218,6 +2530,8 @@ class Operator:
                 res = None
 
             for k in predata:
+                if self._stop_at_failure(tresult, res):
+                    break
                 for length in range(len(k)):
                     iddict['id_' + str(length)] = [k[length][i].strip()
                                                    for i in range(len(k[length]))]
@@ -2250,8 +2564,8 @@ class Operator:
                                 # and not in post
                                 res = False
                                 count_fail = count_fail + 1
-                                self.logger_testop.info("Missing node : %s for element tag %s and parent element %s" % (val1, ele_xpath1[0].tag,
-                                                                                                                        ele_xpath1[0].getparent().tag), extra=self.log_detail)
+                                self._log_node("info", "Missing node : %s for element tag %s and parent element %s", val1, ele_xpath1[0].tag,
+                                ele_xpath1[0].getparent().tag)
                                 self._print_message(
                                     err_mssg,
                                     iddict,
@@ -2264,8 +2578,7 @@ class Operator:
                                     'post': postdict,
                                     'pre_node_value': val1,
                                     'post_node_value': ''}
-                                tresult['failed'].append(
-                                    deepcopy(node_value_failed))
+                                self._add_failed(tresult, node_value_failed)
 
                             else:
                                 count_pass = count_pass + 1
@@ -2281,8 +2594,7 @@ class Operator:
                                     'post': postdict,
                                     'pre_node_value': val1,
                                     'post_node_value': val1}
-                                tresult['passed'].append(
-                                    deepcopy(node_value_passed))
+                                self._add_passed(tresult, node_value_passed)
                     else:
                         count_pass = count_pass + 1
                         self._print_message(
@@ -2294,18 +2606,14 @@ class Operator:
                             'id': id_val,
                             'pre': predict,
                             'post': postdict}
-                        tresult['passed'].append(deepcopy(node_value_passed))
+                        self._add_passed(tresult, node_value_passed)
                 else:
-                    self.logger_testop.error(colorama.Fore.RED +
-                                             "ID gone missing !! ", extra=self.log_detail)
+                    self._log_node("error", colorama.Fore.RED + "ID gone missing !! ")
                     for length in range(len(k)):
                         id_val[id_list[length]] = k[length][0].strip()
-                    self.logger_testop.error(
-                        "ID list ' %s ' is not present in post snapshots " %
-                        iddict, extra=self.log_detail)
+                    self._log_node("error", "ID list ' %s ' is not present in post snapshots ", iddict)
                     # tresult['id_miss_match'].append(iddict.copy())
-                    tresult['failed'].append(
-                        {'id_missing_post': deepcopy(id_val)})
+                    self._add_failed(tresult, {'id_missing_post': id_val})
                     self._print_message(
                         err_mssg,
                         iddict,
@@ -2330,7 +2638,7 @@ class Operator:
         #tresult['err'] = err_mssg
         tresult['result'] = res
         tresult['count'] = {'pass': count_pass, 'fail': count_fail}
-        self.test_details[teston].append(tresult)
+        self.add_test_result(teston, tresult)
 
     def list_not_more(
             self, x_path, ele_list, err_mssg, info_mssg, teston, iter, id_list, xml1, xml2, ignore_null=None):
@@ -2374,12 +2682,13 @@ class Operator:
                     'post': postdict,
                     'actual_node_value': None,
                     'xpath_error': True}
-                tresult['failed'].append(deepcopy(node_value_failed))
+                self._add_failed(tresult, node_value_failed)
         else:
             # assuming one iterator has unique set of ids, i.e only one node matching to id
             # making dictionary for id and its corresponding xpath
             predata = self._get_data(id_list, pre_nodes, ignore_null)
-            postdata = self._get_data(id_list, post_nodes, ignore_null)
+            postdata = predata if post_nodes is pre_nodes else self._get_data(
+                id_list, post_nodes, ignore_null)
 
             if not predata:
                 self.logger_testop.debug(colorama.Fore.YELLOW +
@@ -2389,6 +2698,8 @@ class Operator:
                 res = None
             
             for k in postdata:
+                if self._stop_at_failure(tresult, res):
+                    break
                 for length in range(len(k)):
                     #iddict['id_' + str(length)] = k[length].strip()
                     iddict['id_' + str(length)] = [k[length][i].strip()
@@ -2424,10 +2735,9 @@ class Operator:
                                     'post': postdict,
                                     'pre_node_value': '',
                                     'post_node_value': val2}
-                                tresult['failed'].append(
-                                    deepcopy(node_value_failed))
-                                self.logger_testop.error("Missing node: %s for element tag: %s and parent element %s" % (val2, ele_xpath2[0].tag,
-                                                                                                                         ele_xpath2[0].getparent().tag), extra=self.log_detail)
+                                self._add_failed(tresult, node_value_failed)
+                                self._log_node("error", "Missing node: %s for element tag: %s and parent element %s", val2, ele_xpath2[0].tag,
+                                ele_xpath2[0].getparent().tag)
                                 self._print_message(
                                     err_mssg,
                                     iddict,
@@ -2448,8 +2758,7 @@ class Operator:
                                     'post': postdict,
                                     'pre_node_value': val2,
                                     'post_node_value': val2}
-                                tresult['passed'].append(
-                                    deepcopy(node_value_passed))
+                                self._add_passed(tresult, node_value_passed)
                     else:
                         count_pass = count_pass + 1
                         self._print_message(
@@ -2462,17 +2771,13 @@ class Operator:
                             'id': id_val,
                             'pre': predict,
                             'post': postdict}
-                        tresult['passed'].append(deepcopy(node_value_passed))
+                        self._add_passed(tresult, node_value_passed)
                 else:
-                    self.logger_testop.error(colorama.Fore.RED +
-                                             "ID gone missing!!", extra=self.log_detail)
+                    self._log_node("error", colorama.Fore.RED + "ID gone missing!!")
                     for length in range(len(k)):
                         id_val[id_list[length]] = k[length][0].strip()
-                    self.logger_testop.error(
-                        "\nID list ' %s ' is not present in pre snapshots" %
-                        iddict, extra=self.log_detail)
-                    tresult['failed'].append(
-                        {'id_missing_pre': deepcopy(id_val)})
+                    self._log_node("error", "\nID list ' %s ' is not present in pre snapshots", iddict)
+                    self._add_failed(tresult, {'id_missing_pre': id_val})
                     # tresult['id_miss_match'].append(iddict.copy())
                     self._print_message(
                         err_mssg,
@@ -2499,7 +2804,7 @@ class Operator:
         #tresult['err'] = err_mssg
         tresult['result'] = res
         tresult['count'] = {'pass': count_pass, 'fail': count_fail}
-        self.test_details[teston].append(tresult)
+        self.add_test_result(teston, tresult)
 
     def delta(self, x_path, ele_list, err_mssg,
               info_mssg, teston, iter, id_list, xml1, xml2, ignore_null=None):
@@ -2554,13 +2859,14 @@ class Operator:
                         'post': postdict,
                         'actual_node_value': None,
                         'xpath_error': True}
-                    tresult['failed'].append(deepcopy(node_value_failed))
+                    self._add_failed(tresult, node_value_failed)
             else:
                 # assuming one iterator has unique set of ids, i.e only one node matching to id
                 # making dictionary for id and its corresponding xpath
 
                 predata = self._get_data(id_list, pre_nodes, ignore_null)
-                postdata = self._get_data(id_list, post_nodes, ignore_null)
+                postdata = predata if post_nodes is pre_nodes else self._get_data(
+                    id_list, post_nodes, ignore_null)
 
                 predata_keys = set(predata.keys())
                 postdata_keys = set(postdata.keys())
@@ -2575,6 +2881,8 @@ class Operator:
                     is_skipped = True
 
                 for k in keys_union:
+                    if self._stop_at_failure(tresult, res):
+                        break
                     # checking if id in first data set is present in second data
                     # set or not
                     for length in range(len(k)):
@@ -2622,8 +2930,7 @@ class Operator:
                                             'post': postdict,
                                             'pre_node_value': val1,
                                             'post_node_value': val2}
-                                        tresult['failed'].append(
-                                            deepcopy(node_value_failed))
+                                        self._add_failed(tresult, node_value_failed)
                                     else:
                                         count_pass = count_pass + 1
                                         self._print_message(
@@ -2638,8 +2945,7 @@ class Operator:
                                             'post': postdict,
                                             'pre_node_value': val1,
                                             'post_node_value': val2}
-                                        tresult['passed'].append(
-                                            deepcopy(node_value_passed))
+                                        self._add_passed(tresult, node_value_passed)
 
                                 # for positive percent change
                                 elif re.search('%', del_val) and (re.search('/+', del_val)):
@@ -2660,8 +2966,7 @@ class Operator:
                                             'post': postdict,
                                             'pre_node_value': val1,
                                             'post_node_value': val2}
-                                        tresult['failed'].append(
-                                            deepcopy(node_value_failed))
+                                        self._add_failed(tresult, node_value_failed)
 
                                     else:
                                         count_pass = count_pass + 1
@@ -2677,8 +2982,7 @@ class Operator:
                                             'post': postdict,
                                             'pre_node_value': val1,
                                             'post_node_value': val2}
-                                        tresult['passed'].append(
-                                            deepcopy(node_value_passed))
+                                        self._add_passed(tresult, node_value_passed)
 
                                 # absolute percent change
                                 elif re.search('%', del_val):
@@ -2700,8 +3004,7 @@ class Operator:
                                             'post': postdict,
                                             'pre_node_value': val1,
                                             'post_node_value': val2}
-                                        tresult['failed'].append(
-                                            deepcopy(node_value_failed))
+                                        self._add_failed(tresult, node_value_failed)
                                     else:
                                         count_pass = count_pass + 1
                                         self._print_message(
@@ -2716,8 +3019,7 @@ class Operator:
                                             'post': postdict,
                                             'pre_node_value': val1,
                                             'post_node_value': val2}
-                                        tresult['passed'].append(
-                                            deepcopy(node_value_passed))
+                                        self._add_passed(tresult, node_value_passed)
 
                                 # for negative change
                                 elif re.search('-', del_val):
@@ -2738,8 +3040,7 @@ class Operator:
                                             'post': postdict,
                                             'pre_node_value': val1,
                                             'post_node_value': val2}
-                                        tresult['failed'].append(
-                                            deepcopy(node_value_failed))
+                                        self._add_failed(tresult, node_value_failed)
                                     else:
                                         count_pass = count_pass + 1
                                         self._print_message(
@@ -2754,8 +3055,7 @@ class Operator:
                                             'post': postdict,
                                             'pre_node_value': val1,
                                             'post_node_value': val2}
-                                        tresult['passed'].append(
-                                            deepcopy(node_value_passed))
+                                        self._add_passed(tresult, node_value_passed)
 
                                  # for positive change
                                 elif re.search('\+', del_val):
@@ -2776,8 +3076,7 @@ class Operator:
                                             'post': postdict,
                                             'pre_node_value': val1,
                                             'post_node_value': val2}
-                                        tresult['failed'].append(
-                                            deepcopy(node_value_failed))
+                                        self._add_failed(tresult, node_value_failed)
                                     else:
                                         count_pass = count_pass + 1
                                         self._print_message(
@@ -2792,8 +3091,7 @@ class Operator:
                                             'post': postdict,
                                             'pre_node_value': val1,
                                             'post_node_value': val2}
-                                        tresult['passed'].append(
-                                            deepcopy(node_value_passed))
+                                        self._add_passed(tresult, node_value_passed)
                                 else:
                                     dvalue = float(delta_val.strip('%'))
                                     mvalue1 = val1 - dvalue
@@ -2813,8 +3111,7 @@ class Operator:
                                             'post': postdict,
                                             'pre_node_value': val1,
                                             'post_node_value': val2}
-                                        tresult['failed'].append(
-                                            deepcopy(node_value_failed))
+                                        self._add_failed(tresult, node_value_failed)
                                     else:
                                         count_pass = count_pass + 1
                                         self._print_message(
@@ -2829,8 +3126,7 @@ class Operator:
                                             'post': postdict,
                                             'pre_node_value': val1,
                                             'post_node_value': val2}
-                                        tresult['passed'].append(
-                                            deepcopy(node_value_passed))
+                                        self._add_passed(tresult, node_value_passed)
                             else:
                                 
                                 if self._is_ignore_null(ignore_null):
@@ -2855,22 +3151,13 @@ class Operator:
                         for length in range(len(k)):
                             id_val[id_list[length]] = k[length][0].strip()
 
-                        self.logger_testop.error(
-                            colorama.Fore.RED +
-                            "\nID gone missing!!",
-                            extra=self.log_detail)
+                        self._log_node("error", colorama.Fore.RED + "\nID gone missing!!")
                         if k in predata:
-                            self.logger_testop.error(
-                                "ID list '%s' is not present in post snapshot" %
-                                iddict, extra=self.log_detail)
-                            tresult['failed'].append(
-                                {'id_missing_post': deepcopy(id_val)})
+                            self._log_node("error", "ID list '%s' is not present in post snapshot", iddict)
+                            self._add_failed(tresult, {'id_missing_post': id_val})
                         else:
-                            self.logger_testop.error(
-                                "ID list '%s' is not present in pre snapshot" %
-                                iddict, extra=self.log_detail)
-                            tresult['failed'].append(
-                                {'id_missing_pre': deepcopy(id_val)})
+                            self._log_node("error", "ID list '%s' is not present in pre snapshot", iddict)
+                            self._add_failed(tresult, {'id_missing_pre': id_val})
                         self._print_message(
                             err_mssg,
                             iddict,
@@ -2899,7 +3186,7 @@ class Operator:
         #tresult['err'] = err_mssg
         tresult['result'] = res
         tresult['count'] = {'pass': count_pass, 'fail': count_fail}
-        self.test_details[teston].append(tresult)
+        self.add_test_result(teston, tresult)
 
     def regex(
             self, x_path, ele_list, err_mssg, info_mssg, teston, iter, id_list, xml1, xml2, ignore_null=None):
@@ -2951,14 +3238,13 @@ class Operator:
                         'post': postdict,
                         'actual_node_value': None,
                         'xpath_error': True}
-                    tresult['failed'].append(deepcopy(node_value_failed))
+                    self._add_failed(tresult, node_value_failed)
             else:
+                # pre node of every post node, matched by values of ids
+                pre_nodes = self._align_nodes(id_list, pre_nodes, post_nodes)
                 for i in range(len(post_nodes)):
-                    # if length of pre node is less than post node, assign
-                    # sample xml element node
-                    if i >= len(pre_nodes):
-                        pre_nodes.append(etree.XML('<sample></sample>'))
-
+                    if self._stop_at_failure(tresult, res):
+                        break
                     iddict, prenode, postnode, id_val = self._find_element(
                         id_list, iddict, element, pre_nodes[i], post_nodes[i])
                     predict, postdict = self._get_nodevalue(
@@ -2968,9 +3254,9 @@ class Operator:
                     if postnode:
                         for k in range(len(postnode)):
                             # if length of pre node is less than post node,
-                            # assign sample node
+                            # assign placeholder node
                             if k >= len(prenode):
-                                prenode.append(etree.XML('<sample></sample>'))
+                                prenode.append(self.placeholder)
 
                             predict, postdict, post_nodevalue, pre_nodevalue = self._find_value(
                                 predict, postdict, element, postnode[k], prenode[k])
@@ -2978,54 +3264,44 @@ class Operator:
                             if re.search(value, post_nodevalue):
                                 res = True
                                 count_pass = count_pass + 1
-                                self.logger_testop.debug(
-                                    jinja2.Template(
-                                        info_mssg.replace(
-                                            '-',
-                                            '_')).render(
-                                        iddict,
-                                        pre=predict,
-                                        post=postdict), extra=self.log_detail)
+                                self._print_message(
+                                    info_mssg.replace('-', '_'),
+                                    iddict,
+                                    predict,
+                                    postdict,
+                                    "debug")
                                 node_value_passed = {
                                     'id': id_val,
                                     'pre': predict,
                                     'post': postdict,
                                     'actual_node_value': post_nodevalue}
-                                tresult['passed'].append(
-                                    deepcopy(node_value_passed))
+                                self._add_passed(tresult, node_value_passed)
 
                             else:
                                 res = False
                                 count_fail = count_fail + 1
-                                self.logger_testop.info(
-                                    jinja2.Template(
-                                        err_mssg.replace(
-                                            '-',
-                                            '_')).render(
-                                        iddict,
-                                        pre=predict,
-                                        post=postdict), extra=self.log_detail)
+                                self._print_message(
+                                    err_mssg.replace('-', '_'),
+                                    iddict,
+                                    predict,
+                                    postdict,
+                                    "info")
                                 node_value_failed = {
                                     'id': id_val,
                                     'pre': predict,
                                     'post': postdict,
                                     'actual_node_value': post_nodevalue}
-                                tresult['failed'].append(
-                                    deepcopy(node_value_failed))
+                                self._add_failed(tresult, node_value_failed)
                     else:
                         
                         if self._is_ignore_null(ignore_null):
-                            self.logger_testop.debug(colorama.Fore.YELLOW +
-                                        "SKIPPING!! Node <{}> not found at xpath <{}> for IDs: {}".format(
-                                            element, 
-                                            x_path, 
-                                            id_val),
-                                        extra=self.log_detail)
+                            self._log_node("debug", colorama.Fore.YELLOW + "SKIPPING!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                           element, x_path, id_val)
                             is_skipped = True
                             continue  
                         
-                        self.logger_testop.error(colorama.Fore.RED +
-                                                 "ERROR!! Node <{}> not found at xpath <{}> for IDs: {}".format(element, x_path, id_val), extra=self.log_detail)
+                        self._log_node("error", colorama.Fore.RED + "ERROR!! Node <%s> not found at xpath <%s> for IDs: %s",
+                                       element, x_path, id_val)
                         res = False
                         count_fail = count_fail + 1
                         node_value_failed = {
@@ -3033,7 +3309,7 @@ class Operator:
                             'pre': predict,
                             'post': postdict,
                             'actual_node_value': None}
-                        tresult['failed'].append(deepcopy(node_value_failed))
+                        self._add_failed(tresult, node_value_failed)
         
         if not( is_skipped and count_fail == 0 and count_pass == 0 ):
             if res is False:
@@ -3049,7 +3325,7 @@ class Operator:
         #tresult['err'] = err_mssg
         tresult['result'] = res
         tresult['count'] = {'pass': count_pass, 'fail': count_fail}
-        self.test_details[teston].append(tresult)
+        self.add_test_result(teston, tresult)
 
     def final_result(self, logs):
         """
@@ -3086,6 +3362,11 @@ class Operator:
             colorama.Fore.RED +
             "Total No of tests failed: {} ".format(
                 self.no_failed), extra=logs)
+        if self.truncated:
+            self.logger_testop.info(
+                colorama.Fore.YELLOW +
+                "Results are truncated, tests were stopped at first failure (fail_fast)",
+                extra=logs)
         
         evaluated_result = True
         for result in self.result_dict:
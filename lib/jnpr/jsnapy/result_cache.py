@@ -0,0 +1,137 @@
+#!/usr/bin/python
+
+# Copyright (c) 1999-2016, Juniper Networks Inc.
+#
+# All rights reserved.
+#
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from jnpr.jsnapy import get_path
+from jnpr.jsnapy import version
+
+CACHE_DB = 'jsnapy_results.db'
+CACHE_SIZE = 1000
+
+
+def get_result_key(tests, test_name, teston, check, fingerprints, settings):
+    """
+    Return key of results of a test, results are same as long as test,
+    snapshots, settings and version of jsnapy are same
+    :param tests: test file entries of command/rpc
+    :param test_name: name of test in test file
+    :param teston: command/rpc
+    :param check: True for --check, False for --snapcheck
+    :param fingerprints: sha1 of pre and post snapshots
+    :param settings: operator settings which change results
+    :return: hex digest
+    """
+    data = json.dumps([version.__version__, tests, test_name, teston, check,
+                       fingerprints, settings], sort_keys=True, default=str)
+    return hashlib.sha1(data).hexdigest()
+
+
+class ResultCache:
+
+    """
+    Results of tests kept in sqlite database in snapshot directory, so that
+    same tests on same snapshots are not evaluated again. Least recently
+    used results are removed once there are more than max_entries.
+    """
+
+    def __init__(self, max_entries=CACHE_SIZE, db_name=CACHE_DB):
+        self.logger_cache = logging.getLogger(__name__)
+        self.max_entries = max_entries
+        self.db_filename = os.path.join(
+            get_path(
+                'DEFAULT',
+                'snapshot_path'),
+            db_name)
+        with sqlite3.connect(self.db_filename) as con:
+            con.execute("""create table if not exists results (
+                key        text primary key,
+                data       text,
+                last_used  real
+            );""")
+
+    def get(self, key):
+        """
+        Return results stored for key
+        :param key: key returned by get_result_key
+        :return: results or None if they are not stored
+        """
+        with sqlite3.connect(self.db_filename) as con:
+            row = con.execute("SELECT data FROM results WHERE key = :key",
+                              {'key': key}).fetchone()
+            if row is None:
+                return None
+            con.execute("UPDATE results SET last_used = :time WHERE key = :key",
+                        {'time': time.time(), 'key': key})
+        try:
+            return json.loads(row[0])
+        except (ValueError, TypeError):
+            # not written as json, by older version, evaluated again
+            return None
+
+    def put(self, key, results):
+        """
+        Store results of a test
+        :param key: key returned by get_result_key
+        :param results: results made of dicts, lists, strings and numbers
+        """
+        data = json.dumps(results)
+        with sqlite3.connect(self.db_filename) as con:
+            con.execute("INSERT OR REPLACE INTO results (key, data, last_used) VALUES (:key, :data, :time)",
+                        {'key': key, 'data': data, 'time': time.time()})
+            con.execute("DELETE FROM results WHERE key NOT IN "
+                        "(SELECT key FROM results ORDER BY last_used DESC LIMIT :max)",
+                        {'max': self.max_entries})
+
+    def clear(self):
+        """
+        Remove all stored results
+        :return: number of results removed
+        """
+        with sqlite3.connect(self.db_filename) as con:
+            count = con.execute("DELETE FROM results").rowcount
+        return count
+
+
+class MemoryCache:
+
+    """
+    Results of tests kept in memory, shared by all devices of a run, so that
+    tests on identical snapshots of many devices are evaluated once. Least
+    recently used results are removed once there are more than max_entries.
+    """
+
+    def __init__(self, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self.results = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.results:
+                return None
+            results = self.results[key] = self.results.pop(key)
+        return results
+
+    def put(self, key, results):
+        with self.lock:
+            self.results.pop(key, None)
+            self.results[key] = results
+            if len(self.results) > self.max_entries:
+                self.results.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            count = len(self.results)
+            self.results.clear()
+        return count
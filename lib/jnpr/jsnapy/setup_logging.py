@@ -7,10 +7,261 @@
 
 import os
 import yaml
+import atexit
+import Queue
+import threading
 import logging.config
 from jnpr.jsnapy import get_config_location
 
 
+class QueueHandler(logging.Handler):
+
+    """
+    Put log records in queue, records are written to actual handlers by
+    QueueListener in background thread. Message is merged with its arguments
+    before record is put in queue, as arguments may change later.
+    """
+
+    def __init__(self, queue):
+        logging.Handler.__init__(self)
+        self.queue = queue
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+class QueueListener:
+
+    """
+    Write records put in queue by QueueHandler to given handlers, so that
+    formatting and disk I/O is done by only one thread
+    """
+
+    _sentinel = None
+
+    def __init__(self, queue, handlers):
+        self.queue = queue
+        self.handlers = handlers
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._monitor)
+        self.thread.setDaemon(True)
+        self.thread.start()
+
+    def handle(self, record):
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def _monitor(self):
+        while True:
+            record = self.queue.get()
+            if record is self._sentinel:
+                break
+            self.handle(record)
+
+    def stop(self):
+        """
+        Write all records left in queue and stop background thread
+        """
+        if self.thread is not None:
+            self.queue.put_nowait(self._sentinel)
+            self.thread.join()
+            self.thread = None
+
+
+class HostFileHandler(logging.Handler):
+
+    """
+    Write records of every device to its own file, <directory>/<hostname>.log,
+    using "hostname" passed in extra of log calls. Records without hostname
+    are not written.
+    """
+
+    def __init__(self, directory, mode='a', encoding=None):
+        logging.Handler.__init__(self)
+        self.directory = os.path.expanduser(directory)
+        self.mode = mode
+        self.encoding = encoding
+        self.files = {}
+
+    def emit(self, record):
+        hostname = getattr(record, 'hostname', None)
+        if not hostname:
+            return
+        handler = self.files.get(hostname)
+        if handler is None:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            filename = str(hostname).replace(os.sep, '_') + '.log'
+            handler = logging.FileHandler(
+                os.path.join(self.directory, filename),
+                self.mode,
+                self.encoding)
+            handler.setFormatter(self.formatter)
+            self.files[hostname] = handler
+        handler.emit(record)
+
+    def close(self):
+        self.acquire()
+        try:
+            for handler in self.files.values():
+                handler.close()
+            self.files = {}
+        finally:
+            self.release()
+        logging.Handler.close(self)
+
+
+class RecordCapture(logging.Handler):
+
+    """
+    Keep records logged for given device by current thread, so that they can
+    be logged again for other devices by replay()
+    """
+
+    def __init__(self, hostname):
+        logging.Handler.__init__(self, get_capture_level())
+        self.hostname = hostname
+        self.thread = threading.current_thread().ident
+        self.records = []
+
+    def emit(self, record):
+        if record.thread == self.thread and getattr(record, 'hostname', None) == self.hostname:
+            self.records.append((record.name, record.levelno, record.pathname,
+                                 record.lineno, record.getMessage(), record.funcName))
+
+    def start(self, logger_name='jnpr.jsnapy'):
+        logging.getLogger(logger_name).addHandler(self)
+        return self
+
+    def stop(self, logger_name='jnpr.jsnapy'):
+        logging.getLogger(logger_name).removeHandler(self)
+        return self.records
+
+
+def replay(records, hostname):
+    """
+    Log records kept by RecordCapture again for given device
+    :param records: records returned by RecordCapture.stop()
+    :param hostname: device name
+    """
+    for name, level, pathname, lineno, msg, func in records:
+        logger = logging.getLogger(name)
+        if logger.isEnabledFor(level):
+            logger.handle(logger.makeRecord(
+                name, level, pathname, lineno, msg, None, None, func,
+                {'hostname': hostname}))
+
+
+# listener started by use_queue, if any
+listener = None
+
+
+def use_queue():
+    """
+    Move handlers of root logger behind a queue, so threads logging for
+    devices only put records in queue and a background thread writes them.
+    Records left in queue are written at exit.
+    """
+    global listener
+    if listener is not None:
+        return
+    root = logging.getLogger()
+    queue = Queue.Queue()
+    handlers = root.handlers[:]
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(queue))
+    listener = QueueListener(queue, handlers)
+    sync_level()
+    listener.start()
+    atexit.register(stop_queue)
+
+
+def sync_level():
+    """
+    Set level of queue handler to lowest level of handlers behind the queue,
+    so records no handler writes are not put in queue. Called again when
+    level of these handlers is changed.
+    """
+    if listener is None:
+        return
+    levels = [handler.level for handler in listener.handlers]
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, QueueHandler):
+            handler.setLevel(min(levels) if levels else logging.NOTSET)
+
+
+def stop_queue():
+    """
+    Write records left in queue and put handlers back on root logger
+    """
+    global listener
+    if listener is None:
+        return
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, QueueHandler):
+            root.removeHandler(handler)
+    listener.stop()
+    for handler in listener.handlers:
+        root.addHandler(handler)
+    listener = None
+
+
+def reset_queue():
+    """
+    Put handlers behind the queue back on root logger, without waiting for
+    listener. Called in worker processes, which inherit queue handler but not
+    thread of listener writing its records.
+    """
+    global listener
+    if listener is None:
+        return
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, QueueHandler):
+            root.removeHandler(handler)
+    for handler in listener.handlers:
+        root.addHandler(handler)
+    listener = None
+
+
+def get_handlers():
+    """
+    Return handlers actually writing records of root logger, which are
+    behind the queue if it is used
+    """
+    if listener is not None:
+        return listener.handlers
+    return logging.getLogger().handlers
+
+
+def get_capture_level():
+    """
+    Return level of records kept by RecordCapture, records no handler writes
+    are not kept
+    """
+    handlers = get_handlers()
+    return min(h.level for h in handlers) if handlers else logging.WARNING
+
+
 def setup_logging(
         default_path='logging.yml', default_level=logging.INFO, env_key='LOG_CFG'):
     config_location = get_config_location('logging.yml')
@@ -21,6 +272,10 @@ def setup_logging(
     if os.path.exists(path):
         with open(path, 'rt') as f:
             config = yaml.load(f.read())
+        # "queue" is not a key of logging.config, only used by jsnapy
+        queue = config.pop('queue', False)
         logging.config.dictConfig(config)
+        if queue is True:
+            use_queue()
     else:
         logging.basicConfig(level=default_level)
@@ -0,0 +1,117 @@
+#!/usr/bin/python
+
+# Copyright (c) 1999-2016, Juniper Networks Inc.
+#
+# All rights reserved.
+#
+
+import json
+import logging
+import threading
+import colorama
+
+
+class ResultSink:
+
+    """
+    Receives results as soon as they are produced, register it using
+    SnapAdmin.add_sink(). Subclasses override the methods they need.
+    """
+
+    def device_result(self, hostname, result):
+        """
+        Called once tests of a device are done
+        :param hostname: device name
+        :param result: object of operator.Operator containing test details
+        """
+        pass
+
+    def test_result(self, hostname, teston, tresult, duration=None):
+        """
+        Called once a test is done
+        :param hostname: device name
+        :param teston: command or rpc on which test is performed
+        :param tresult: dictionary containing result of the test
+        :param duration: time taken by the test in seconds, if known
+        """
+        pass
+
+    def close(self):
+        pass
+
+
+class CallbackSink(ResultSink):
+
+    def __init__(self, device_callback=None, test_callback=None):
+        """
+        :param device_callback: function called with hostname and Operator object
+        :param test_callback: function called with hostname, command/rpc and test result
+        """
+        self.device_callback = device_callback
+        self.test_callback = test_callback
+
+    def device_result(self, hostname, result):
+        if self.device_callback is not None:
+            self.device_callback(hostname, result)
+
+    def test_result(self, hostname, teston, tresult, duration=None):
+        if self.test_callback is not None:
+            self.test_callback(hostname, teston, tresult)
+
+
+class JsonLinesSink(ResultSink):
+
+    def __init__(self, filename, tests=False):
+        """
+        Write one json object per line to given file, line is written and
+        flushed as soon as result is produced. Lines are written without
+        whitespace and without empty lists of test records, durations are
+        given in milliseconds as "ms".
+        :param filename: file to which results are appended
+        :param tests: if True, result of every test is written too
+        """
+        self.logger_sink = logging.getLogger(__name__)
+        self.filename = filename
+        self.tests = tests
+        self.lock = threading.Lock()
+        self.out = open(filename, 'a')
+
+    def write(self, record):
+        line = json.dumps(record, separators=(',', ':'), default=str)
+        with self.lock:
+            try:
+                self.out.write(line + '\n')
+                self.out.flush()
+            except (IOError, ValueError) as ex:
+                self.logger_sink.error(
+                    colorama.Fore.RED +
+                    "ERROR!! writing results to %s, Complete message: %s" %
+                    (self.filename, ex),
+                    extra={'hostname': None})
+
+    def device_result(self, hostname, result):
+        record = {'type': 'device',
+                  'hostname': hostname,
+                  'result': result.result,
+                  'passed': result.no_passed,
+                  'failed': result.no_failed,
+                  'tests': result.result_dict}
+        if getattr(result, 'truncated', False):
+            record['truncated'] = True
+        if getattr(result, 'duration', None) is not None:
+            record['ms'] = round(result.duration * 1000, 3)
+        self.write(record)
+
+    def test_result(self, hostname, teston, tresult, duration=None):
+        if self.tests:
+            record = {'type': 'test', 'hostname': hostname, 'teston': teston}
+            for key, value in tresult.items():
+                if value != []:
+                    record[key] = value
+            if duration is not None:
+                record['ms'] = round(duration * 1000, 3)
+            self.write(record)
+
+    def close(self):
+        with self.lock:
+            self.out.close()
@@ -8,50 +8,340 @@
 import os
 import re
 import sys
+import Queue
+import hashlib
 import logging
+import threading
 import colorama
 from lxml import etree
 from jnpr.jsnapy import get_path
-from jnpr.junos.exception import RpcError
 from jnpr.jsnapy.sqlite_store import JsnapSqlite
+from jnpr.jsnapy.snap_index import write_index, project_reply, get_test_keys, FILTER_ATTR
+from jnpr.jsnapy.snap_filter import get_config_filter, get_rpc_args
+from jnpr.jsnapy.snap_layout import Manifest, get_shard_dir
 import lxml
 
 
 class Parser:
 
-    def __init__(self):
+    def __init__(self, dedup=False, persist=True, background=False, index=False,
+                 project=False, auto_filter=False, shard=False):
+        """
+        :param dedup: if True, identical snapshots are stored only once in
+                      blob directory and snap files are hard links to them
+        :param persist: if False, replies are not written in snap files and
+                        are only available through snap_replies
+        :param background: if True, snap files are written by a background
+                           thread, call flush() to wait for it
+        :param index: if True, index holding only nodes read by tests is
+                      written alongside every xml snap file, see snap_index
+        :param project: if True, only nodes read by tests are kept in xml
+                        replies, in snap files, database and live replies.
+                        If index is also True, full reply is kept and
+                        projection is written as its index.
+        :param auto_filter: if True, rpcs without filter are sent with filter
+                            or arguments derived from xpaths of their tests,
+                            see snap_filter
+        :param shard: if True, snap files are written in directory of their
+                      device and tag, along with manifest, see snap_layout
+        """
         self.logger_snap = logging.getLogger(__name__)
         self.log_detail = {'hostname': None}
         self.reply = {}
+        # snap file name -> reply, used by --snapcheck to test live replies
+        self.snap_replies = {}
         self.command_list = []
         self.rpc_list = []
         self.test_included = []
+        self.dedup = dedup
+        self.persist = persist
+        self.background = background
+        self.index = index
+        self.project = project
+        self.auto_filter = auto_filter
+        self.shard = shard
+        # shard directory -> snap_layout.Manifest
+        self.manifests = {}
+        # (command/rpc, name, format) -> test file entries of all tests
+        # sharing its snap file, see add_tests
+        self.shared_tests = {}
+        self.test_files = []
+        self.writer = None
+        self.writer_queue = None
 
-    def _write_file(self, rpc_reply, format, output_file):
+    def _save(self, data, output_file):
+        """
+        Write data in snap file, if dedup is set then snap file is linked to
+        blob named after sha1 of data, so identical data is stored only once.
+        Snap files of sharded layout are recorded in manifest of their shard.
+        :param data: data to be written
+        :param output_file: name of file
+        """
+        manifest = self.manifests.get(os.path.dirname(output_file))
+        if manifest is not None and not os.path.isdir(manifest.shard_dir):
+            os.makedirs(manifest.shard_dir)
+        self._save_file(data, output_file, manifest)
+        if manifest is not None:
+            manifest.add(os.path.basename(output_file), data)
+
+    def _save_file(self, data, output_file, manifest=None):
+        """
+        Write data in snap file, see _save
+        """
+        # blobs are shared by all shard directories
+        blob_dir = os.path.join(
+            manifest.snapshot_path if manifest is not None else
+            os.path.dirname(output_file), '.blobs')
+        if self.dedup is True:
+            blob_file = os.path.join(blob_dir, hashlib.sha1(data).hexdigest())
+            if os.path.isfile(output_file) and os.path.isfile(blob_file) and \
+                    os.path.samefile(output_file, blob_file):
+                return
+        # never write through a link, it would change every snapshot sharing the blob
+        if os.path.isfile(output_file) and os.stat(output_file).st_nlink > 1:
+            self._remove_link(output_file, blob_dir)
+        if self.dedup is True:
+            try:
+                if not os.path.isdir(blob_dir):
+                    os.makedirs(blob_dir)
+                if not os.path.isfile(blob_file):
+                    # written under other name first, so that blob written
+                    # partly, by crash or by other writer, is never linked
+                    tmp_file = '%s.%d.%d.tmp' % (
+                        blob_file, os.getpid(), threading.current_thread().ident)
+                    try:
+                        with open(tmp_file, 'w') as f:
+                            f.write(data)
+                        os.rename(tmp_file, blob_file)
+                    finally:
+                        if os.path.isfile(tmp_file):
+                            os.remove(tmp_file)
+                if os.path.isfile(output_file):
+                    os.remove(output_file)
+                os.link(blob_file, output_file)
+                return
+            except (OSError, IOError, AttributeError) as ex:
+                # hard links are not supported everywhere, write a full copy
+                self.logger_snap.debug(
+                    colorama.Fore.BLUE +
+                    "Not able to link snap file to blob: %s" % ex, extra=self.log_detail)
+        with open(output_file, 'w') as f:
+            f.write(data)
+
+    def _remove_link(self, output_file, blob_dir):
+        """
+        Remove snap file linked to blob, blob is removed too once no other
+        snap file is linked to it
+        :param output_file: name of file
+        :param blob_dir: directory of blobs
+        """
+        stat = os.stat(output_file)
+        blob_file = None
+        if stat.st_nlink == 2:
+            sha = hashlib.sha1()
+            with open(output_file, 'rb') as f:
+                for chunk in iter(lambda: f.read(65536), b''):
+                    sha.update(chunk)
+            blob_file = os.path.join(blob_dir, sha.hexdigest())
+        os.remove(output_file)
+        if blob_file is not None and os.path.isfile(blob_file):
+            blob_stat = os.stat(blob_file)
+            if (blob_stat.st_ino, blob_stat.st_dev) == (stat.st_ino, stat.st_dev) \
+                    and blob_stat.st_nlink == 1:
+                os.remove(blob_file)
+
+    def _write_file(self, rpc_reply, format, output_file, tests=None):
         """
         Writing rpc reply in snap file
         :param rpc_reply: RPC reply
         :param format: xml/text
         :param output_file: name of file
+        :param tests: test file entries of command/rpc, index is written for them
         """
         ### pyEz returns true if there is no output of given command ###
         ### Ex. show configuration security certificates returns nothing if its not set
 
 
         if rpc_reply is True :
-            with open(output_file, 'w') as f:
-                f.write("")
+            self._save("", output_file)
             self.logger_snap.info(
                 colorama.Fore.BLUE +
                 "\nOutput of requested Command/RPC is empty", extra=self.log_detail)
         else:
-            with open(output_file, 'w') as f:
-                f.write(etree.tostring(rpc_reply))
+            data = etree.tostring(rpc_reply)
+            self._save(data, output_file)
+            if self.index is True and tests and format == 'xml':
+                try:
+                    write_index(output_file, data, rpc_reply, tests)
+                except (IOError, OSError, etree.LxmlError) as ex:
+                    self.logger_snap.debug(
+                        colorama.Fore.BLUE +
+                        "Not able to write index of snap file: %s" % ex, extra=self.log_detail)
+
+    def _writer_loop(self):
+        """
+        Write snap files queued by _store_reply, till None is received
+        """
+        while True:
+            item = self.writer_queue.get()
+            if item is None:
+                break
+            try:
+                self._write_file(*item)
+            except Exception as ex:
+                self.logger_snap.error(colorama.Fore.RED +
+                                       "ERROR occurred while writing snap file %s: %s" %
+                                       (item[2], str(ex)), extra=self.log_detail)
+
+    def _project(self, rpc_reply, format, tests):
+        """
+        Return reply projected to nodes read by all tests sharing its snap
+        file if project is set, see snap_index.project_reply and add_tests
+        :param rpc_reply: RPC reply
+        :param format: xml/text
+        :param tests: test file entries of command/rpc
+        :return: projected reply, or reply itself if it can not be projected
+        """
+        if self.project is not True or self.index is True or format != 'xml' or \
+                not tests or rpc_reply is True:
+            return rpc_reply
+        try:
+            projection = project_reply(rpc_reply, self.get_shared_tests(tests))
+        except etree.LxmlError:
+            projection = None
+        if projection is None:
+            self.logger_snap.debug(
+                colorama.Fore.BLUE +
+                "Tests can not be run on projection, full reply is kept",
+                extra=self.log_detail)
+            return rpc_reply
+        return projection
+
+    def _get_auto_filter(self, rpc, format, tests):
+        """
+        Return arguments restricting reply of rpc to nodes read by all tests
+        sharing its snap file if auto_filter is set, see snap_filter
+        :param rpc: rpc name
+        :param format: xml/text
+        :param tests: test file entries of rpc
+        :return: dictionary of arguments, empty if reply is not restricted
+        """
+        if self.auto_filter is not True or format != 'xml' or not tests:
+            return {}
+        tests = [entry for shared in self.get_shared_tests(tests) for entry in shared]
+        try:
+            if rpc == 'get-config':
+                filter_xml = get_config_filter(tests)
+                kwargs = {} if filter_xml is None else {'filter_xml': filter_xml}
+            else:
+                kwargs = get_rpc_args(rpc, tests)
+        except etree.LxmlError:
+            kwargs = {}
+        if kwargs:
+            self.logger_snap.debug(
+                colorama.Fore.BLUE +
+                "Filter derived from tests of RPC %s: %s" %
+                (rpc, ", ".join(k if k == 'filter_xml' else "%s=%s" % (k, v)
+                                for k, v in sorted(kwargs.items()))),
+                extra=self.log_detail)
+        return kwargs
+
+    def _mark_filtered(self, rpc_reply, tests):
+        """
+        Keep keys of tests for which filter of rpc was derived in FILTER_ATTR
+        of root of reply, so that other tests are not run on it
+        :param rpc_reply: RPC reply
+        :param tests: test file entries of rpc
+        """
+        if rpc_reply is True or not hasattr(rpc_reply, 'set'):
+            return
+        rpc_reply.set(FILTER_ATTR, get_test_keys(self.get_shared_tests(tests)))
+
+    def _get_reply_key(self, tests):
+        """
+        Return command/rpc and format of snap file written for tests, tests
+        with same key share snap file
+        :param tests: test file entries of command/rpc
+        """
+        first = tests[0]
+        format = first.get('format', 'xml')
+        format = format if format in ['xml', 'text'] else 'xml'
+        if 'command' in first:
+            name = '_'.join(first['command'].split('|')[0].split())
+            return ('command', name, format)
+        return ('rpc', first['rpc'], format)
+
+    def add_tests(self, test_files):
+        """
+        Record tests of test files by command/rpc they test, so that replies
+        are projected and filtered for all tests sharing their snap file
+        :param test_files: list of test files
+        """
+        for test_file in test_files:
+            if any(f is test_file for f in self.test_files):
+                continue
+            self.test_files.append(test_file)
+            if 'tests_include' in test_file:
+                names = test_file.get('tests_include') or []
+            else:
+                names = [t for t in test_file if t != 'fail_fast']
+            for t in names:
+                try:
+                    key = self._get_reply_key(test_file[t])
+                except (KeyError, IndexError, TypeError, AttributeError):
+                    continue
+                shared = self.shared_tests.setdefault(key, [])
+                if not any(tests is test_file[t] for tests in shared):
+                    shared.append(test_file[t])
+
+    def get_shared_tests(self, tests):
+        """
+        Return test file entries of all tests sharing snap file with tests
+        :param tests: test file entries of command/rpc
+        :return: list of test file entries of every test
+        """
+        try:
+            shared = self.shared_tests.get(self._get_reply_key(tests))
+        except (KeyError, IndexError, TypeError, AttributeError):
+            shared = None
+        if not shared or not any(entry is tests for entry in shared):
+            return [tests]
+        return shared
+
+    def _store_reply(self, rpc_reply, format, snap_file, tests=None):
+        """
+        Keep reply for testing and write it in snap file, either directly or
+        through background writer
+        :param rpc_reply: RPC reply
+        :param format: xml/text
+        :param snap_file: name of file
+        :param tests: test file entries of command/rpc
+        """
+        self.snap_replies[snap_file] = rpc_reply
+        if self.persist is not True:
+            return
+        if self.background is True:
+            if self.writer is None:
+                self.writer_queue = Queue.Queue()
+                self.writer = threading.Thread(target=self._writer_loop)
+                self.writer.daemon = True
+                self.writer.start()
+            self.writer_queue.put((rpc_reply, format, snap_file, tests))
+        else:
+            self._write_file(rpc_reply, format, snap_file, tests)
+
+    def flush(self):
+        """
+        Wait till background writer has written all snap files
+        """
+        if self.writer is not None:
+            self.writer_queue.put(None)
+            self.writer.join()
+            self.writer = None
 
     def _write_warning(
             self, reply, db, snap_file, hostname, cmd_name, cmd_format, output_file):
-        with open(snap_file, 'w') as f:
-            f.write(reply)
+        self._save(reply, snap_file)
         if db['store_in_sqlite'] is True:
             self.store_in_sqlite(
                 db,
@@ -90,6 +380,13 @@ class Parser:
         cmd_rpc = re.sub('/|\*|\.|-|\|', '_', name)
         if os.path.isfile(output_file):
             return output_file
+        elif self.shard is True:
+            snapshot_path = get_path('DEFAULT', 'snapshot_path')
+            shard_dir = get_shard_dir(snapshot_path, hostname, output_file)
+            if shard_dir not in self.manifests:
+                self.manifests[shard_dir] = Manifest(
+                    snapshot_path, hostname, output_file)
+            return os.path.join(shard_dir, cmd_rpc + '.' + cmd_format)
         else:
             filename = hostname + '_' + output_file + \
                 '_' + cmd_rpc + '.' + cmd_format
@@ -118,6 +415,10 @@ class Parser:
         db_dict['filename'] = hostname + '_' + snap_name + \
             '_' + cmd_rpc_name + '.' + reply_format
         db_dict['format'] = reply_format
+        if db.get('keyframe_interval'):
+            db_dict['keyframe_interval'] = db['keyframe_interval']
+        if self.dedup is True:
+            db_dict['dedup'] = True
         if warning is False:
             db_dict['data'] = self._check_reply(rpc_reply, reply_format)
         else:
@@ -129,6 +430,7 @@ class Parser:
         This function takes snapshot for given command and write it in
         snapshot file or database
         """
+        from jnpr.junos.exception import RpcError
         command = test_file[t][0].get('command', "unknown command")
         cmd_format = test_file[t][0].get('format', 'xml')
         cmd_format = cmd_format if cmd_format in formats else 'xml'
@@ -194,7 +496,10 @@ class Parser:
                 hostname,
                 cmd_name,
                 cmd_format)
-            self._write_file(rpc_reply_command, cmd_format, snap_file)
+            rpc_reply_command = self._project(
+                rpc_reply_command, cmd_format, test_file[t])
+            self._store_reply(
+                rpc_reply_command, cmd_format, snap_file, test_file[t])
             if db['store_in_sqlite'] is True:
                 self.store_in_sqlite(
                     db,
@@ -210,10 +515,13 @@ class Parser:
         This function takes snapshot for given RPC and write it in
         snapshot file or database
         """
+        from jnpr.junos.exception import RpcError
         rpc = test_file[t][0].get('rpc', "unknown rpc")
         self.rpc_list.append(rpc)
         reply_format = test_file[t][0].get('format', 'xml')
         reply_format = reply_format if reply_format in formats else 'xml'
+        # reply restricted by filter derived from tests, see _get_auto_filter
+        filtered = False
         self.logger_snap.debug(colorama.Fore.BLUE +
                                "Tests Included : %s " %t,
                                extra=self.log_detail)
@@ -256,6 +564,12 @@ class Parser:
                         colorama.Fore.RED +
                         "ERROR!!, filtering rpc works only for 'get-config' rpc")
             else:
+                if rpc != 'get-config':
+                    for k, v in self._get_auto_filter(
+                            rpc, reply_format, test_file[t]).items():
+                        if k not in kwargs:
+                            kwargs[k] = v
+                            filtered = True
                 try:
                     # self.logger_snap.info(
                     #     colorama.Fore.BLUE +
@@ -295,6 +609,8 @@ class Parser:
                                            str(sys.exc_info()), extra=self.log_detail)
                     return
         else:
+            kwargs = self._get_auto_filter(rpc, reply_format, test_file[t])
+            filtered = bool(kwargs)
             try:
                 # self.logger_snap.info(
                 #     colorama.Fore.BLUE +
@@ -308,10 +624,11 @@ class Parser:
                             '-',
                             '_'))(
                         options={
-                            'format': reply_format})
+                            'format': reply_format},
+                        **kwargs)
                 else:
                     rpc_reply = getattr(
-                        dev.rpc, rpc.replace('-', '_'))({'format': reply_format})
+                        dev.rpc, rpc.replace('-', '_'))({'format': reply_format}, **kwargs)
             except RpcError as err:
                 snap_file = self.generate_snap_file(
                     output_file,
@@ -349,7 +666,10 @@ class Parser:
                 hostname,
                 rpc,
                 reply_format)
-            self._write_file(rpc_reply, reply_format, snap_file)
+            if filtered:
+                self._mark_filtered(rpc_reply, test_file[t])
+            rpc_reply = self._project(rpc_reply, reply_format, test_file[t])
+            self._store_reply(rpc_reply, reply_format, snap_file, test_file[t])
             self.reply[rpc] = rpc_reply
 
         if db['store_in_sqlite'] is True:
@@ -369,12 +689,14 @@ class Parser:
         test_included = []
         formats = ['xml', 'text']
         self.log_detail['hostname'] = hostname
+        self.add_tests([test_file])
 
         if 'tests_include' in test_file:
             test_included = test_file.get('tests_include')
         else:
             for t in test_file:
-                test_included.append(t)
+                if t != 'fail_fast':
+                    test_included.append(t)
 
         # adding test_included into global list
         self.test_included.extend(test_included)
@@ -0,0 +1,184 @@
+#!/usr/bin/python
+
+# Copyright (c) 1999-2016, Juniper Networks Inc.
+#
+# All rights reserved.
+#
+
+import re
+from lxml.builder import E
+from jnpr.jsnapy.snap_index import get_blocks
+
+# operational rpcs and their arguments restricting reply to one node, as
+# (element, key of element, argument, function giving argument from key)
+RPC_ARGS = {
+    'get-interface-information': [
+        ('physical-interface', 'name', 'interface_name', None)],
+    'get-bgp-neighbor-information': [
+        ('bgp-peer', 'peer-address', 'neighbor_address',
+         lambda value: value.split('+')[0])],
+    'get-route-information': [
+        ('route-table', 'table-name', 'table', None),
+        ('rt', 'rt-destination', 'destination', None)],
+}
+
+# '/' starting an absolute location path
+ABSOLUTE = re.compile(r"(^|[\s(,=<>!|+])/")
+
+# tag with optional [key='value'] predicate
+STEP = re.compile(r"""^([\w.-]+)(?:\[\s*([\w.-]+)\s*=\s*(['"])(.*?)\3\s*\])?$""")
+
+
+def _split(xpath):
+    """
+    Split xpath on '/' which are not inside predicates
+    """
+    parts = ['']
+    depth = 0
+    for char in xpath:
+        if char == '[':
+            depth += 1
+        elif char == ']':
+            depth -= 1
+        if char == '/' and depth == 0:
+            parts.append('')
+        else:
+            parts[-1] += char
+    return parts
+
+
+def get_steps(xpath, root=None):
+    """
+    Return steps of xpath as list of tuples of tag, key and value of
+    predicate. Xpath starting with '/' starts from root element, its first
+    step is dropped.
+    :param xpath: xpath of iterate/item block
+    :param root: tag of root element, if given xpath starting with '//' or
+                 with other root element is not accepted
+    :return: list of steps or None if xpath is not a plain path of tags with
+             [key='value'] predicates
+    """
+    xpath = xpath.strip()
+    parts = _split(xpath)
+    if xpath.startswith('//'):
+        if root is not None:
+            return None
+        parts = parts[2:]
+    elif xpath.startswith('/'):
+        if len(parts) < 2 or (root is not None and parts[1] != root):
+            return None
+        parts = parts[2:]
+    steps = []
+    for part in parts:
+        match = STEP.match(part.strip())
+        if match is None:
+            return None
+        steps.append((match.group(1), match.group(2), match.group(4)))
+    return steps
+
+
+def get_levels_up(paths):
+    """
+    Return number of levels given paths read above node
+    :param paths: paths read from node
+    :return: number of levels or None if paths read from anywhere else
+    """
+    levels = 0
+    for path in paths:
+        path = path.strip()
+        if path.startswith('/'):
+            return None
+        up = 0
+        while path.startswith('../'):
+            up += 1
+            path = path[3:]
+        if path == '..':
+            up += 1
+            path = ''
+        # other parent steps or absolute paths, even inside functions
+        if '..' in path or ABSOLUTE.search(path):
+            return None
+        levels = max(levels, up)
+    return levels
+
+
+def _get_block_steps(x_path, paths, root_paths, root=None):
+    """
+    Return steps of xpath of block which hold everything its tests read
+    """
+    steps = get_steps(x_path, root)
+    if steps is None:
+        return None
+    # all-same reads values of all nodes in xpath, below xpath
+    extra = []
+    for path in root_paths:
+        if not path.startswith(x_path):
+            return None
+        extra.append(path[len(x_path):].lstrip('/'))
+    up = get_levels_up(paths + extra)
+    if up is None or up >= len(steps):
+        return None
+    return steps[:len(steps) - up]
+
+
+def get_config_filter(tests, root='configuration'):
+    """
+    Return subtree filter of get-config holding everything read by tests
+    :param tests: list of test file entries of get-config rpc
+    :param root: root element of reply
+    :return: filter element or None if tests read from whole configuration
+    """
+    blocks = get_blocks(tests)
+    if not blocks:
+        return None
+    # step -> child steps, None if whole subtree is needed
+    tree = {}
+    for x_path, paths, root_paths in blocks:
+        steps = _get_block_steps(x_path, paths, root_paths, root)
+        if not steps:
+            return None
+        node = tree
+        for step in steps[:-1]:
+            if step in node and node[step] is None:
+                break
+            node = node.setdefault(step, {})
+        else:
+            node[steps[-1]] = None
+    return E(root, *_build(tree))
+
+
+def _build(tree):
+    elems = []
+    for (tag, key, value), children in sorted(tree.items()):
+        elem = E(tag)
+        if key is not None:
+            elem.append(E(key, value))
+        if children:
+            for child in _build(children):
+                elem.append(child)
+        elems.append(elem)
+    return elems
+
+
+def get_rpc_args(rpc, tests):
+    """
+    Return arguments of rpc restricting reply to nodes read by tests, see
+    RPC_ARGS
+    :param rpc: rpc name
+    :param tests: list of test file entries of rpc
+    :return: dictionary of arguments, empty if reply can not be restricted
+    """
+    blocks = get_blocks(tests)
+    if rpc not in RPC_ARGS or not blocks:
+        return {}
+    args = {}
+    for element, key, arg, func in RPC_ARGS[rpc]:
+        values = set()
+        for x_path, paths, root_paths in blocks:
+            steps = _get_block_steps(x_path, paths, root_paths) or []
+            matches = [v for tag, k, v in steps if tag == element and k == key]
+            values.add(matches[0] if len(matches) == 1 else None)
+        if len(values) == 1 and None not in values:
+            value = values.pop()
+            args[arg] = func(value) if func is not None else value
+    return args
@@ -0,0 +1,318 @@
+#!/usr/bin/python
+
+# Copyright (c) 1999-2016, Juniper Networks Inc.
+#
+# All rights reserved.
+#
+
+import os
+import json
+import hashlib
+from copy import deepcopy
+from lxml import etree
+
+# changed whenever content of index changes, so old indexes are not used
+INDEX_VERSION = '1'
+# attribute of root of projected snapshot, holding keys of its tests
+PROJECTION_ATTR = 'jsnapy-projection'
+# attribute of root of reply of rpc sent with filter derived from its tests
+FILTER_ATTR = 'jsnapy-filter'
+
+
+def get_index_file(snap_file):
+    """
+    Return name of index file kept alongside snap file
+    """
+    return snap_file + '.idx'
+
+
+def get_test_key(tests):
+    """
+    Return key of tests of a command or RPC, index made for these tests is
+    used only as long as they are not changed
+    :param tests: list of test file entries of command/rpc
+    :return: hex digest
+    """
+    blocks = [t for t in tests if isinstance(t, dict) and (
+        'iterate' in t or 'item' in t or 'ignore-null' in t)]
+    data = json.dumps(blocks, sort_keys=True, default=str)
+    return hashlib.sha1(INDEX_VERSION + data).hexdigest()
+
+
+def get_blocks(tests):
+    """
+    Return xpath of every iterate/item block along with relative paths its
+    tests read from nodes and absolute paths read by all-same
+    :param tests: list of test file entries of command/rpc
+    :return: list of tuples of xpath, relative paths and absolute paths
+    """
+    # imported here, check imports this module
+    from jnpr.jsnapy.check import Comparator
+    from jnpr.jsnapy.operator import Operator
+    comp = Comparator()
+    op = Operator()
+    blocks = []
+    for test in tests:
+        if not isinstance(test, dict) or not ('iterate' in test or 'item' in test):
+            continue
+        block = test.get('iterate') or test.get('item') or {}
+        x_path = block.get('xpath', "no_xpath")
+        ids = block.get('id', [])
+        if not isinstance(ids, list):
+            ids = [val.strip() for val in str(ids).split(',')]
+        group_tests, elements, messages = comp.get_group_fields(
+            block.get('tests', []))
+        paths = list(ids) + [e for e in elements if e != 'no node']
+        for mssg in messages:
+            paths.extend(field for _, field in op._get_fields(mssg))
+        root_paths = []
+        for elem in group_tests:
+            ele = elem.get('all-same')
+            if isinstance(ele, basestring):
+                ele_list = [e.strip() for e in ele.split(',')]
+                if len(ele_list) >= 2:
+                    root_paths.append(x_path + ele_list[1] + '/' + ele_list[0])
+                root_paths.append(x_path + '/' + ele_list[0])
+        blocks.append((x_path, paths, root_paths))
+    return blocks
+
+
+def _prune(elem, keep, ancestors):
+    """
+    Copy element keeping only nodes in keep, with whole subtree, and their
+    ancestors
+    """
+    if elem in keep:
+        return deepcopy(elem)
+    copy = etree.Element(elem.tag, attrib=dict(elem.attrib), nsmap=elem.nsmap)
+    copy.text = elem.text
+    for child in elem:
+        if child in keep or child in ancestors:
+            copy.append(_prune(child, keep, ancestors))
+    return copy
+
+
+def _values(result):
+    """
+    Comparable form of result of xpath, findall or findtext
+    """
+    if isinstance(result, list):
+        return [etree.tostring(r, with_tail=False) if isinstance(r, etree._Element)
+                else unicode(r) for r in result]
+    return result
+
+
+def _lookup(node, path):
+    values = []
+    for func in (node.xpath, node.findall, node.findtext):
+        try:
+            values.append(_values(func(path)))
+        except (etree.XPathError, SyntaxError, KeyError, TypeError):
+            values.append('error')
+    return values
+
+
+def _read_nodes(node, paths):
+    """
+    Return elements read by given paths from node, text and attributes are
+    read from their element
+    :return: list of elements or None if paths do not select elements only
+    """
+    read = []
+    for path in paths:
+        for func in (node.xpath, node.findall):
+            try:
+                result = func(path)
+            except (etree.XPathError, SyntaxError, KeyError, TypeError):
+                continue
+            if not isinstance(result, list):
+                return None
+            for res in result:
+                if isinstance(res, etree._Element):
+                    read.append(res)
+                elif getattr(res, 'getparent', None) is not None and \
+                        res.getparent() is not None:
+                    read.append(res.getparent())
+                else:
+                    return None
+    return read
+
+
+def _same_node(node, copy):
+    return (node.tag, node.text, dict(node.attrib)) == \
+        (copy.tag, copy.text, dict(copy.attrib))
+
+
+def build_index(tree, tests):
+    """
+    Make copy of snapshot holding only nodes read by given tests. Tests are
+    run on copy only if every xpath and every value they read is same in
+    copy and in snapshot, this is checked here.
+    :param tree: parsed snapshot
+    :param tests: list of test file entries of command/rpc
+    :return: copy of snapshot or None if it can not be used by tests
+    """
+    blocks = get_blocks(tests)
+    if not blocks:
+        return None
+    keep = set()
+    ancestors = set()
+    try:
+        for x_path, paths, root_paths in blocks:
+            nodes = tree.xpath(x_path)
+            if not isinstance(nodes, list):
+                return None
+            for node in nodes:
+                if not isinstance(node, etree._Element):
+                    return None
+                ancestors.update(node.iterancestors())
+                read = _read_nodes(node, paths)
+                if read is None:
+                    # whole node is kept if values it gives can not be traced
+                    keep.add(node)
+                    continue
+                ancestors.add(node)
+                for elem in read:
+                    keep.add(elem)
+                    ancestors.update(elem.iterancestors())
+            for path in root_paths:
+                read = _read_nodes(tree.getroot(), [path])
+                if read is None:
+                    return None
+                for elem in read:
+                    keep.add(elem)
+                    ancestors.update(elem.iterancestors())
+        index = etree.ElementTree(_prune(tree.getroot(), keep, ancestors))
+        for x_path, paths, root_paths in blocks:
+            nodes = tree.xpath(x_path)
+            copies = index.xpath(x_path)
+            if len(nodes) != len(copies):
+                return None
+            for node, copy in zip(nodes, copies):
+                if not _same_node(node, copy):
+                    return None
+                for path in paths:
+                    if _lookup(node, path) != _lookup(copy, path):
+                        return None
+            for path in root_paths:
+                if _values(tree.xpath(path)) != _values(index.xpath(path)):
+                    return None
+    except (etree.XPathError, TypeError):
+        return None
+    return index
+
+
+def get_test_keys(tests_list):
+    """
+    Return keys of all tests sharing a snapshot, as kept on its root
+    :param tests_list: list of test file entries of every test
+    :return: keys separated by space
+    """
+    return ' '.join(sorted(set(get_test_key(tests) for tests in tests_list)))
+
+
+def project_reply(reply, tests_list):
+    """
+    Return copy of reply holding only nodes read by all tests sharing its
+    snapshot, see build_index. Keys of these tests are kept in
+    PROJECTION_ATTR of its root.
+    :param reply: rpc reply
+    :param tests_list: list of test file entries of every test on command/rpc
+    :return: projected reply or None if tests can not run on projection
+    """
+    tests = [entry for tests in tests_list for entry in tests]
+    projection = build_index(etree.ElementTree(deepcopy(reply)), tests)
+    if projection is None:
+        return None
+    root = projection.getroot()
+    root.set(PROJECTION_ATTR, get_test_keys(tests_list))
+    return root
+
+
+def get_projection_keys(tree):
+    """
+    Return keys of tests for which snapshot is projected or filtered, see
+    project_reply and snap_filter
+    :param tree: parsed snapshot
+    :return: list of keys or None if snapshot holds full reply
+    """
+    root = tree.getroot() if hasattr(tree, 'getroot') else tree
+    keys = None
+    for attr in (PROJECTION_ATTR, FILTER_ATTR):
+        value = root.get(attr)
+        if value is not None:
+            attr_keys = value.split()
+            keys = attr_keys if keys is None else [k for k in keys if k in attr_keys]
+    return keys
+
+
+def write_index(snap_file, data, reply, tests):
+    """
+    Write index of snapshot for given tests, indexes of other tests on same
+    snapshot are kept
+    :param snap_file: name of snap file
+    :param data: data written in snap file
+    :param reply: rpc reply of snapshot
+    :param tests: list of test file entries of command/rpc
+    :return: True if index is written
+    """
+    digest = hashlib.sha1(data).hexdigest()
+    key = get_test_key(tests)
+    index_file = get_index_file(snap_file)
+    index = None
+    if os.path.isfile(index_file):
+        try:
+            index = etree.parse(index_file).getroot()
+        except etree.XMLSyntaxError:
+            index = None
+        if index is not None and index.get('digest') != digest:
+            index = None
+    if index is None:
+        index = etree.Element('index', digest=digest)
+    for entry in index.findall('entry'):
+        if entry.get('key') == key:
+            index.remove(entry)
+    pruned = build_index(etree.ElementTree(deepcopy(reply)), tests)
+    # index as big as snapshot only adds work
+    if pruned is not None and len(etree.tostring(pruned)) < len(data):
+        entry = etree.SubElement(index, 'entry', key=key)
+        entry.append(pruned.getroot())
+    if len(index):
+        # readers trust digest while snap file keeps this size and mtime
+        stat = os.stat(snap_file)
+        index.set('size', str(stat.st_size))
+        index.set('mtime', repr(stat.st_mtime))
+        with open(index_file, 'w') as f:
+            f.write(etree.tostring(index))
+        return pruned is not None
+    if os.path.isfile(index_file):
+        os.remove(index_file)
+    return False
+
+
+def read_index(snap_file, get_digest, key):
+    """
+    Return copy of snapshot made for tests with given key, see build_index
+    :param snap_file: name of snap file
+    :param get_digest: function returning sha1 of snap file, called only if
+                       size or modification time of snap file differ from
+                       those recorded in index, index of other snapshot is
+                       not used
+    :param key: key of tests, see get_test_key
+    :return: parsed copy of snapshot or None if there is no index
+    """
+    index_file = get_index_file(snap_file)
+    if not os.path.isfile(index_file):
+        return None
+    try:
+        index = etree.parse(index_file).getroot()
+    except etree.XMLSyntaxError:
+        return None
+    stat = os.stat(snap_file)
+    if (index.get('size'), index.get('mtime')) != (str(stat.st_size), repr(stat.st_mtime)) \
+            and index.get('digest') != get_digest(snap_file):
+        return None
+    for entry in index.findall('entry'):
+        if entry.get('key') == key and len(entry):
+            return etree.ElementTree(deepcopy(entry[0]))
+    return None
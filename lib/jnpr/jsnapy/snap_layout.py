@@ -0,0 +1,107 @@
+#!/usr/bin/python
+
+# Copyright (c) 1999-2016, Juniper Networks Inc.
+#
+# All rights reserved.
+#
+
+import os
+import json
+import time
+import hashlib
+
+# file in every shard directory listing its snap files
+MANIFEST = 'manifest.json'
+
+
+def get_shard_dir(snapshot_path, hostname, tag):
+    """
+    Return directory holding snap files of one device and tag in sharded
+    layout, <snapshot_path>/<hostname>/<tag>
+    """
+    return os.path.join(snapshot_path, str(hostname), tag)
+
+
+class Manifest:
+
+    """
+    Snap files of a shard directory, with their size, modification time and
+    sha1, written every time a snap file is written. Snap files are looked up
+    here instead of in snapshot directory, files missing in manifest are
+    looked up in flat layout, <snapshot_path>/<hostname>_<tag>_<cmd>.<format>
+    """
+
+    def __init__(self, snapshot_path, hostname, tag):
+        self.snapshot_path = snapshot_path
+        self.hostname = str(hostname)
+        self.tag = tag
+        self.shard_dir = get_shard_dir(snapshot_path, hostname, tag)
+        self.manifest_file = os.path.join(self.shard_dir, MANIFEST)
+        self.files = {}
+        self.load()
+
+    def load(self):
+        """
+        Read manifest file, entries of snap files written in earlier runs
+        with same tag are kept
+        :return: True if manifest file is present
+        """
+        if not os.path.isfile(self.manifest_file):
+            return False
+        try:
+            with open(self.manifest_file, 'r') as f:
+                self.files = json.load(f).get('files', {})
+        except (IOError, ValueError, AttributeError):
+            self.files = {}
+            return False
+        return True
+
+    def get_file(self, name):
+        """
+        Return full name of snap file if it is in manifest
+        :param name: name of snap file in shard directory
+        :return: file name or None
+        """
+        if name not in self.files:
+            return None
+        return os.path.join(self.shard_dir, name)
+
+    def get_digest(self, name, stat):
+        """
+        Return sha1 of snap file recorded in manifest
+        :param name: name of snap file in shard directory
+        :param stat: os.stat of snap file, digest of a file changed since it
+                     was recorded is not returned
+        :return: hex digest or None
+        """
+        entry = self.files.get(name)
+        if entry is None or (entry.get('size'), entry.get('mtime')) != \
+                (stat.st_size, stat.st_mtime):
+            return None
+        return entry.get('sha1')
+
+    def add(self, name, data):
+        """
+        Record snap file which was just written and write manifest
+        :param name: name of snap file in shard directory
+        :param data: data written in snap file
+        """
+        stat = os.stat(os.path.join(self.shard_dir, name))
+        self.files[name] = {
+            'path': os.path.join(self.hostname, self.tag, name),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'sha1': hashlib.sha1(data).hexdigest()}
+        self.write()
+
+    def write(self):
+        """
+        Write manifest through temporary file, so readers never see it half
+        written
+        """
+        tmp_file = self.manifest_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump({'hostname': self.hostname, 'tag': self.tag,
+                       'updated': time.time(), 'files': self.files},
+                      f, indent=1, sort_keys=True)
+        os.rename(tmp_file, self.manifest_file)
@@ -10,8 +10,61 @@ import os
 import sqlite3
 import logging
 import colorama
+from collections import OrderedDict
+from lxml import etree
 from jnpr.jsnapy import get_path
+from jnpr.jsnapy.sqlite_store import reconstruct_data, get_blob, apply_delta, make_digest
 
+# values extracted from snapshots by get_history, keyed by digest of snapshot
+# and query, so every stored snapshot is parsed once for a query
+history_cache = OrderedDict()
+HISTORY_CACHE_SIZE = 10000
+
+
+def get_id_list(id_list):
+    """
+    Return ids of nodes as list, ids given as string are separated by comma
+    as in id of iterate block
+    """
+    if id_list is None:
+        return []
+    if isinstance(id_list, basestring):
+        return [val.strip() for val in id_list.split(',')]
+    return list(id_list)
+
+
+def get_text(result):
+    """
+    Return text of xpath result, which is a node set, string or attribute
+    :param result: result of xpath
+    :return: stripped text of first node, None if there is no node or text
+    """
+    if isinstance(result, list):
+        result = result[0] if result else None
+    if isinstance(result, etree._Element):
+        return result.text.strip() if result.text is not None else None
+    elif isinstance(result, basestring):
+        return str(result).strip()
+    return result
+
+
+def extract_values(data, xpath, id_list, field):
+    """
+    Return value of field for every node in xpath of snapshot
+    :param data: xml data of snapshot
+    :param xpath: xpath of nodes
+    :param id_list: list of ids of nodes, or ids separated by comma
+    :param field: path of value, relative to node
+    :return: dictionary mapping tuple of id values to value of field
+    """
+    id_list = get_id_list(id_list)
+    values = {}
+    for node in etree.fromstring(data).xpath(xpath):
+        if not isinstance(node, etree._Element):
+            continue
+        ids = tuple(get_text(node.xpath(id)) for id in id_list)
+        values.setdefault(ids, get_text(node.xpath(field)))
+    return values
 
 
 class SqliteExtractXml:
@@ -31,6 +84,29 @@ class SqliteExtractXml:
                 db_name, extra=self.sqlite_logs)
             sys.exit(1)
 
+    def _expand_data(self, cursor, table_name, command_name, snap_id, data):
+        """
+        Rebuild full data if snapshot is stored as delta or only by its digest
+        :param snap_id: id of snapshot
+        :param data: data stored in row of snapshot
+        :return: full data of snapshot
+        """
+        columns = [col[1] for col in cursor.execute(
+            "PRAGMA table_info('%s')" % table_name)]
+        if 'delta' not in columns or 'digest' not in columns:
+            return data
+        cursor.execute("SELECT delta, digest FROM %s WHERE id = :id AND cli_command = :cli" % table_name,
+                       {'id': snap_id, 'cli': command_name})
+        row = cursor.fetchone()
+        if row is None:
+            return data
+        delta, digest = row
+        if delta:
+            data = reconstruct_data(cursor, table_name, command_name, snap_id)
+        elif data is None and digest is not None:
+            data = get_blob(cursor, table_name, digest)
+        return data
+
     def get_xml_using_snapname(self, hostname, command_name, snap_name):
         """
         Return name of snap file from database
@@ -55,6 +131,8 @@ class SqliteExtractXml:
                              '_',
                              ' ')))
                 idd, data_format, data = row
+                data = self._expand_data(
+                    cursor, table_name, command_name, idd, data)
                 if data is None:
                     raise Exception("No previous snapshots exists with name = %s for command = %s" %(snap_name, command_name.replace('_',' ')))
             except Exception as ex:
@@ -91,6 +169,8 @@ class SqliteExtractXml:
                              '_',
                              ' ')))
                 idd, data_format, data = row
+                data = self._expand_data(
+                    cursor, table_name, command_name, idd, data)
                 if data is None:
                     raise Exception("No previous snapshots exists with id = %s for command = %s" %(snap_id, command_name.replace('_',' ')))
             except Exception as ex:
@@ -101,3 +181,132 @@ class SqliteExtractXml:
 
             else:
                 return str(data), data_format
+
+    def get_xml_bulk(self, hostname, command_names, snaps, snap_id=False):
+        """
+        Return data of all given commands for all given snapshots, fetched
+        with one query in one transaction
+        :param command_names: list of Commands / RPCs
+        :param snaps: list of snap names, or snap ids if snap_id is True
+        :param snap_id: True if snaps are snap ids
+        :return: dictionary mapping (command, snap) to data and data format,
+                 missing snapshots are mapped to (str(None), None)
+        """
+        self.sqlite_logs['hostname'] = hostname
+        table_name = 'table_' + hostname.replace('.', '__')
+        key = 'id' if snap_id else 'name'
+        replies = {}
+        with sqlite3.connect(self.db_filename) as con:
+            try:
+                cursor = con.cursor()
+                columns = [col[1] for col in cursor.execute(
+                    "PRAGMA table_info('%s')" % table_name)]
+                snap_column = 'id' if snap_id else 'snap_name'
+                row_columns = 'delta, digest' if 'delta' in columns and 'digest' in columns else '0, NULL'
+                params = {}
+                for i, command_name in enumerate(command_names):
+                    params['cli%d' % i] = command_name
+                for i, snap in enumerate(snaps):
+                    params['snap%d' % i] = snap
+                # for every command and snapshot, latest row is picked as in
+                # get_xml_using_snapname
+                cursor.execute("SELECT cli_command, {0}, MIN(id), data_format, data, {1} FROM {2} "
+                               "WHERE cli_command IN ({3}) AND {0} IN ({4}) GROUP BY cli_command, {0}".format(
+                                   snap_column,
+                                   row_columns,
+                                   table_name,
+                                   ', '.join(':cli%d' % i for i in range(len(command_names))),
+                                   ', '.join(':snap%d' % i for i in range(len(snaps)))),
+                               params)
+                for command_name, snap, idd, data_format, data, delta, digest in cursor.fetchall():
+                    if delta:
+                        data = reconstruct_data(
+                            cursor, table_name, command_name, idd)
+                    elif data is None and digest is not None:
+                        data = get_blob(cursor, table_name, digest)
+                    if data is not None:
+                        replies[(command_name, snap)] = (str(data), data_format)
+            except Exception as ex:
+                self.logger_sqlite.error(
+                    colorama.Fore.RED +
+                    "ERROR!! Complete message is: %s" % ex, extra=self.sqlite_logs)
+                return dict(((command_name, snap), (str(None), None))
+                            for command_name in command_names for snap in snaps)
+        for command_name in command_names:
+            for snap in snaps:
+                if (command_name, snap) not in replies:
+                    self.logger_sqlite.error(
+                        colorama.Fore.RED +
+                        "ERROR!! Complete message is: No previous snapshots exists with %s = %s for command = %s" %
+                        (key, snap, command_name.replace('_', ' ')), extra=self.sqlite_logs)
+                    replies[(command_name, snap)] = (str(None), None)
+        return replies
+
+    def get_history(self, hostname, command_name, xpath, id_list, field, last=None):
+        """
+        Return value of field in every stored snapshot of command, oldest
+        first. All snapshots are read with one query in one transaction and
+        snapshots stored as delta are rebuilt from previous one, values of
+        every snapshot are kept in history_cache.
+        :param command_name: Command / RPC
+        :param xpath: xpath of nodes
+        :param id_list: list of ids of nodes, or ids separated by comma
+        :param field: path of value, relative to node
+        :param last: if given, only these many latest snapshots are read
+        :return: list of tuples of snap id, snap name and dictionary mapping
+                 tuple of id values to value of field, None for snapshots
+                 which are not xml
+        """
+        self.sqlite_logs['hostname'] = hostname
+        table_name = 'table_' + hostname.replace('.', '__')
+        id_list = get_id_list(id_list)
+        query = (xpath, tuple(id_list), field)
+        history = []
+        with sqlite3.connect(self.db_filename) as con:
+            try:
+                cursor = con.cursor()
+                columns = [col[1] for col in cursor.execute(
+                    "PRAGMA table_info('%s')" % table_name)]
+                row_columns = 'delta, digest' if 'delta' in columns and 'digest' in columns else '0, NULL'
+                cursor.execute("SELECT id, snap_name, data_format, data, {0} FROM {1} "
+                               "WHERE cli_command = :cli AND id < :last ORDER BY id DESC".format(
+                                   row_columns, table_name),
+                               {'cli': command_name, 'last': last if last is not None else 50})
+                rows = cursor.fetchall()
+                if not rows:
+                    raise Exception("No previous snapshots exists for command = %s" %
+                                    command_name.replace('_', ' '))
+                previous = None
+                blobs = {}
+                for idd, snap_name, data_format, data, delta, digest in rows:
+                    if delta:
+                        # previous row is older snapshot, delta is made against it
+                        if previous is not None and previous[0] == idd + 1:
+                            data = apply_delta(previous[1], data)
+                        else:
+                            data = reconstruct_data(
+                                cursor, table_name, command_name, idd)
+                    elif data is None and digest is not None:
+                        if digest not in blobs:
+                            blobs[digest] = get_blob(cursor, table_name, digest)
+                        data = blobs[digest]
+                    previous = (idd, data)
+                    if data is None or data_format != 'xml':
+                        history.append((idd, snap_name, None))
+                        continue
+                    key = (digest or make_digest(data),) + query
+                    if key in history_cache:
+                        values = history_cache.pop(key)
+                    else:
+                        values = extract_values(str(data), xpath, id_list, field)
+                    history_cache[key] = values
+                    if len(history_cache) > HISTORY_CACHE_SIZE:
+                        history_cache.popitem(last=False)
+                    # callers get their own copy of cached values
+                    history.append((idd, snap_name, dict(values)))
+            except Exception as ex:
+                self.logger_sqlite.error(
+                    colorama.Fore.RED +
+                    "ERROR!! Complete message is: %s" % ex, extra=self.sqlite_logs)
+                return []
+        return history
@@ -6,11 +6,111 @@
 #
 
 import os
+import json
+import hashlib
+import difflib
 import sqlite3
 import logging
 from jnpr.jsnapy import get_path
 
 
+def make_delta(base, data):
+    """
+    Encode data as line based delta against base.
+    Delta is a json list, where [start, end] copies lines start:end of base
+    and a string is inserted as it is.
+    :param base: data of previous snapshot
+    :param data: data of new snapshot
+    :return: json encoded delta
+    """
+    base_lines = base.splitlines(True)
+    data_lines = data.splitlines(True)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, base_lines, data_lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif tag in ('replace', 'insert'):
+            ops.append(''.join(data_lines[j1:j2]))
+    return json.dumps(ops)
+
+
+def apply_delta(base, delta):
+    """
+    Rebuild data from base and delta created by make_delta
+    :param base: data of previous snapshot
+    :param delta: json encoded delta
+    :return: data of new snapshot
+    """
+    base_lines = base.splitlines(True)
+    lines = []
+    for op in json.loads(delta):
+        if isinstance(op, list):
+            lines.extend(base_lines[op[0]:op[1]])
+        else:
+            lines.append(op)
+    return ''.join(lines)
+
+
+def make_digest(data):
+    """
+    Return sha1 of data, used to find identical snapshots
+    :param data: data of snapshot
+    :return: hex digest or None if there is no data
+    """
+    if data is None:
+        return None
+    if isinstance(data, unicode):
+        data = data.encode('utf-8')
+    return hashlib.sha1(data).hexdigest()
+
+
+def get_blob(cursor, table_name, digest):
+    """
+    Return full data stored for given digest. Identical snapshots are stored
+    only once, other rows keep only the digest.
+    :param cursor: sqlite cursor
+    :param table_name: table of the host
+    :param digest: sha1 of data
+    :return: data or None if no row holds it
+    """
+    cursor.execute("SELECT data FROM '%s' WHERE digest = :digest AND delta = 0 AND data IS NOT NULL LIMIT 1" % table_name,
+                   {'digest': digest})
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def reconstruct_data(cursor, table_name, cli_command, snap_id):
+    """
+    Return full data of snapshot with given id. Rows stored as delta are
+    applied one by one starting from nearest older keyframe, so at most
+    keyframe interval deltas are applied.
+    :param cursor: sqlite cursor
+    :param table_name: table of the host
+    :param cli_command: Command / RPC
+    :param snap_id: id of snapshot
+    :return: data of snapshot
+    """
+    cursor.execute("SELECT MIN(id) FROM '%s' WHERE id >= :id AND cli_command = :cli AND delta = 0" % table_name,
+                   {'id': snap_id, 'cli': cli_command})
+    keyframe = cursor.fetchone()[0]
+    if keyframe is None:
+        raise Exception("No keyframe found for snapshot id = %s of command = %s" %
+                        (snap_id, cli_command.replace('_', ' ')))
+    cursor.execute("SELECT id, data, digest FROM '%s' WHERE id >= :id AND id <= :keyframe AND cli_command = :cli "
+                   "ORDER BY id DESC" % table_name,
+                   {'id': snap_id, 'keyframe': keyframe, 'cli': cli_command})
+    data = None
+    for idd, row_data, digest in cursor.fetchall():
+        if idd != keyframe:
+            data = apply_delta(data, row_data)
+        elif row_data is None and digest is not None:
+            data = get_blob(cursor, table_name, digest)
+        else:
+            data = row_data
+    return data
+
+
 class JsnapSqlite:
 
     def __init__(self, host, db_name):
@@ -32,26 +132,96 @@ class JsnapSqlite:
                     cli_command  text,
                     snap_name    text,
                     data_format  text,
-                    data     text
+                    data     text,
+                    delta    integer default 0,
+                    digest   text
                 );""" % self.table_name
                 conn.execute(sqlstr)
+                # tables created by older versions do not have these columns
+                columns = [col[1] for col in conn.execute(
+                    "PRAGMA table_info('%s')" % self.table_name)]
+                for column, column_type in [('delta', 'integer default 0'), ('digest', 'text')]:
+                    if column not in columns:
+                        conn.execute(
+                            "alter table '%s' add column %s %s" %
+                            (self.table_name, column, column_type))
         except Exception as ex:
             self.logger_storesqlite.error(
                 "\nERROR occurred in database:    %s" %
                 str(ex))
 
+    def _get_delta(self, cursor, db):
+        """
+        Decide whether new snapshot is stored as delta against previous one.
+        :param cursor: sqlite cursor
+        :param db: dictionary containing data to be inserted
+        :return: tuple of data to be stored and delta flag
+        """
+        keyframe_interval = db.get('keyframe_interval')
+        if not keyframe_interval or keyframe_interval <= 1 or db['data'] is None:
+            return db['data'], 0
+        cursor.execute("SELECT MIN(id) FROM '%s' WHERE id >= 1 AND cli_command = :cli AND delta = 0" % self.table_name,
+                       {'cli': db['cli_command']})
+        keyframe = cursor.fetchone()[0]
+        # new keyframe once chain of deltas reaches keyframe interval
+        if keyframe is None or keyframe >= keyframe_interval:
+            return db['data'], 0
+        cursor.execute("SELECT data_format FROM '%s' WHERE id = 1 AND cli_command = :cli" % self.table_name,
+                       {'cli': db['cli_command']})
+        if cursor.fetchone()[0] != db['format']:
+            return db['data'], 0
+        base = reconstruct_data(
+            cursor,
+            self.table_name,
+            db['cli_command'],
+            1)
+        if base is None:
+            return db['data'], 0
+        delta = make_delta(base, db['data'])
+        if len(delta) >= len(db['data']):
+            return db['data'], 0
+        return delta, 1
+
     def insert_data(self, db):
         """
         Function to Insert Data in database
-        :param db: database name
+        :param db: dictionary containing data to be inserted, if it contains
+                   keyframe_interval then data is stored as delta against previous
+                   snapshot with full copy after every keyframe_interval snapshots.
+                   If dedup is set then data already stored in another row is not
+                   stored again, row keeps only its digest.
         """
+        digest = make_digest(db['data'])
         with sqlite3.connect(self.db_filename) as con:
-            con.execute("""update '%s' set id = id + 1 where cli_command = :cli""" % self.table_name,
-                        {'cli': db['cli_command']})
-            con.execute("""delete from '%s' where id>49 AND cli_command = :cli""" % self.table_name,
-                        {'cli': db['cli_command']})
-            con.execute("""insert into '%s' (id, filename, cli_command, snap_name, data_format, data) values (0, :file,
-                         :cli, :snap, :format, :xml)""" % self.table_name, {'file': db['filename'],
-                                                                            'cli': db['cli_command'], 'snap': db['snap_name'],
-                                                                            'format': db['format'], 'xml': db['data']})
+            cursor = con.cursor()
+            cursor.execute("""update '%s' set id = id + 1 where cli_command = :cli""" % self.table_name,
+                           {'cli': db['cli_command']})
+            # oldest snapshot kept should not depend on snapshots being deleted
+            cursor.execute("""select id from '%s' where id = 49 AND cli_command = :cli AND delta = 1""" % self.table_name,
+                           {'cli': db['cli_command']})
+            if cursor.fetchone() is not None:
+                cursor.execute("""update '%s' set data = :xml, delta = 0 where id = 49 AND cli_command = :cli""" % self.table_name,
+                               {'xml': reconstruct_data(cursor, self.table_name, db['cli_command'], 49),
+                                'cli': db['cli_command']})
+            # hand over data of deleted rows to rows which share it by digest
+            cursor.execute("""select digest, data from '%s' where id>49 AND cli_command = :cli AND delta = 0
+                           AND data is not null AND digest is not null""" % self.table_name,
+                           {'cli': db['cli_command']})
+            for old_digest, old_data in cursor.fetchall():
+                cursor.execute("""update '%s' set data = :xml where rowid = (select rowid from '%s' where digest = :digest
+                               AND delta = 0 AND data is null AND NOT (id>49 AND cli_command = :cli) limit 1)"""
+                               % (self.table_name, self.table_name),
+                               {'xml': old_data, 'digest': old_digest, 'cli': db['cli_command']})
+            cursor.execute("""delete from '%s' where id>49 AND cli_command = :cli""" % self.table_name,
+                           {'cli': db['cli_command']})
+            if db.get('dedup') is True and digest is not None and get_blob(
+                    cursor, self.table_name, digest) is not None:
+                data, delta = None, 0
+            else:
+                data, delta = self._get_delta(cursor, db)
+            cursor.execute("""insert into '%s' (id, filename, cli_command, snap_name, data_format, data, delta, digest) values (0, :file,
+                         :cli, :snap, :format, :xml, :delta, :digest)""" % self.table_name, {'file': db['filename'],
+                                                                                              'cli': db['cli_command'], 'snap': db['snap_name'],
+                                                                                              'format': db['format'], 'xml': data, 'delta': delta,
+                                                                                              'digest': digest})
             con.commit()
@@ -89,7 +89,7 @@ setup(name="jsnapy",
       package_dir={'': 'lib'},
       packages=find_packages('lib'),
       package_data={
-           'jnpr.jsnapy': ['jsnapy.cfg', 'logging.yml', 'content.html'],
+           'jnpr.jsnapy': ['jsnapy.cfg', 'logging.yml', 'content.html', 'digest.html'],
       },
       entry_points={
           'console_scripts': [
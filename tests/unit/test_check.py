@@ -1,6 +1,7 @@
 import unittest
 import os
 import yaml
+from lxml import etree
 from jnpr.jsnapy.check import Comparator
 from mock import patch, MagicMock
 from nose.plugins.attrib import attr
@@ -171,6 +172,72 @@ class TestCheck(unittest.TestCase):
                 "snap_no-diff_post")
             self.assertTrue(mock_compare.called)
 
+    @patch('logging.Logger.info')
+    @patch('jnpr.jsnapy.check.get_path')
+    def test_compare_xml_unchanged(self, mock_path, mock_info):
+        self.chk = True
+        comp = Comparator()
+        conf_file = os.path.join(os.path.dirname(__file__),
+                                 'configs', 'main_empty_test.yml')
+        mock_path.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        config_file = open(conf_file, 'r')
+        main_file = yaml.load(config_file)
+        with patch('jnpr.jsnapy.check.XmlComparator.xml_compare') as mock_compare:
+            oper = comp.generate_test_files(
+                main_file,
+                self.hostname,
+                self.chk,
+                self.diff,
+                self.db,
+                self.snap_del,
+                "snap_no-diff_pre",
+                self.action,
+                "snap_no-diff_pre")
+            self.assertFalse(mock_compare.called)
+            self.assertEqual(oper.no_passed, 1)
+            self.assertEqual(oper.no_failed, 0)
+
+    @patch('logging.Logger.info')
+    @patch('jnpr.jsnapy.check.get_path')
+    def test_live_replies(self, mock_path, mock_info):
+        mock_path.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        conf_file = os.path.join(os.path.dirname(__file__),
+                                 'configs', 'main_is-equal.yml')
+        main_file = yaml.load(open(conf_file, 'r'))
+        # replies from device are children of rpc-reply
+        rpc_reply = etree.Element('rpc-reply')
+        rpc_reply.append(etree.parse(os.path.join(
+            os.path.dirname(__file__), 'configs',
+            '10.216.193.114_snap_is-equal_pre_show_interfaces_terse_ge__.xml')).getroot())
+        snap_file = os.path.join(os.path.dirname(__file__), 'configs',
+                                 '10.216.193.114_snap_live_show_interfaces_terse_ge__.xml')
+        comp = Comparator({snap_file: rpc_reply[0]})
+        with patch('jnpr.jsnapy.check.etree.parse') as mock_parse:
+            oper = comp.generate_test_files(
+                main_file,
+                self.hostname,
+                self.chk,
+                self.diff,
+                self.db,
+                self.snap_del,
+                "snap_live")
+            self.assertFalse(mock_parse.called)
+        self.assertEqual(oper.no_passed, 0)
+        self.assertEqual(oper.no_failed, 1)
+
+    def test_is_unchanged(self):
+        comp = Comparator()
+        pre = os.path.join(os.path.dirname(__file__), 'configs',
+                           '10.216.193.114_snap_no-diff_pre_show_interfaces_terse_ge__.xml')
+        post = os.path.join(os.path.dirname(__file__), 'configs',
+                            '10.216.193.114_snap_no-diff_post_show_interfaces_terse_ge__.xml')
+        self.assertTrue(comp.is_unchanged(self.db, pre, pre))
+        self.assertFalse(comp.is_unchanged(self.db, pre, post))
+        self.assertFalse(comp.is_unchanged(self.db, pre, "no_such_file"))
+        self.db['check_from_sqlite'] = True
+        self.assertTrue(comp.is_unchanged(self.db, "<a/>", "<a/>"))
+        self.assertFalse(comp.is_unchanged(self.db, "None", "None"))
+
     @patch('logging.Logger.info')
     @patch('jnpr.jsnapy.check.get_path')
     def test_compare_diff(self, mock_path, mock_info):
@@ -181,7 +248,7 @@ class TestCheck(unittest.TestCase):
                                  'configs', 'main_empty_test.yml')
         config_file = open(conf_file, 'r')
         main_file = yaml.load(config_file)
-        with patch('jnpr.jsnapy.check.diff') as mock_compare:
+        with patch('icdiff.diff') as mock_compare:
             comp.generate_test_files(
                 main_file,
                 self.hostname,
@@ -324,6 +391,41 @@ class TestCheck(unittest.TestCase):
         self.assertEqual(oper.no_failed, 0)
         self.assertEqual(oper.result, 'Passed')
 
+    @patch('jnpr.jsnapy.check.get_path')
+    def test_fused_group(self, mock_path):
+        self.chk = False
+        conf_file = os.path.join(os.path.dirname(__file__),
+                                 'configs', 'main_conditional_op_fail.yml')
+        mock_path.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        config_file = open(conf_file, 'r')
+        main_file = yaml.load(config_file)
+        args = (main_file, self.hostname, self.chk, self.diff, self.db,
+                self.snap_del, "snap_all-same-success_pre")
+        with patch('jnpr.jsnapy.operator.Operator.start_group') as mock_group:
+            expected = Comparator().generate_test_files(*args)
+        self.assertTrue(mock_group.called)
+        with patch('jnpr.jsnapy.check.etree.parse', side_effect=etree.parse) as mock_parse:
+            oper = Comparator().generate_test_files(*args)
+            # snapshot is parsed once for all tests of the block
+            self.assertEqual(mock_parse.call_count, 1)
+        self.assertIsNone(oper.group)
+        self.assertEqual(oper.test_results, expected.test_results)
+        self.assertEqual(oper.result_dict, expected.result_dict)
+        self.assertEqual(oper.no_passed, expected.no_passed)
+        self.assertEqual(oper.no_failed, expected.no_failed)
+
+    def test_get_group_fields(self):
+        comp = Comparator()
+        tests, elements, messages = comp.get_group_fields([
+            {'OR': [{'all-same': 'flap-count', 'err': "flap {{post['flap-count']}}",
+                     'info': "{{id_0}}"},
+                    {'is-in': 'peer-state, Active, Inactive'}]},
+            {'is-equal': 'local-address, unspecified'}])
+        self.assertEqual(len(tests), 3)
+        self.assertEqual(elements, ['flap-count', 'peer-state', 'local-address'])
+        self.assertEqual(messages[0], "flap {{post['flap-count']}}")
+        self.assertEqual(len(messages), 6)
+
 if __name__ == "__main__":
     suite = unittest.TestLoader().loadTestsFromTestCase(TestCheck)
     unittest.TextTestRunner(verbosity=2).run(suite)
@@ -1,9 +1,16 @@
 import unittest
 import yaml
 from jnpr.jsnapy.check import Comparator
-from mock import patch
+from jnpr.jsnapy.operator import Operator
+from mock import patch, MagicMock
 from nose.plugins.attrib import attr
 import os
+import shutil
+import tempfile
+import pickle
+import logging
+import logging.handlers
+from lxml import etree
 
 @attr('unit')
 class TestComparisonOperator(unittest.TestCase):
@@ -506,6 +513,330 @@ class TestComparisonOperator(unittest.TestCase):
         self.assertEqual(oper.no_passed, 2)
         self.assertEqual(oper.no_failed, 4)
     
+    @patch('jnpr.jsnapy.check.get_path')
+    def test_no_diff_fail_fast(self, mock_path):
+        self.chk = True
+        comp = Comparator()
+        conf_file = os.path.join(os.path.dirname(__file__),
+                                 'configs', 'main_no-diff.yml')
+        mock_path.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        config_file = open(conf_file, 'r')
+        main_file = yaml.load(config_file)
+        main_file['fail_fast'] = True
+        oper = comp.generate_test_files(
+            main_file,
+            self.hostname,
+            self.chk,
+            self.diff,
+            self.db,
+            self.snap_del,
+            "snap_no-diff_pre",
+            self.action,
+            "snap_no-diff_post")
+        self.assertEqual(oper.no_passed, 0)
+        self.assertEqual(oper.no_failed, 1)
+        self.assertEqual(oper.result, "Failed")
+        self.assertTrue(oper.truncated)
+        details = oper.test_results.values()[0]
+        self.assertEqual(len(details), 1)
+        self.assertTrue(details[0]['truncated'])
+        self.assertEqual(details[0]['passed'], [])
+        self.assertEqual(len(details[0]['failed']), 1)
+
+    @patch('jnpr.jsnapy.check.get_path')
+    def test_fail_fast_test_file(self, mock_path):
+        self.chk = True
+        configs = os.path.join(os.path.dirname(__file__), 'configs')
+        tmp_dir = tempfile.mkdtemp()
+        mock_path.return_value = tmp_dir
+        try:
+            for snap in ['pre', 'post']:
+                name = '%s_snap_no-diff_%s_show_interfaces_terse_ge__.xml' % (self.hostname, snap)
+                shutil.copy(os.path.join(configs, name), tmp_dir)
+            tests = yaml.load(open(os.path.join(configs, 'no-diff.yml'), 'r'))
+            fail_fast = {'fail_fast': True, 'tests_include': ['test_fail_fast'],
+                         'test_fail_fast': tests['test_command_version']}
+            for name, data in [('no-diff.yml', tests), ('fail-fast.yml', fail_fast)]:
+                with open(os.path.join(tmp_dir, name), 'w') as f:
+                    yaml.dump(data, f)
+            main_file = {'tests': ['no-diff.yml', 'fail-fast.yml']}
+            oper = Comparator().generate_test_files(
+                main_file,
+                self.hostname,
+                self.chk,
+                self.diff,
+                self.db,
+                self.snap_del,
+                "snap_no-diff_pre",
+                self.action,
+                "snap_no-diff_post")
+        finally:
+            shutil.rmtree(tmp_dir)
+        # failure of other test file does not stop test file given fail_fast
+        self.assertEqual(oper.result_dict, {'test_command_version': False,
+                                            'test_fail_fast': False})
+        self.assertEqual((oper.no_passed, oper.no_failed), (2, 5))
+        self.assertTrue(oper.truncated)
+
+    @patch('jnpr.jsnapy.check.get_path')
+    def test_no_diff_retention(self, mock_path):
+        self.chk = True
+        conf_file = os.path.join(os.path.dirname(__file__),
+                                 'configs', 'main_no-diff.yml')
+        mock_path.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        config_file = open(conf_file, 'r')
+        main_file = yaml.load(config_file)
+        for retention, max_records in [('failures', None), ('counts', None), ('full', 2)]:
+            main_file['result_retention'] = retention
+            main_file['max_records'] = max_records
+            oper = Comparator().generate_test_files(
+                main_file,
+                self.hostname,
+                self.chk,
+                self.diff,
+                self.db,
+                self.snap_del,
+                "snap_no-diff_pre",
+                self.action,
+                "snap_no-diff_post")
+            self.assertEqual(oper.no_passed, 2)
+            self.assertEqual(oper.no_failed, 4)
+            details = oper.test_results.values()[0]
+            self.assertEqual(len(details), 6)
+            self.assertEqual(details[0]['count'], {'pass': 18, 'fail': 3})
+            if retention == 'failures':
+                self.assertEqual(details[0]['passed'], [])
+                self.assertEqual(len(details[0]['failed']), 3)
+            elif retention == 'counts':
+                self.assertEqual(details[0]['passed'], [])
+                self.assertEqual(details[0]['failed'], [])
+            else:
+                self.assertEqual(len(details[0]['passed']) + len(details[0]['failed']), 2)
+                self.assertEqual(details[0]['dropped'], 19)
+
+    @patch('jnpr.jsnapy.check.get_path')
+    def test_no_diff_quiet_nodes(self, mock_path):
+        self.chk = True
+        conf_file = os.path.join(os.path.dirname(__file__),
+                                 'configs', 'main_no-diff.yml')
+        mock_path.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        config_file = open(conf_file, 'r')
+        main_file = yaml.load(config_file)
+        logger = logging.getLogger('jnpr.jsnapy.operator')
+        handler = logging.handlers.BufferingHandler(10000)
+        level = logger.level
+        logger.addHandler(handler)
+        logger.setLevel(logging.DEBUG)
+        messages = {}
+        try:
+            for quiet in [False, True]:
+                main_file['quiet_nodes'] = quiet
+                oper = Comparator().generate_test_files(
+                    main_file,
+                    self.hostname,
+                    self.chk,
+                    self.diff,
+                    self.db,
+                    self.snap_del,
+                    "snap_no-diff_pre",
+                    self.action,
+                    "snap_no-diff_post")
+                self.assertEqual(oper.no_passed, 2)
+                self.assertEqual(oper.no_failed, 4)
+                messages[quiet] = [record.getMessage() for record in handler.buffer]
+                handler.flush()
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(level)
+        # result of every test is still logged
+        results = [mssg for mssg in messages[False]
+                   if 'PASS | ' in mssg or 'FAIL | ' in mssg]
+        self.assertEqual(len(results), 6)
+        self.assertEqual([mssg for mssg in messages[True]
+                          if 'PASS | ' in mssg or 'FAIL | ' in mssg], results)
+        self.assertLess(len(messages[True]), len(messages[False]))
+
+    def test_is_emitted(self):
+        op = Operator()
+        logger = logging.getLogger('jnpr.jsnapy.operator')
+        handler = logging.NullHandler()
+        handler.setLevel(logging.INFO)
+        level = logger.level
+        logger.addHandler(handler)
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+        try:
+            self.assertTrue(op._is_emitted("info"))
+            self.assertFalse(op._is_emitted("debug"))
+            op.handler_level = None
+            logger.setLevel(logging.ERROR)
+            self.assertFalse(op._is_emitted("info"))
+            self.assertTrue(op._is_emitted("error"))
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(level)
+            logger.propagate = True
+        # template is compiled once for all nodes
+        op._print_message("{{pre['admin-status']}}", {}, {'admin-status': 'up'}, {}, "error")
+        self.assertIn("{{pre['admin-status']}}", Operator.templates)
+
+    def test_no_diff_missing_ids(self):
+        pre = etree.ElementTree(etree.fromstring(
+            "<interface-information>%s</interface-information>" % "".join(
+                "<physical-interface><name>ge-0/0/%d</name><mtu>1514</mtu>"
+                "</physical-interface>" % i for i in range(5))))
+        post = etree.ElementTree(etree.fromstring(
+            "<interface-information><physical-interface><name>ge-1/0/0</name>"
+            "<mtu>1514</mtu></physical-interface></interface-information>"))
+        logger = logging.getLogger('jnpr.jsnapy.operator')
+        handler = logging.NullHandler()
+        level = logger.level
+        logger.addHandler(handler)
+        logger.setLevel(logging.DEBUG)
+        try:
+            for quiet, compiled in [(True, 0), (False, 1)]:
+                op = Operator()
+                op.quiet_nodes = quiet
+                Operator.templates.clear()
+                with patch('jnpr.jsnapy.operator.jinja2.Template') as mock_template:
+                    op.no_diff('//physical-interface', ['mtu'], "mtu changed {{pre['mtu']}}",
+                               "mtu same", 'show interfaces', True, ['name'], pre, post)
+                # template of missing nodes is compiled once, only if message is written
+                self.assertEqual(mock_template.call_count, compiled)
+                self.assertEqual(op.no_failed, 1)
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(level)
+
+    @patch('jnpr.jsnapy.check.get_path')
+    def test_get_merge_results(self, mock_path):
+        self.chk = True
+        comp = Comparator()
+        conf_file = os.path.join(os.path.dirname(__file__),
+                                 'configs', 'main_no-diff.yml')
+        mock_path.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        config_file = open(conf_file, 'r')
+        main_file = yaml.load(config_file)
+        oper = comp.generate_test_files(
+            main_file,
+            self.hostname,
+            self.chk,
+            self.diff,
+            self.db,
+            self.snap_del,
+            "snap_no-diff_pre",
+            self.action,
+            "snap_no-diff_post")
+        results = pickle.loads(pickle.dumps(oper.get_results()))
+        merged = Operator()
+        merged.merge_results(results)
+        self.assertEqual(merged.device, self.hostname)
+        self.assertEqual(merged.result, oper.result)
+        self.assertEqual(merged.no_passed, 2)
+        self.assertEqual(merged.no_failed, 4)
+        self.assertEqual(merged.test_results, oper.test_results)
+        self.assertEqual(merged.result_dict, oper.result_dict)
+
+    @patch('jnpr.jsnapy.check.get_path')
+    def test_no_diff_unchanged(self, mock_path):
+        self.chk = True
+        comp = Comparator()
+        conf_file = os.path.join(os.path.dirname(__file__),
+                                 'configs', 'main_no-diff.yml')
+        mock_path.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        config_file = open(conf_file, 'r')
+        main_file = yaml.load(config_file)
+        with patch('jnpr.jsnapy.check.etree.parse', side_effect=etree.parse) as mock_parse:
+            oper = comp.generate_test_files(
+                main_file,
+                self.hostname,
+                self.chk,
+                self.diff,
+                self.db,
+                self.snap_del,
+                "snap_no-diff_pre",
+                self.action,
+                "snap_no-diff_pre")
+            # snapshot is parsed once for the device, instead of once for
+            # pre and once for post in every test
+            self.assertEqual(mock_parse.call_count, 1)
+        self.assertEqual(oper.no_passed, 6)
+        self.assertEqual(oper.no_failed, 0)
+
+    def test_node_cache(self):
+        op = Operator()
+        xml = MagicMock()
+        node = MagicMock()
+        node.xpath.return_value = [etree.XML('<name> ge-0/0/0 </name>')]
+        xml.xpath.return_value = [node]
+        op.open_cache()
+        pre_nodes, post_nodes = op._find_xpath(True, '//physical-interface', None, xml)
+        self.assertIs(pre_nodes, post_nodes)
+        post_nodes.append(etree.XML('<sample></sample>'))
+        pre_nodes, post_nodes = op._find_xpath(True, '//physical-interface', xml, xml)
+        self.assertEqual(post_nodes, [node])
+        self.assertEqual(op._find_xpath(False, '//physical-interface', xml, xml)[1], [node])
+        self.assertEqual(xml.xpath.call_count, 1)
+        self.assertEqual(op._get_ids(node, ['name']), ['ge-0/0/0'])
+        self.assertEqual(op._get_ids(node, ['name']), ['ge-0/0/0'])
+        self.assertEqual(node.xpath.call_count, 1)
+        op.release_cache()
+        self.assertIsNone(op.node_cache)
+        self.assertIsNone(op.id_cache)
+        op._find_xpath(True, '//physical-interface', None, xml)
+        self.assertEqual(xml.xpath.call_count, 2)
+
+    def test_align_nodes(self):
+        op = Operator()
+        pre = etree.XML('<a><i><name>ge-1</name><mtu>1</mtu></i><i><name>ge-0</name><mtu>0</mtu></i></a>')
+        post = etree.XML('<a><i><name>ge-0</name></i><i><name>ge-1</name></i><i><name>ge-2</name></i>'
+                         '<i><mtu>3</mtu></i></a>')
+        pre_nodes = pre.xpath('i')
+        post_nodes = post.xpath('i')
+        aligned = op._align_nodes(['name'], pre_nodes, post_nodes)
+        self.assertEqual([node.findtext('mtu') for node in aligned[:2]], ['0', '1'])
+        self.assertIs(aligned[2], op.placeholder)
+        # post node without ids is matched by position
+        self.assertIs(aligned[3], op.placeholder)
+        aligned = op._align_nodes([], pre_nodes, post_nodes)
+        self.assertEqual(aligned[:2], pre_nodes)
+        self.assertEqual(aligned[2:], [op.placeholder, op.placeholder])
+        self.assertIs(op._align_nodes(['name'], post_nodes, post_nodes), post_nodes)
+
+    def test_compile_values(self):
+        op = Operator()
+        values = op._compile_values(['up', '150-200', '100 - 160', '300'])
+        self.assertEqual(values, (set(['up', '150-200', '100 - 160', '300']), [100], [200]))
+        self.assertTrue(op._match_value(values, 'up'))
+        self.assertTrue(op._match_value(values, '150-200'))
+        self.assertTrue(op._match_value(values, '100'))
+        self.assertTrue(op._match_value(values, '200'))
+        self.assertTrue(op._match_value(values, '300'))
+        self.assertFalse(op._match_value(values, '99'))
+        self.assertFalse(op._match_value(values, '201'))
+        self.assertFalse(op._match_value(values, 'down'))
+        self.assertFalse(op._match_value(values, None))
+
+    def test_is_unchanged_fingerprint(self):
+        comp = Comparator()
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            pre = os.path.join(tmp_dir, 'pre.xml')
+            post = os.path.join(tmp_dir, 'post.xml')
+            shutil.copy(os.path.join(os.path.dirname(__file__), 'configs',
+                                     '10.216.193.114_snap_no-diff_pre_show_interfaces_terse_ge__.xml'), pre)
+            shutil.copy(pre, post)
+            self.assertTrue(comp.is_unchanged(self.db, pre, post))
+            self.assertIn(pre, comp.fingerprints)
+            self.assertIn(post, comp.fingerprints)
+            data = open(post).read()
+            with open(post, 'w') as f:
+                f.write(data.replace('up', 'dn', 1))
+            os.utime(post, (0, 0))
+            self.assertFalse(comp.is_unchanged(self.db, pre, post))
+        finally:
+            shutil.rmtree(tmp_dir)
+
     @patch('jnpr.jsnapy.check.get_path')
     def test_no_diff_2(self, mock_path):
         self.chk = True
@@ -1,5 +1,7 @@
 import unittest
 import os
+import sys
+import subprocess
 import yaml
 from mock import patch, MagicMock
 from nose.plugins.attrib import attr
@@ -63,6 +65,21 @@ class TestCheck(unittest.TestCase):
         self.assertEqual(snap_loc,os.path.join(HOME,'snapshots'))
         self.assertEqual(test_loc,os.path.join(HOME,'testfiles'))
         self.assertFalse(mock_config_loc.called)
+
+    def test_import_time(self):
+        # heavy modules should be loaded only by operations that need them
+        code = ("import sys, time\n"
+                "start = time.time()\n"
+                "import jnpr.jsnapy\n"
+                "print(time.time() - start)\n"
+                "for mod in ['jnpr.junos', 'icdiff', 'smtplib', 'jnpr.jsnapy.notify']:\n"
+                "    if mod in sys.modules:\n"
+                "        print(mod)\n")
+        out = subprocess.check_output([sys.executable, '-c', code])
+        lines = out.split()
+        import_time = float(lines[0])
+        self.assertEqual(lines[1:], [])
+        self.assertLess(import_time, 5)
 if __name__ == "__main__":
     suite = unittest.TestLoader().loadTestsFromTestCase(TestCheck)
     unittest.TextTestRunner(verbosity=2).run(suite)
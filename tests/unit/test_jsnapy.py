@@ -2,10 +2,15 @@ import unittest
 import yaml
 import os
 from jnpr.jsnapy.jsnapy import SnapAdmin
+from jnpr.jsnapy.result_cache import ResultCache, MemoryCache
+from jnpr.jsnapy import jsnapy
 from mock import patch, MagicMock, call
 from contextlib import nested
 from nose.plugins.attrib import attr
 import argparse
+import logging
+import tempfile
+from jnpr.jsnapy import setup_logging
 
 @attr('unit')
 class TestSnapAdmin(unittest.TestCase):
@@ -89,7 +94,7 @@ class TestSnapAdmin(unittest.TestCase):
 
 
     @patch('argparse.ArgumentParser.exit')
-    @patch('jnpr.jsnapy.jsnapy.Device')
+    @patch('jnpr.junos.Device')
     @patch('jnpr.jsnapy.SnapAdmin.generate_rpc_reply')
     @patch('jnpr.jsnapy.jsnapy.logging.getLogger')
     def test_connect_snap(self, mock_log, mock_gen_reply, mock_dev, mock_arg):
@@ -130,7 +135,7 @@ class TestSnapAdmin(unittest.TestCase):
             None)
 
     @patch('argparse.ArgumentParser.exit')
-    @patch('jnpr.jsnapy.jsnapy.Device')
+    @patch('jnpr.junos.Device')
     @patch('jnpr.jsnapy.SnapAdmin.compare_tests')
     @patch('jnpr.jsnapy.SnapAdmin.generate_rpc_reply')
     @patch('jnpr.jsnapy.jsnapy.logging.getLogger')
@@ -157,7 +162,7 @@ class TestSnapAdmin(unittest.TestCase):
             None,
             None)
 
-    @patch('jnpr.jsnapy.jsnapy.Device')
+    @patch('jnpr.junos.Device')
     @patch('jnpr.jsnapy.SnapAdmin.compare_tests')
     @patch('jnpr.jsnapy.SnapAdmin.generate_rpc_reply')
     @patch('jnpr.jsnapy.jsnapy.logging.getLogger')
@@ -184,7 +189,7 @@ class TestSnapAdmin(unittest.TestCase):
             None) 
     
 
-    @patch('jnpr.jsnapy.jsnapy.Device')
+    @patch('jnpr.junos.Device')
     @patch('jnpr.jsnapy.SnapAdmin.compare_tests')
     @patch('jnpr.jsnapy.SnapAdmin.generate_rpc_reply')
     @patch('jnpr.jsnapy.jsnapy.logging.getLogger')
@@ -337,7 +342,7 @@ class TestSnapAdmin(unittest.TestCase):
         self.assertTrue(mock_compare.called)
 
     @patch('argparse.ArgumentParser.exit')
-    @patch('jnpr.jsnapy.jsnapy.Device')
+    @patch('jnpr.junos.Device')
     @patch('jnpr.jsnapy.SnapAdmin.generate_rpc_reply')
     @patch('jnpr.jsnapy.SnapAdmin.compare_tests')
     @patch('getpass.getpass')
@@ -361,7 +366,7 @@ class TestSnapAdmin(unittest.TestCase):
 
     @patch('argparse.ArgumentParser.exit')
     @patch('jnpr.jsnapy.jsnapy.SnapAdmin.generate_rpc_reply')
-    @patch('jnpr.jsnapy.jsnapy.Device')
+    @patch('jnpr.junos.Device')
     @patch('jnpr.jsnapy.notify.Notification.notify')
     @patch('jnpr.jsnapy.jsnapy.logging.getLogger')
     def test_snap_mail(self, mock_logger, mock_notify, mock_pass, mock_compare, mock_arg):
@@ -728,6 +733,174 @@ class TestSnapAdmin(unittest.TestCase):
 
         mock_connect.assert_has_calls(expected_calls_made, any_order=True)
 
+    @patch('jnpr.jsnapy.jsnapy.SnapAdmin.extract_data')
+    def test_check_fail_fast(self, mock_extract):
+        js = SnapAdmin()
+        js.check("main.yml", "pre", "post", fail_fast=True)
+        self.assertTrue(js.fail_fast)
+        config_data = {'tests': ['no-diff.yml']}
+        args = js.get_comparison_args(self.hostname, config_data, "pre", "post", "check")
+        self.assertEqual(args[0], {'tests': ['no-diff.yml'], 'fail_fast': True})
+        self.assertEqual(config_data, {'tests': ['no-diff.yml']})
+        js.check("main.yml", "pre", "post")
+        args = js.get_comparison_args(self.hostname, config_data, "pre", "post", "check")
+        self.assertIs(args[0], config_data)
+
+    @patch('jnpr.jsnapy.check.get_path')
+    def test_check_iter(self, mock_path):
+        from jnpr.jsnapy.sinks import CallbackSink
+        js = SnapAdmin()
+        mock_path.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        conf_file = os.path.join(os.path.dirname(__file__),
+                                 'configs', 'main_no-diff.yml')
+        test_results = []
+        sink = CallbackSink(test_callback=lambda hostname, teston, tresult: test_results.append(
+            (hostname, tresult['testoperation'])))
+        js.add_sink(sink)
+        results = list(js.check_iter(conf_file, "snap_no-diff_pre", "snap_no-diff_post"))
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0][0], self.hostname)
+        self.assertEqual(results[0][1].no_passed, 2)
+        self.assertEqual(results[0][1].no_failed, 4)
+        self.assertEqual(len(test_results), 6)
+        self.assertEqual(test_results[0], (self.hostname, 'no-diff'))
+        self.assertEqual(js.sinks, [sink])
+        self.assertTrue(js.keep_results)
+        js.remove_sink(sink)
+        self.assertEqual(js.sinks, [])
+
+    @patch('jnpr.jsnapy.check.get_path')
+    def test_check_export(self, mock_path):
+        import json
+        import shutil
+        import tempfile
+        js = SnapAdmin()
+        mock_path.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        conf_file = os.path.join(os.path.dirname(__file__),
+                                 'configs', 'main_no-diff.yml')
+        config_data = yaml.load(open(conf_file, 'r'))
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            config_data['export'] = os.path.join(tmp_dir, 'results.jsonl')
+            with patch('jnpr.jsnapy.sinks.JsonLinesSink.close', autospec=True) as mock_close:
+                mock_close.side_effect = lambda sink: sink.out.close()
+                js.check(yaml.dump(config_data), "snap_no-diff_pre", "snap_no-diff_post")
+                # export file is closed at end of run
+                self.assertEqual(mock_close.call_count, 1)
+            self.assertEqual(js.exports, {})
+            self.assertEqual(js.sinks, [])
+            lines = [json.loads(line) for line in open(config_data['export'])]
+            # and opened again by next run
+            js.check(yaml.dump(config_data), "snap_no-diff_pre", "snap_no-diff_post")
+            self.assertEqual(len(open(config_data['export']).readlines()), 14)
+        finally:
+            shutil.rmtree(tmp_dir)
+        self.assertEqual(len(lines), 7)
+        self.assertEqual([line['type'] for line in lines], ['test'] * 6 + ['device'])
+        self.assertEqual(lines[0]['hostname'], self.hostname)
+        self.assertEqual(lines[0]['count'], {'pass': 18, 'fail': 3})
+        self.assertIn('ms', lines[0])
+        self.assertEqual(lines[6]['passed'], 2)
+        self.assertEqual(lines[6]['failed'], 4)
+        self.assertIn('ms', lines[6])
+
+    @patch('jnpr.jsnapy.result_cache.get_path')
+    def test_clear_cache(self, mock_path):
+        mock_path.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        js = SnapAdmin()
+        try:
+            cache = ResultCache()
+            cache.put('key', {'no_passed': 1})
+            self.assertEqual(js.clear_cache(), 1)
+            self.assertIsNone(cache.get('key'))
+        finally:
+            os.remove(cache.db_filename)
+
+    @patch('jnpr.jsnapy.setup_logging.reset_queue')
+    @patch('jnpr.jsnapy.jsnapy.Comparator')
+    def test_evaluate_device_fleet_dedup(self, mock_comp, mock_reset):
+        jsnapy.init_worker()
+        self.assertTrue(mock_reset.called)
+        jsnapy.evaluate_device(({'fleet_dedup': True}, self.hostname))
+        jsnapy.evaluate_device(({'fleet_dedup': True}, '10.216.193.115'))
+        jsnapy.evaluate_device(({}, self.hostname))
+        # devices evaluated in worker share one cache
+        self.assertEqual(mock_comp.call_args_list,
+                         [call(fleet_results=jsnapy.worker_results)] * 2 +
+                         [call(fleet_results=None)])
+        self.assertIsInstance(jsnapy.worker_results, MemoryCache)
+
+    @patch('jnpr.jsnapy.check.get_path')
+    def test_evaluate_in_pool_logging(self, mock_path):
+        argparse.ArgumentParser.parse_args = MagicMock()
+        argparse.ArgumentParser.parse_args.return_value = argparse.Namespace(check=True,
+            diff=False, file=None, hostname=None, local=False, login=None, passwd=None, port=None, post_snapfile=None, pre_snapfile=None, snap=False, snapcheck=False, verbosity=None, version=False)
+        js = SnapAdmin()
+        js.args.check = True
+        mock_path.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        conf_file = os.path.join(os.path.dirname(__file__),
+                                 'configs', 'main_no-diff.yml')
+        config_data = yaml.load(open(conf_file, 'r'))
+        config_data['processes'] = 2
+        log_file = tempfile.NamedTemporaryFile(delete=False)
+        log_file.close()
+        handler = logging.FileHandler(log_file.name)
+        handler.setFormatter(logging.Formatter("%(process)d %(message)s"))
+        root = logging.getLogger()
+        logger = logging.getLogger('jnpr.jsnapy.check')
+        disabled, level = logger.disabled, root.level
+        setup_logging.stop_queue()
+        root.addHandler(handler)
+        root.setLevel(logging.DEBUG)
+        logger.disabled = False
+        # records of workers are written though handlers of parent are behind queue
+        setup_logging.use_queue()
+        try:
+            js.evaluate_in_pool([self.hostname], config_data,
+                                ["snap_no-diff_pre", "snap_no-diff_post"], "snap_no-diff_post")
+        finally:
+            setup_logging.stop_queue()
+            root.removeHandler(handler)
+            root.setLevel(level)
+            logger.disabled = disabled
+            handler.close()
+            pids = set(line.split()[0] for line in open(log_file.name) if line[:1].isdigit())
+            os.remove(log_file.name)
+        self.assertEqual(len(js.evaluated), 2)
+        self.assertTrue(pids - set([str(os.getpid())]))
+
+    @patch('jnpr.jsnapy.check.get_path')
+    def test_evaluate_in_pool(self, mock_path):
+        argparse.ArgumentParser.parse_args = MagicMock()
+        argparse.ArgumentParser.parse_args.return_value = argparse.Namespace(check=True,
+            diff=False, file=None, hostname=None, local=False, login=None, passwd=None, port=None, post_snapfile=None, pre_snapfile=None, snap=False, snapcheck=False, verbosity=None, version=False)
+        js = SnapAdmin()
+        js.args.check = True
+        mock_path.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        conf_file = os.path.join(os.path.dirname(__file__),
+                                 'configs', 'main_no-diff.yml')
+        config_data = yaml.load(open(conf_file, 'r'))
+        js.evaluate_in_pool([self.hostname], config_data,
+                            ["snap_no-diff_pre", "snap_no-diff_post"], "snap_no-diff_post")
+        self.assertEqual(js.evaluated, {})
+        config_data['processes'] = 2
+        js.evaluate_in_pool([self.hostname], config_data,
+                            ["snap_no-diff_pre", "snap_no-diff_post"], "snap_no-diff_post")
+        self.assertEqual(len(js.evaluated), 2)
+        with patch('jnpr.jsnapy.jsnapy.Comparator') as mock_comp:
+            oper = js.compare_tests(self.hostname, config_data,
+                                    "snap_no-diff_pre", "snap_no-diff_post")
+            self.assertEqual(oper.no_passed, 2)
+            self.assertEqual(oper.no_failed, 4)
+            self.assertEqual(oper.result, "Failed")
+            oper = js.compare_tests(self.hostname, config_data,
+                                    "snap_no-diff_post", "snap_no-diff_post")
+            self.assertEqual(oper.no_passed, 6)
+            self.assertEqual(oper.no_failed, 0)
+            self.assertFalse(mock_comp.called)
+        self.assertEqual(js.evaluated, {})
+
+
     
         
            
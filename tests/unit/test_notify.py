@@ -0,0 +1,119 @@
+import unittest
+import asyncore
+import smtpd
+import threading
+import email
+from jnpr.jsnapy.notify import Notification
+from jnpr.jsnapy.operator import Operator
+from nose.plugins.attrib import attr
+
+
+class LocalSMTPServer(smtpd.SMTPServer):
+
+    """
+    SMTP server standing in for mail server, keeps received mails
+    """
+
+    def __init__(self):
+        smtpd.SMTPServer.__init__(self, ('127.0.0.1', 0), None)
+        self.port = self.socket.getsockname()[1]
+        self.sessions = 0
+        self.mails = []
+        self.running = True
+        self.thread = threading.Thread(target=self.run)
+        self.thread.setDaemon(True)
+        self.thread.start()
+
+    def handle_accept(self):
+        self.sessions += 1
+        smtpd.SMTPServer.handle_accept(self)
+
+    def process_message(self, peer, mailfrom, rcpttos, data):
+        self.mails.append((mailfrom, rcpttos, email.message_from_string(data)))
+
+    def run(self):
+        while self.running:
+            asyncore.loop(timeout=0.05, count=1)
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        self.close()
+
+
+@attr('unit')
+class TestNotify(unittest.TestCase):
+
+    def setUp(self):
+        self.server = LocalSMTPServer()
+        self.mail_file = {'to': 'reciever@gmail.com',
+                          'from': 'sender@gmail.com',
+                          'sub': 'Sample Jsnap Results, please verify',
+                          'recipient_name': 'recipient',
+                          'sender_name': 'Juniper Networks',
+                          'server': '127.0.0.1',
+                          'port': self.server.port,
+                          'starttls': False}
+        self.results = []
+        for i, result in enumerate(['Passed', 'Failed', 'Passed']):
+            op = Operator()
+            op.result = result
+            op.no_passed = 2
+            op.no_failed = 1 if result == 'Failed' else 0
+            op.test_details['show interfaces terse'].append(
+                {'testoperation': 'is-equal', 'xpath': 'physical-interface',
+                 'node_name': 'admin-status', 'count': {'pass': 1, 'fail': 1},
+                 'passed': [], 'failed': [{'id': {'name': 'ge-0/0/0'}}],
+                 'result': result == 'Passed'})
+            self.results.append(('10.216.193.11%d' % i, op))
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_notify_one_session(self):
+        notification = Notification()
+        for hostname, op in self.results:
+            notification.notify(self.mail_file, hostname, '', op)
+        notification.close()
+        self.assertEqual(self.server.sessions, 1)
+        self.assertEqual(len(self.server.mails), 3)
+        mailfrom, rcpttos, msg = self.server.mails[1]
+        self.assertEqual(mailfrom, 'sender@gmail.com')
+        self.assertEqual(rcpttos, ['reciever@gmail.com'])
+        self.assertEqual(msg['Subject'],
+                         '10.216.193.111 : Sample Jsnap Results, please verify')
+        self.assertIn('Test Performed on Device: 10.216.193.111',
+                      msg.get_payload()[0].get_payload())
+
+    def test_notify_digest(self):
+        self.mail_file['digest'] = True
+        notification = Notification()
+        for hostname, op in self.results:
+            notification.notify(self.mail_file, hostname, '', op)
+        # nothing is sent till end of run
+        self.assertIsNone(notification.sender)
+        notification.close()
+        self.assertEqual(self.server.sessions, 1)
+        self.assertEqual(len(self.server.mails), 1)
+        msg = self.server.mails[0][2]
+        self.assertEqual(msg['Subject'],
+                         '3 devices : Sample Jsnap Results, please verify')
+        text = msg.get_payload()[0].get_payload()
+        for hostname, op in self.results:
+            self.assertIn('Test result for %s' % hostname, text)
+        self.assertIn('TEST FAILED ON 1 DEVICES', text)
+        self.assertIn('Total Tests Passed: 6', text)
+
+    def test_get_message_to(self):
+        notification = Notification()
+        # addresses read from yaml may be unicode
+        self.mail_file['to'] = u'reciever@gmail.com'
+        msg = notification.get_message(self.mail_file, 'text', 'subject')
+        self.assertEqual(msg['To'], 'reciever@gmail.com')
+        self.mail_file['to'] = ['reciever@gmail.com', u'other@gmail.com']
+        msg = notification.get_message(self.mail_file, 'text', 'subject')
+        self.assertEqual(msg['To'], 'reciever@gmail.com, other@gmail.com')
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestNotify)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,145 @@
+import unittest
+import os
+import yaml
+import shutil
+import tempfile
+import logging
+from jnpr.jsnapy.check import Comparator
+from jnpr.jsnapy.result_cache import ResultCache, MemoryCache
+from mock import patch
+from nose.plugins.attrib import attr
+
+
+@attr('unit')
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.hostname = "10.216.193.114"
+        self.db = dict()
+        self.db['store_in_sqlite'] = False
+        self.db['check_from_sqlite'] = False
+        self.db['db_name'] = "jbb.db"
+        self.db['first_snap_id'] = None
+        self.db['second_snap_id'] = None
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_lru(self):
+        with patch('jnpr.jsnapy.result_cache.get_path') as mock_path:
+            mock_path.return_value = self.tmp_dir
+            cache = ResultCache(2)
+        cache.put('a', {'no_passed': 1})
+        cache.put('b', {'no_passed': 2})
+        self.assertEqual(cache.get('a'), {'no_passed': 1})
+        # 'b' is least recently used
+        cache.put('c', {'no_passed': 3})
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), {'no_passed': 1})
+        self.assertEqual(cache.get('c'), {'no_passed': 3})
+        self.assertEqual(cache.clear(), 2)
+        self.assertIsNone(cache.get('a'))
+
+    def check(self, main_file, comp=None, hostname=None):
+        comp = comp or Comparator()
+        return comp.generate_test_files(
+            main_file, hostname or self.hostname, True, False, self.db, False,
+            "snap_no-diff_pre", None, "snap_no-diff_post")
+
+    @patch('jnpr.jsnapy.result_cache.get_path')
+    @patch('jnpr.jsnapy.check.get_path')
+    def test_check_cached(self, mock_path, mock_cache_path):
+        configs = os.path.join(os.path.dirname(__file__), 'configs')
+        mock_path.return_value = configs
+        mock_cache_path.return_value = self.tmp_dir
+        main_file = yaml.load(open(os.path.join(configs, 'main_no-diff.yml'), 'r'))
+        main_file['result_cache'] = True
+        logger = logging.getLogger('jnpr.jsnapy.operator')
+        disabled = logger.disabled
+        logger.disabled = False
+        messages = []
+        handler = logging.Handler()
+        handler.emit = lambda record: messages.append(record.getMessage())
+        logger.addHandler(handler)
+        try:
+            oper = self.check(main_file)
+            evaluated = messages[:]
+            del messages[:]
+            with patch('jnpr.jsnapy.check.Comparator._compare_reply') as mock_compare:
+                cached = self.check(main_file)
+                self.assertFalse(mock_compare.called)
+        finally:
+            logger.removeHandler(handler)
+            logger.disabled = disabled
+        # messages of tests are logged again from cache
+        self.assertTrue(evaluated)
+        self.assertEqual(messages, evaluated)
+        self.assertEqual((cached.no_passed, cached.no_failed), (2, 4))
+        self.assertEqual(cached.result, oper.result)
+        self.assertEqual(cached.result_dict, oper.result_dict)
+        self.assertEqual(cached.test_results, oper.test_results)
+        # results depend on settings of run
+        main_file['fail_fast'] = True
+        with patch('jnpr.jsnapy.check.Comparator._compare_reply') as mock_compare:
+            self.check(main_file)
+            self.assertTrue(mock_compare.called)
+        main_file['fail_fast'] = False
+        main_file['quiet_nodes'] = True
+        with patch('jnpr.jsnapy.check.Comparator._compare_reply') as mock_compare:
+            self.check(main_file)
+            self.assertTrue(mock_compare.called)
+        main_file['quiet_nodes'] = False
+        # and on level of logs kept with them
+        with patch('jnpr.jsnapy.setup_logging.get_capture_level') as mock_level:
+            mock_level.return_value = logging.DEBUG - 1
+            with patch('jnpr.jsnapy.check.Comparator._compare_reply') as mock_compare:
+                self.check(main_file)
+                self.assertTrue(mock_compare.called)
+        # and are evaluated again once cache is cleared
+        ResultCache().clear()
+        with patch('jnpr.jsnapy.check.Comparator._compare_reply') as mock_compare:
+            self.check(main_file)
+            self.assertTrue(mock_compare.called)
+
+    @patch('jnpr.jsnapy.check.get_path')
+    def test_fleet_dedup(self, mock_path):
+        configs = os.path.join(os.path.dirname(__file__), 'configs')
+        mock_path.return_value = self.tmp_dir
+        shutil.copy(os.path.join(configs, 'no-diff.yml'), self.tmp_dir)
+        for snap in ['pre', 'post']:
+            name = 'snap_no-diff_%s_show_interfaces_terse_ge__.xml' % snap
+            for hostname in ['10.216.193.114', '10.216.193.115']:
+                shutil.copy(os.path.join(configs, '10.216.193.114_' + name),
+                            os.path.join(self.tmp_dir, hostname + '_' + name))
+        main_file = yaml.load(open(os.path.join(configs, 'main_no-diff.yml'), 'r'))
+        logger = logging.getLogger('jnpr.jsnapy.operator')
+        disabled = logger.disabled
+        logger.disabled = False
+        messages = []
+        handler = logging.Handler()
+        handler.emit = lambda record: messages.append((record.hostname, record.getMessage()))
+        logger.addHandler(handler)
+        try:
+            fleet = MemoryCache()
+            oper = self.check(main_file, Comparator(fleet_results=fleet))
+            with patch('jnpr.jsnapy.check.Comparator._compare_reply') as mock_compare:
+                shared = self.check(main_file, Comparator(fleet_results=fleet),
+                                    '10.216.193.115')
+                self.assertFalse(mock_compare.called)
+        finally:
+            logger.removeHandler(handler)
+            logger.disabled = disabled
+        self.assertEqual((shared.no_passed, shared.no_failed), (2, 4))
+        self.assertEqual(shared.result_dict, oper.result_dict)
+        self.assertEqual(shared.test_results, oper.test_results)
+        self.assertEqual(shared.device, '10.216.193.115')
+        # messages of device which was evaluated are logged for other device
+        self.assertTrue(messages)
+        for hostname, message in messages:
+            if hostname == '10.216.193.114':
+                self.assertIn(('10.216.193.115', message), messages)
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestResultCache)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,73 @@
+import unittest
+import os
+import shutil
+import tempfile
+import logging
+import logging.handlers
+from jnpr.jsnapy import setup_logging
+from nose.plugins.attrib import attr
+
+
+@attr('unit')
+class TestSetupLogging(unittest.TestCase):
+
+    def setUp(self):
+        self.root = logging.getLogger()
+        self.level = self.root.level
+        self.root.setLevel(logging.DEBUG)
+        self.handler = logging.handlers.BufferingHandler(100)
+        self.handler.setLevel(logging.INFO)
+        self.root.addHandler(self.handler)
+
+    def tearDown(self):
+        setup_logging.stop_queue()
+        self.root.removeHandler(self.handler)
+        self.root.setLevel(self.level)
+
+    def test_queue(self):
+        handlers = self.root.handlers[:]
+        setup_logging.use_queue()
+        queue_handlers = self.root.handlers
+        self.assertEqual(len(queue_handlers), 1)
+        self.assertIsInstance(queue_handlers[0], setup_logging.QueueHandler)
+        self.assertEqual(setup_logging.get_handlers(), handlers)
+        # records below level of all handlers are not put in queue
+        self.assertEqual(queue_handlers[0].level, min(h.level for h in handlers))
+        id_val = {'name': 'ge-0/0/0'}
+        logging.getLogger('jnpr.jsnapy.test_queue').error(
+            "Node not found for IDs: %s", id_val, extra={'hostname': '1.1.1.1'})
+        # message is merged with arguments before they change
+        id_val['name'] = 'ge-0/0/1'
+        logging.getLogger('jnpr.jsnapy.test_queue').debug("not written")
+        setup_logging.stop_queue()
+        self.assertEqual(self.root.handlers, handlers)
+        self.assertEqual(len(self.handler.buffer), 1)
+        self.assertEqual(self.handler.buffer[0].getMessage(),
+                         "Node not found for IDs: {'name': 'ge-0/0/0'}")
+        self.assertEqual(self.handler.buffer[0].hostname, '1.1.1.1')
+
+    def test_host_file_handler(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            directory = os.path.join(tmp_dir, 'hosts')
+            handler = setup_logging.HostFileHandler(directory)
+            handler.setFormatter(logging.Formatter("%(hostname)s %(message)s"))
+            logger = logging.getLogger('jnpr.jsnapy.test_host_file')
+            logger.addHandler(handler)
+            try:
+                logger.info("PASS | test", extra={'hostname': '1.1.1.1'})
+                logger.info("FAIL | test", extra={'hostname': '2.2.2.2'})
+                logger.info("no device", extra={'hostname': None})
+            finally:
+                logger.removeHandler(handler)
+                handler.close()
+            self.assertEqual(sorted(os.listdir(directory)),
+                             ['1.1.1.1.log', '2.2.2.2.log'])
+            self.assertEqual(open(os.path.join(directory, '2.2.2.2.log')).read(),
+                             "2.2.2.2 FAIL | test\n")
+        finally:
+            shutil.rmtree(tmp_dir)
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestSetupLogging)
+    unittest.TextTestRunner(verbosity=2).run(suite)
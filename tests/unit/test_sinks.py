@@ -0,0 +1,88 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from jnpr.jsnapy.operator import Operator
+from jnpr.jsnapy.sinks import CallbackSink, JsonLinesSink
+from mock import MagicMock
+from nose.plugins.attrib import attr
+
+
+@attr('unit')
+class TestSinks(unittest.TestCase):
+
+    def setUp(self):
+        self.hostname = "10.216.193.114"
+        self.op = Operator()
+        self.op.device = self.hostname
+        self.op.result = "Failed"
+        self.op.no_passed = 1
+        self.op.no_failed = 1
+        self.op.result_dict = {'test_interfaces': False}
+        self.tresult = {'testoperation': 'is-equal', 'result': False,
+                        'count': {'pass': 1, 'fail': 1}}
+
+    def test_callback_sink(self):
+        device_callback = MagicMock()
+        test_callback = MagicMock()
+        sink = CallbackSink(device_callback, test_callback)
+        sink.test_result(self.hostname, 'show interfaces', self.tresult)
+        sink.device_result(self.hostname, self.op)
+        test_callback.assert_called_once_with(
+            self.hostname, 'show interfaces', self.tresult)
+        device_callback.assert_called_once_with(self.hostname, self.op)
+        # callbacks are optional
+        CallbackSink().device_result(self.hostname, self.op)
+
+    def test_json_lines_sink(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmp_dir, 'results.jsonl')
+            sink = JsonLinesSink(filename, tests=True)
+            self.tresult['failed'] = []
+            sink.test_result(self.hostname, 'show interfaces', self.tresult,
+                             0.0125)
+            self.op.duration = 0.5
+            sink.device_result(self.hostname, self.op)
+            # written as soon as result is produced
+            lines = [json.loads(line) for line in open(filename)]
+            sink.close()
+            self.assertEqual(len(lines), 2)
+            self.assertEqual(lines[0]['type'], 'test')
+            self.assertEqual(lines[0]['teston'], 'show interfaces')
+            self.assertEqual(lines[0]['count'], {'pass': 1, 'fail': 1})
+            self.assertEqual(lines[0]['ms'], 12.5)
+            # empty lists are not written
+            self.assertNotIn('failed', lines[0])
+            self.assertEqual(lines[1], {'type': 'device',
+                                        'hostname': self.hostname,
+                                        'result': 'Failed',
+                                        'passed': 1,
+                                        'failed': 1,
+                                        'tests': {'test_interfaces': False},
+                                        'ms': 500.0})
+            # compact encoding
+            self.assertNotIn(', ', open(filename).readline())
+            sink = JsonLinesSink(filename)
+            sink.test_result(self.hostname, 'show interfaces', self.tresult)
+            sink.close()
+            self.assertEqual(len(open(filename).readlines()), 2)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_operator_test_callback(self):
+        self.op.test_callback = MagicMock()
+        self.op.add_test_result('show interfaces', self.tresult)
+        self.assertEqual(self.op.test_details['show interfaces'], [self.tresult])
+        self.op.test_callback.assert_called_once_with(
+            self.hostname, 'show interfaces', self.tresult, None)
+        self.op.test_callback.reset_mock()
+        self.op.test_start = 0
+        self.op.add_test_result('show interfaces', self.tresult)
+        self.assertGreater(self.op.test_callback.call_args[0][3], 0)
+        self.assertIsNone(self.op.test_start)
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestSinks)
+    unittest.TextTestRunner(verbosity=2).run(suite)
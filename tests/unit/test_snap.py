@@ -1,6 +1,8 @@
 import unittest
 import yaml
 import os
+import shutil
+import tempfile
 from jnpr.jsnapy.snap import Parser
 from jnpr.jsnapy import SnapAdmin
 import jnpr.junos.device
@@ -437,6 +439,91 @@ class TestSnap(unittest.TestCase):
             calls.append(call(db_dict2))
             mock_insert.assert_has_calls(calls)
         dev.close()
+    def test_write_file_dedup(self):
+        prs = Parser(dedup=True)
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            pre = os.path.join(tmp_dir, "1.1.1.1_pre_show_version.text")
+            post = os.path.join(tmp_dir, "1.1.1.1_post_show_version.text")
+            other = os.path.join(tmp_dir, "1.1.1.1_other_show_version.text")
+            prs._save("<version>1</version>", pre)
+            prs._save("<version>1</version>", post)
+            prs._save("<version>2</version>", other)
+            self.assertTrue(os.path.samefile(pre, post))
+            self.assertFalse(os.path.samefile(pre, other))
+            self.assertEqual(len(os.listdir(os.path.join(tmp_dir, '.blobs'))), 2)
+            # writing again without dedup must not change snapshots sharing the blob
+            Parser()._save("<version>3</version>", post)
+            self.assertEqual(open(pre).read(), "<version>1</version>")
+            self.assertEqual(open(post).read(), "<version>3</version>")
+            # blob no snapshot is linked to is removed
+            prs._save("<version>2</version>", pre)
+            self.assertTrue(os.path.samefile(pre, other))
+            self.assertEqual(len(os.listdir(os.path.join(tmp_dir, '.blobs'))), 1)
+            # blob which could not be written completely is never linked
+            with patch('os.rename') as mock_rename:
+                mock_rename.side_effect = OSError("disk full")
+                prs._save("<version>4</version>", post)
+            self.assertEqual(open(post).read(), "<version>4</version>")
+            self.assertEqual(os.stat(post).st_nlink, 1)
+            self.assertEqual(len(os.listdir(os.path.join(tmp_dir, '.blobs'))), 1)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    @patch('jnpr.jsnapy.snap.Parser.run_cmd')
+    def test_generate_reply_fail_fast(self, mock_cmd):
+        prs = Parser()
+        test_file = {'fail_fast': True,
+                     'test_x': [{'command': 'show version'}]}
+        with patch('logging.Logger.error') as mock_error:
+            prs.generate_reply(test_file, None, 'pre', self.hostname, self.db)
+            self.assertFalse(mock_error.called)
+        mock_cmd.assert_called_once_with(
+            test_file, 'test_x', ['xml', 'text'], None, 'pre', self.hostname, self.db)
+        self.assertEqual(prs.test_included, ['test_x'])
+
+    @patch('jnpr.jsnapy.snap.Parser._write_file')
+    def test_store_reply(self, mock_write):
+        prs = Parser(persist=False)
+        prs._store_reply("reply", "xml", "snap_file")
+        self.assertEqual(prs.snap_replies, {"snap_file": "reply"})
+        self.assertFalse(mock_write.called)
+        prs = Parser(background=True)
+        prs._store_reply("reply_1", "xml", "snap_file_1")
+        prs._store_reply("reply_2", "xml", "snap_file_2")
+        prs.flush()
+        self.assertIsNone(prs.writer)
+        mock_write.assert_has_calls([call("reply_1", "xml", "snap_file_1", None),
+                                     call("reply_2", "xml", "snap_file_2", None)])
+
+    @patch('jnpr.jsnapy.jsnapy.Parser')
+    def test_snapcheck_live_replies(self, mock_parser):
+        js = SnapAdmin()
+        conf_file = os.path.join(os.path.dirname(__file__),
+                                 'configs', 'main.yml')
+        main_file = yaml.load(open(conf_file, 'r'))
+        main_file['persist_snapcheck'] = False
+        mock_parser.return_value.snap_replies = {"snap_file": "reply"}
+        js.generate_rpc_reply(None, "snap_mock", "10.216.193.114", main_file, "snapcheck")
+        mock_parser.assert_called_once_with(False, False, True, False, False, False, False)
+        # snap files are written while tests run
+        self.assertFalse(mock_parser.return_value.flush.called)
+        self.assertEqual(js.live_replies, {"10.216.193.114": {"snap_file": "reply"}})
+        with patch('jnpr.jsnapy.jsnapy.Comparator') as mock_comp:
+            js.args.check = False
+            js.args.diff = False
+            js.compare_tests("10.216.193.114", main_file, "snap_mock", action="snapcheck")
+            mock_comp.assert_called_once_with({"snap_file": "reply"}, None, None)
+        self.assertTrue(mock_parser.return_value.flush.called)
+        self.assertEqual(js.live_replies, {})
+        self.assertEqual(js.writers, {})
+        # replies of devices whose tests were not run are released at end of run
+        mock_parser.return_value.flush.reset_mock()
+        js.generate_rpc_reply(None, "snap_mock", "10.216.193.115", main_file, "snapcheck")
+        js.close_writers()
+        self.assertTrue(mock_parser.return_value.flush.called)
+        self.assertEqual(js.live_replies, {})
+
 
 with nested(
         patch('jnpr.jsnapy.snap.logging.getLogger'),
@@ -0,0 +1,129 @@
+import unittest
+from lxml import etree
+from jnpr.jsnapy.snap import Parser
+from jnpr.jsnapy.check import Comparator
+from jnpr.jsnapy import snap_filter, snap_index
+from mock import MagicMock
+from nose.plugins.attrib import attr
+
+
+@attr('unit')
+class TestSnapFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.db = dict()
+        self.db['store_in_sqlite'] = False
+        self.db['check_from_sqlite'] = False
+        self.config_tests = [
+            {'rpc': 'get-config'},
+            {'iterate': {'xpath': "interfaces/interface[name='ge-0/0/0']/unit",
+                         'id': 'name',
+                         'tests': [{'is-equal': '../description, uplink'}]}},
+            {'item': {'xpath': 'system/login',
+                      'tests': [{'is-equal': 'retry-options/minimum-time, 60'}]}}]
+        self.intf_tests = [
+            {'rpc': 'get-interface-information'},
+            {'iterate': {'xpath': "//physical-interface[name='ge-0/0/0']",
+                         'id': 'name',
+                         'tests': [{'is-equal': 'admin-status, up'}]}},
+            {'item': {'xpath': "physical-interface[name='ge-0/0/0']/logical-interface",
+                      'tests': [{'exists': 'name'}]}}]
+
+    def test_config_filter(self):
+        filter_xml = snap_filter.get_config_filter(self.config_tests)
+        self.assertEqual(
+            etree.tostring(filter_xml),
+            "<configuration><interfaces><interface><name>ge-0/0/0</name>"
+            "</interface></interfaces><system><login/></system></configuration>")
+
+    def test_config_filter_whole(self):
+        # tests reading from anywhere in configuration get whole of it
+        for xpath, test in [('//login', 'minimum-time, 60'),
+                            ('system/login', '//minimum-time, 60'),
+                            ('system/login', 'count(/configuration/system), 1'),
+                            ('system/login', '../../version, 1'),
+                            ("system/*[1]", 'name, 1')]:
+            tests = [{'item': {'xpath': xpath, 'tests': [{'is-equal': test}]}}]
+            self.assertIsNone(snap_filter.get_config_filter(tests), xpath)
+
+    def test_rpc_args(self):
+        self.assertEqual(
+            snap_filter.get_rpc_args('get-interface-information', self.intf_tests),
+            {'interface_name': 'ge-0/0/0'})
+        self.assertEqual(
+            snap_filter.get_rpc_args(
+                'get-bgp-neighbor-information',
+                [{'iterate': {'xpath': "bgp-peer[peer-address='10.1.1.1+179']",
+                              'tests': [{'is-equal': 'peer-state, Established'}]}}]),
+            {'neighbor_address': '10.1.1.1'})
+        # blocks reading other interfaces or all of them are not restricted
+        self.intf_tests.append(
+            {'iterate': {'xpath': 'physical-interface', 'id': 'name',
+                         'tests': [{'is-equal': 'oper-status, up'}]}})
+        self.assertEqual(
+            snap_filter.get_rpc_args('get-interface-information', self.intf_tests), {})
+        self.assertEqual(
+            snap_filter.get_rpc_args('get-software-information', self.intf_tests), {})
+
+    def test_run_rpc(self):
+        dev = MagicMock()
+        dev.rpc.get_config.return_value = etree.fromstring('<configuration/>')
+        Parser(persist=False, auto_filter=True).run_rpc(
+            {'test_config': self.config_tests}, 'test_config', ['xml', 'text'],
+            dev, 'snap_filter', '10.216.193.114', self.db)
+        filter_xml = dev.rpc.get_config.call_args[1]['filter_xml']
+        self.assertEqual(len(filter_xml.xpath('/configuration/system/login')), 1)
+        Parser(persist=False, auto_filter=True).run_rpc(
+            {'test_intf': self.intf_tests}, 'test_intf', ['xml', 'text'],
+            dev, 'snap_filter', '10.216.193.114', self.db)
+        dev.rpc.get_interface_information.assert_called_once_with(
+            {'format': 'xml'}, interface_name='ge-0/0/0')
+
+    def test_run_rpc_shared(self):
+        # tests sharing snap file read different interfaces, reply is not
+        # restricted to any of them
+        other_tests = [
+            {'rpc': 'get-interface-information'},
+            {'iterate': {'xpath': "physical-interface[name='ge-0/0/1']",
+                         'id': 'name',
+                         'tests': [{'is-equal': 'oper-status, up'}]}}]
+        dev = MagicMock()
+        prs = Parser(persist=False, auto_filter=True)
+        prs.add_tests([{'test_intf': self.intf_tests, 'test_other': other_tests}])
+        prs.run_rpc(
+            {'test_intf': self.intf_tests}, 'test_intf', ['xml', 'text'],
+            dev, 'snap_filter', '10.216.193.114', self.db)
+        dev.rpc.get_interface_information.assert_called_once_with({'format': 'xml'})
+
+    def test_run_rpc_marked(self):
+        dev = MagicMock()
+        dev.rpc.get_interface_information.return_value = etree.fromstring(
+            '<interface-information><physical-interface><name>ge-0/0/0</name>'
+            '</physical-interface></interface-information>')
+        prs = Parser(persist=False, auto_filter=True)
+        prs.run_rpc(
+            {'test_intf': self.intf_tests}, 'test_intf', ['xml', 'text'],
+            dev, 'snap_filter', '10.216.193.114', self.db)
+        reply = prs.reply['get-interface-information']
+        self.assertEqual(snap_index.get_projection_keys(reply),
+                         [snap_index.get_test_key(self.intf_tests)])
+        # tests not in filter of snapshot are not run on it
+        comp = Comparator(replies={'snap_filter': reply})
+        comp.index_key = snap_index.get_test_key(self.intf_tests)
+        self.assertTrue(comp.check_projection(self.db, 'snap_filter'))
+        comp.index_key = snap_index.get_test_key(
+            [{'rpc': 'get-interface-information'},
+             {'item': {'xpath': 'physical-interface',
+                       'tests': [{'exists': 'name'}]}}])
+        self.assertFalse(comp.check_projection(self.db, 'snap_filter'))
+
+    def test_run_rpc_disabled(self):
+        dev = MagicMock()
+        Parser(persist=False).run_rpc(
+            {'test_intf': self.intf_tests}, 'test_intf', ['xml', 'text'],
+            dev, 'snap_filter', '10.216.193.114', self.db)
+        dev.rpc.get_interface_information.assert_called_once_with({'format': 'xml'})
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestSnapFilter)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,189 @@
+import unittest
+import os
+import shutil
+import tempfile
+from lxml import etree
+from jnpr.jsnapy.snap import Parser
+from jnpr.jsnapy.check import Comparator
+from jnpr.jsnapy.operator import Operator
+from jnpr.jsnapy import snap_index
+from mock import patch
+from nose.plugins.attrib import attr
+
+
+@attr('unit')
+class TestSnapIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.snap_file = os.path.join(self.tmp_dir, 'snap_pre_show_interfaces.xml')
+        self.db = {'check_from_sqlite': False}
+        interfaces = []
+        for i, status in enumerate(['up', 'up', 'down']):
+            interfaces.append(
+                "<physical-interface><name>ge-0/0/%d</name>"
+                "<admin-status>%s</admin-status><oper-status>%s</oper-status>"
+                "%s<logical-interface><name>ge-0/0/%d.0</name>"
+                "</logical-interface></physical-interface>" %
+                (i, status, status, "<traffic-statistics><input-bytes>1</input-bytes>"
+                 "</traffic-statistics>" * 20, i))
+        self.reply = etree.fromstring(
+            "<interface-information>%s</interface-information>" % "".join(interfaces))
+        self.tests = [{'command': 'show interfaces'},
+                      {'iterate': {'xpath': 'physical-interface', 'id': 'name',
+                                   'tests': [{'is-equal': 'admin-status, up',
+                                              'err': "{{post['admin-status']}}"}]}}]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def check(self, tests):
+        op = Operator()
+        comp = Comparator()
+        comp.compare_reply(op, tests, 'test_interfaces', 'show interfaces',
+                           False, self.db, self.snap_file)
+        return comp, op
+
+    def test_write_index(self):
+        prs = Parser(index=True)
+        prs._write_file(self.reply, 'xml', self.snap_file, self.tests)
+        index_file = snap_index.get_index_file(self.snap_file)
+        self.assertTrue(os.path.isfile(index_file))
+        self.assertLess(os.path.getsize(index_file), os.path.getsize(self.snap_file))
+        index = etree.parse(index_file).getroot()
+        self.assertEqual(len(index.xpath('//traffic-statistics')), 0)
+        self.assertEqual(len(index.xpath('//physical-interface')), 3)
+
+    def test_write_index_disabled(self):
+        prs = Parser()
+        prs._write_file(self.reply, 'xml', self.snap_file, self.tests)
+        self.assertFalse(os.path.isfile(snap_index.get_index_file(self.snap_file)))
+
+    def test_check_with_index(self):
+        Parser()._write_file(self.reply, 'xml', self.snap_file)
+        comp, op = self.check(self.tests)
+        Parser(index=True)._write_file(self.reply, 'xml', self.snap_file, self.tests)
+        comp_index, op_index = self.check(self.tests)
+        self.assertEqual((op.no_passed, op.no_failed), (0, 1))
+        self.assertEqual((op_index.no_passed, op_index.no_failed), (0, 1))
+        self.assertEqual(op.test_details, op_index.test_details)
+        # index is read for tests it was written for
+        comp = Comparator()
+        comp.index_key = snap_index.get_test_key(self.tests)
+        self.assertEqual(len(comp.get_xml_reply(self.db, self.snap_file)
+                             .xpath('//traffic-statistics')), 0)
+
+    def test_check_changed_tests(self):
+        Parser(index=True)._write_file(self.reply, 'xml', self.snap_file, self.tests)
+        tests = [{'command': 'show interfaces'},
+                 {'iterate': {'xpath': 'physical-interface', 'id': 'name',
+                              'tests': [{'is-equal': 'traffic-statistics/input-bytes, 1',
+                                         'err': "{{post['admin-status']}}"}]}}]
+        comp = Comparator()
+        comp.index_key = snap_index.get_test_key(tests)
+        self.assertIsNone(comp.read_index(self.snap_file))
+        comp, op = self.check(tests)
+        self.assertEqual((op.no_passed, op.no_failed), (1, 0))
+
+    def test_index_changed_snapshot(self):
+        Parser(index=True)._write_file(self.reply, 'xml', self.snap_file, self.tests)
+        with open(self.snap_file, 'a') as f:
+            f.write('\n')
+        comp = Comparator()
+        comp.index_key = snap_index.get_test_key(self.tests)
+        self.assertIsNone(comp.read_index(self.snap_file))
+
+    def test_index_trusted_stat(self):
+        Parser(index=True)._write_file(self.reply, 'xml', self.snap_file, self.tests)
+        comp = Comparator()
+        comp.index_key = snap_index.get_test_key(self.tests)
+        # snap file is not hashed while its size and mtime are those in index
+        with patch('jnpr.jsnapy.check.Comparator.get_fingerprint') as mock_fingerprint:
+            self.assertIsNotNone(comp.read_index(self.snap_file))
+            self.assertFalse(mock_fingerprint.called)
+        stat = os.stat(self.snap_file)
+        os.utime(self.snap_file, (stat.st_atime, stat.st_mtime + 10))
+        with patch('jnpr.jsnapy.check.Comparator.get_fingerprint') as mock_fingerprint:
+            mock_fingerprint.return_value = 'other'
+            self.assertIsNone(comp.read_index(self.snap_file))
+            self.assertTrue(mock_fingerprint.called)
+        # touched snap file with same content still uses index
+        self.assertIsNotNone(comp.read_index(self.snap_file))
+
+    def test_build_index_unverified(self):
+        # parent of node is kept without its other children, so test counting
+        # them can not use index
+        tests = [{'iterate': {'xpath': 'physical-interface/logical-interface',
+                              'id': 'name',
+                              'tests': [{'is-equal': 'count(../*), 23'}]}}]
+        self.assertIsNone(snap_index.build_index(etree.ElementTree(self.reply), tests))
+        self.assertIsNotNone(snap_index.build_index(
+            etree.ElementTree(self.reply), self.tests))
+
+    def test_project(self):
+        Parser()._write_file(self.reply, 'xml', self.snap_file)
+        comp, op = self.check(self.tests)
+        prs = Parser(project=True)
+        projection = prs._project(self.reply, 'xml', self.tests)
+        self.assertEqual(len(projection.xpath('//traffic-statistics')), 0)
+        self.assertEqual(snap_index.get_projection_keys(projection),
+                         [snap_index.get_test_key(self.tests)])
+        prs._write_file(projection, 'xml', self.snap_file)
+        comp_project, op_project = self.check(self.tests)
+        self.assertEqual(op.test_details, op_project.test_details)
+        # text replies and replies whose index is written are not projected
+        self.assertIs(prs._project(self.reply, 'text', self.tests), self.reply)
+        self.assertIs(Parser(index=True, project=True)._project(
+            self.reply, 'xml', self.tests), self.reply)
+
+    def test_project_other_tests(self):
+        Parser(project=True)._write_file(
+            Parser(project=True)._project(self.reply, 'xml', self.tests), 'xml', self.snap_file)
+        tests = [{'command': 'show interfaces'},
+                 {'iterate': {'xpath': 'physical-interface', 'id': 'name',
+                              'tests': [{'is-equal': 'traffic-statistics/input-bytes, 1'}]}}]
+        with patch('logging.Logger.error') as mock_error:
+            self.check(tests)
+            self.check(self.tests)
+        errors = [c[0][0] for c in mock_error.call_args_list
+                  if "holds only nodes read by other tests" in c[0][0]]
+        self.assertEqual(len(errors), 1)
+
+    def test_project_shared(self):
+        # tests on same command share its snap file, projection holds nodes
+        # read by all of them
+        tests = [{'command': 'show interfaces'},
+                 {'iterate': {'xpath': 'physical-interface', 'id': 'name',
+                              'tests': [{'is-equal': 'traffic-statistics/input-bytes, 1'}]}}]
+        prs = Parser(project=True)
+        prs.add_tests([{'test_admin': self.tests}, {'test_bytes': tests}])
+        projection = prs._project(self.reply, 'xml', self.tests)
+        self.assertEqual(len(projection.xpath('//traffic-statistics')), 60)
+        self.assertEqual(len(projection.xpath('//logical-interface')), 0)
+        self.assertEqual(etree.tostring(prs._project(self.reply, 'xml', tests)),
+                         etree.tostring(projection))
+        prs._write_file(projection, 'xml', self.snap_file)
+        for test in [self.tests, tests]:
+            comp, op = self.check(test)
+            self.assertEqual(op.result_dict, {'test_interfaces': test is tests})
+
+    def test_project_mismatch(self):
+        tests = [{'command': 'show interfaces'},
+                 {'iterate': {'xpath': 'physical-interface', 'id': 'name',
+                              'tests': [{'not-exists': 'traffic-statistics'}]}}]
+        Parser()._write_file(self.reply, 'xml', self.snap_file)
+        comp, op = self.check(tests)
+        self.assertEqual((op.no_passed, op.no_failed), (0, 1))
+        # nodes read by tests are missing in snapshot projected for other tests,
+        # so tests are not run on it
+        Parser(project=True)._write_file(
+            Parser(project=True)._project(self.reply, 'xml', self.tests), 'xml', self.snap_file)
+        with patch('jnpr.jsnapy.operator.Operator.not_exists') as mock_op:
+            comp, op = self.check(tests)
+            self.assertFalse(mock_op.called)
+        self.assertEqual((op.no_passed, op.no_failed), (0, 1))
+        self.assertEqual(op.result_dict, {'test_interfaces': False})
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestSnapIndex)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,95 @@
+import unittest
+import os
+import json
+import yaml
+import shutil
+import tempfile
+from jnpr.jsnapy.snap import Parser
+from jnpr.jsnapy.check import Comparator
+from jnpr.jsnapy.snap_layout import MANIFEST
+from mock import patch
+from nose.plugins.attrib import attr
+
+
+@attr('unit')
+class TestSnapLayout(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.hostname = "10.216.193.114"
+        self.db = dict()
+        self.db['store_in_sqlite'] = False
+        self.db['check_from_sqlite'] = False
+        self.db['db_name'] = "jbb.db"
+        self.db['first_snap_id'] = None
+        self.db['second_snap_id'] = None
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    @patch('jnpr.jsnapy.check.get_path')
+    @patch('jnpr.jsnapy.snap.get_path')
+    def test_sharded_snap_file(self, mock_path, mock_check_path):
+        mock_path.return_value = self.tmp_dir
+        mock_check_path.return_value = self.tmp_dir
+        prs = Parser(shard=True)
+        snap_file = prs.generate_snap_file('pre', self.hostname, 'show_chassis_fpc', 'xml')
+        shard_dir = os.path.join(self.tmp_dir, self.hostname, 'pre')
+        self.assertEqual(snap_file, os.path.join(shard_dir, 'show_chassis_fpc.xml'))
+        prs._save('<fpc/>', snap_file)
+        with open(os.path.join(shard_dir, MANIFEST)) as f:
+            manifest = json.load(f)
+        entry = manifest['files']['show_chassis_fpc.xml']
+        self.assertEqual(entry['path'], os.path.join(self.hostname, 'pre', 'show_chassis_fpc.xml'))
+        self.assertEqual(entry['size'], 6)
+        comp = Comparator()
+        self.assertEqual(
+            comp.generate_snap_file(self.hostname, 'pre', 'show_chassis_fpc', 'xml'),
+            snap_file)
+        self.assertEqual(comp.get_fingerprint(snap_file), entry['sha1'])
+        # hash is taken from manifest, not from snap file
+        entry['sha1'] = 'abc'
+        with open(os.path.join(shard_dir, MANIFEST), 'w') as f:
+            json.dump(manifest, f)
+        comp = Comparator()
+        comp.generate_snap_file(self.hostname, 'pre', 'show_chassis_fpc', 'xml')
+        self.assertEqual(comp.get_fingerprint(snap_file), 'abc')
+        # files missing in manifest are read from flat layout
+        self.assertEqual(
+            comp.generate_snap_file(self.hostname, 'pre', 'show_version', 'xml'),
+            os.path.join(self.tmp_dir, self.hostname + '_pre_show_version.xml'))
+        self.assertEqual(
+            comp.generate_snap_file(self.hostname, 'post', 'show_chassis_fpc', 'xml'),
+            os.path.join(self.tmp_dir, self.hostname + '_post_show_chassis_fpc.xml'))
+
+    @patch('jnpr.jsnapy.snap.get_path')
+    def test_sharded_dedup(self, mock_path):
+        mock_path.return_value = self.tmp_dir
+        prs = Parser(dedup=True, shard=True)
+        for hostname in ['10.216.193.114', '10.216.193.115']:
+            prs._save('<fpc/>', prs.generate_snap_file('pre', hostname, 'show_chassis_fpc', 'xml'))
+        # blobs are shared by devices
+        self.assertEqual(len(os.listdir(os.path.join(self.tmp_dir, '.blobs'))), 1)
+
+    @patch('jnpr.jsnapy.check.get_path')
+    @patch('jnpr.jsnapy.snap.get_path')
+    def test_check_sharded(self, mock_path, mock_check_path):
+        configs = os.path.join(os.path.dirname(__file__), 'configs')
+        mock_path.return_value = self.tmp_dir
+        mock_check_path.return_value = self.tmp_dir
+        shutil.copy(os.path.join(configs, 'no-diff.yml'), self.tmp_dir)
+        prs = Parser(shard=True)
+        for snap in ['snap_no-diff_pre', 'snap_no-diff_post']:
+            name = '%s_%s_show_interfaces_terse_ge__.xml' % (self.hostname, snap)
+            with open(os.path.join(configs, name)) as f:
+                prs._save(f.read(), prs.generate_snap_file(
+                    snap, self.hostname, 'show_interfaces_terse_ge-*', 'xml'))
+        main_file = yaml.load(open(os.path.join(configs, 'main_no-diff.yml'), 'r'))
+        oper = Comparator().generate_test_files(
+            main_file, self.hostname, True, False, self.db, False,
+            "snap_no-diff_pre", None, "snap_no-diff_post")
+        self.assertEqual((oper.no_passed, oper.no_failed), (2, 4))
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestSnapLayout)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -1,7 +1,8 @@
 import unittest
 import os
+import sqlite3
 from jnpr.jsnapy.sqlite_store import JsnapSqlite
-from jnpr.jsnapy.sqlite_get import SqliteExtractXml
+from jnpr.jsnapy.sqlite_get import SqliteExtractXml, extract_values
 from mock import patch
 from nose.plugins.attrib import attr
 
@@ -114,6 +115,192 @@ class TestSqlite(unittest.TestCase):
             c_list = mock_log.call_args_list[0]
             self.assertNotEqual(c_list[0][0].find(err), -1)
 
+    @patch('sys.exit')
+    @patch('jnpr.jsnapy.sqlite_store.get_path')
+    @patch('jnpr.jsnapy.sqlite_get.get_path')
+    def test_sqlite_delta(self, mock_spath, mock_path, mock_sys):
+        mock_path.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        mock_spath.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        js = JsnapSqlite("10.216.193.114", self.db)
+        lines = ["<name>ge-0/0/%d</name>\n" % i for i in range(100)]
+        snaps = []
+        for i in range(55):
+            lines[i % 100] = "<name>xe-0/0/%d</name>\n" % i
+            snaps.append(''.join(lines))
+            self.db_dict2['snap_name'] = "mock_snap%d" % i
+            self.db_dict2['format'] = "xml"
+            self.db_dict2['data'] = snaps[-1]
+            self.db_dict2['keyframe_interval'] = 4
+            js.insert_data(self.db_dict2)
+        with sqlite3.connect(js.db_filename) as con:
+            rows = con.execute("SELECT id, delta, length(data) FROM table_10__216__193__114 ORDER BY id").fetchall()
+        self.assertEqual(len(rows), 50)
+        self.assertEqual([row[1] for row in rows[:8]], [1, 1, 0, 1, 1, 1, 0, 1])
+        self.assertEqual(rows[-1][1], 0)
+        self.assertLess(rows[0][2], len(snaps[-1]) / 4)
+        with patch('logging.Logger.error') as mock_log:
+            extr = SqliteExtractXml(self.db)
+            for snap_id in range(50):
+                data, formt = extr.get_xml_using_snap_id(
+                    "10.216.193.114", self.db_dict2['cli_command'], snap_id)
+                self.assertEqual(data, snaps[54 - snap_id])
+                self.assertEqual(formt, "xml")
+            data, formt = extr.get_xml_using_snapname(
+                "10.216.193.114", self.db_dict2['cli_command'], "mock_snap53")
+            self.assertEqual(data, snaps[53])
+            self.assertFalse(mock_log.called)
+
+    @patch('sys.exit')
+    @patch('jnpr.jsnapy.sqlite_store.get_path')
+    @patch('jnpr.jsnapy.sqlite_get.get_path')
+    def test_sqlite_old_schema(self, mock_spath, mock_path, mock_sys):
+        mock_path.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        mock_spath.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        db_filename = os.path.join(os.path.dirname(__file__), 'configs', self.db)
+        with sqlite3.connect(db_filename) as con:
+            con.execute("""create table 'table_10__216__193__114' (id integer not null, filename text,
+                        cli_command text, snap_name text, data_format text, data text)""")
+            con.execute("""insert into 'table_10__216__193__114' values (0, 'file_mock', 'show version',
+                        'old_snap', 'text', 'old_data')""")
+        extr = SqliteExtractXml(self.db)
+        data, formt = extr.get_xml_using_snap_id(
+            "10.216.193.114", self.db_dict2['cli_command'], 0)
+        self.assertEqual(data, "old_data")
+        js = JsnapSqlite("10.216.193.114", self.db)
+        self.db_dict2['keyframe_interval'] = 10
+        js.insert_data(self.db_dict2)
+        data, formt = extr.get_xml_using_snapname(
+            "10.216.193.114", self.db_dict2['cli_command'], "old_snap")
+        self.assertEqual(data, "old_data")
+        data, formt = extr.get_xml_using_snap_id(
+            "10.216.193.114", self.db_dict2['cli_command'], 0)
+        self.assertEqual(data, "mock_data")
+
+    @patch('sys.exit')
+    @patch('jnpr.jsnapy.sqlite_store.get_path')
+    @patch('jnpr.jsnapy.sqlite_get.get_path')
+    def test_sqlite_dedup(self, mock_spath, mock_path, mock_sys):
+        mock_path.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        mock_spath.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        js = JsnapSqlite("10.216.193.114", self.db)
+        self.db_dict2['dedup'] = True
+        for i in range(52):
+            self.db_dict2['snap_name'] = "mock_snap%d" % i
+            js.insert_data(self.db_dict2)
+        self.db_dict2['data'] = "mock_data_2"
+        js.insert_data(self.db_dict2)
+        with sqlite3.connect(js.db_filename) as con:
+            rows = con.execute("SELECT id, data, digest FROM table_10__216__193__114 ORDER BY id").fetchall()
+        self.assertEqual(len(rows), 50)
+        self.assertEqual(len([row for row in rows if row[1] is not None]), 2)
+        self.assertEqual(len(set(row[2] for row in rows)), 2)
+        with patch('logging.Logger.error') as mock_log:
+            extr = SqliteExtractXml(self.db)
+            data, formt = extr.get_xml_using_snap_id(
+                "10.216.193.114", self.db_dict2['cli_command'], 0)
+            self.assertEqual(data, "mock_data_2")
+            for snap_id in range(1, 50):
+                data, formt = extr.get_xml_using_snap_id(
+                    "10.216.193.114", self.db_dict2['cli_command'], snap_id)
+                self.assertEqual(data, "mock_data")
+            data, formt = extr.get_xml_using_snapname(
+                "10.216.193.114", self.db_dict2['cli_command'], "mock_snap40")
+            self.assertEqual(data, "mock_data")
+            self.assertFalse(mock_log.called)
+
+    @patch('sys.exit')
+    @patch('jnpr.jsnapy.sqlite_store.get_path')
+    @patch('jnpr.jsnapy.sqlite_get.get_path')
+    def test_sqlite_bulk(self, mock_spath, mock_path, mock_sys):
+        mock_path.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        mock_spath.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        js = JsnapSqlite("10.216.193.114", self.db)
+        for snap in ["pre", "post"]:
+            for command in ["show_version", "get-interface-information"]:
+                self.db_dict2['cli_command'] = command
+                self.db_dict2['snap_name'] = snap
+                self.db_dict2['data'] = "%s_%s" % (command, snap)
+                js.insert_data(self.db_dict2)
+        with patch('logging.Logger.error') as mock_log:
+            extr = SqliteExtractXml(self.db)
+            replies = extr.get_xml_bulk(
+                "10.216.193.114", ["show_version", "get-interface-information"], ["pre", "post"])
+            self.assertEqual(len(replies), 4)
+            self.assertEqual(replies[("show_version", "pre")], ("show_version_pre", "text"))
+            self.assertEqual(replies[("get-interface-information", "post")],
+                             ("get-interface-information_post", "text"))
+            replies = extr.get_xml_bulk(
+                "10.216.193.114", ["show_version"], [1, 0], True)
+            self.assertEqual(replies[("show_version", 1)], ("show_version_pre", "text"))
+            self.assertEqual(replies[("show_version", 0)], ("show_version_post", "text"))
+            self.assertFalse(mock_log.called)
+            replies = extr.get_xml_bulk(
+                "10.216.193.114", ["show_version", "show_chassis"], ["pre"])
+            self.assertEqual(replies[("show_chassis", "pre")], ("None", None))
+            err = "ERROR!! Complete message is: No previous snapshots exists with name = pre for command = show chassis"
+            self.assertNotEqual(mock_log.call_args[0][0].find(err), -1)
+            replies = extr.get_xml_bulk(
+                "10.216.193.11", ["show_version"], ["pre"])
+            self.assertEqual(replies[("show_version", "pre")], ("None", None))
+            err = "ERROR!! Complete message is: no such table: table_10__216__193__11"
+            self.assertNotEqual(mock_log.call_args[0][0].find(err), -1)
+
+    @patch('sys.exit')
+    @patch('jnpr.jsnapy.sqlite_store.get_path')
+    @patch('jnpr.jsnapy.sqlite_get.get_path')
+    def test_sqlite_history(self, mock_spath, mock_path, mock_sys):
+        mock_path.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        mock_spath.return_value = os.path.join(os.path.dirname(__file__), 'configs')
+        js = JsnapSqlite("10.216.193.114", self.db)
+        self.db_dict2['cli_command'] = "show_bgp_summary"
+        self.db_dict2['format'] = "xml"
+        self.db_dict2['keyframe_interval'] = 5
+        self.db_dict2['dedup'] = True
+        for i in range(12):
+            self.db_dict2['snap_name'] = "snap%d" % i
+            self.db_dict2['data'] = ("<bgp-information>\n<bgp-rib>\n<name>inet.0</name>\n"
+                                     "<active-prefix-count>%d</active-prefix-count>\n</bgp-rib>\n"
+                                     "<bgp-rib>\n<name>inet6.0</name>\n"
+                                     "<active-prefix-count>7</active-prefix-count>\n</bgp-rib>\n"
+                                     "</bgp-information>" % (i // 2))
+            js.insert_data(self.db_dict2)
+        with patch('logging.Logger.error') as mock_log:
+            extr = SqliteExtractXml(self.db)
+            history = extr.get_history(
+                "10.216.193.114", "show_bgp_summary", "bgp-rib", ["name"], "active-prefix-count")
+            self.assertFalse(mock_log.called)
+        self.assertEqual([snap_name for snap_id, snap_name, values in history],
+                         ["snap%d" % i for i in range(12)])
+        self.assertEqual([values[("inet.0",)] for snap_id, snap_name, values in history],
+                         [str(i // 2) for i in range(12)])
+        self.assertEqual(history[-1], (0, "snap11", {("inet.0",): "5", ("inet6.0",): "7"}))
+        # values of stored snapshots are cached, only latest ones are read
+        with patch('jnpr.jsnapy.sqlite_get.extract_values') as mock_extract:
+            history = extr.get_history(
+                "10.216.193.114", "show_bgp_summary", "bgp-rib", ["name"], "active-prefix-count", 3)
+            self.assertFalse(mock_extract.called)
+        self.assertEqual([snap_name for snap_id, snap_name, values in history],
+                         ["snap9", "snap10", "snap11"])
+        # values returned are copies of cached ones
+        history[-1][2][("inet.0",)] = "0"
+        history = extr.get_history(
+            "10.216.193.114", "show_bgp_summary", "bgp-rib", ["name"], "active-prefix-count", 3)
+        self.assertEqual(history[-1][2][("inet.0",)], "5")
+        # ids given as string, and ids and fields which are not nodes
+        history = extr.get_history(
+            "10.216.193.114", "show_bgp_summary", "bgp-rib", "name, string(name)",
+            "string(active-prefix-count)", 1)
+        self.assertEqual(history, [(0, "snap11", {("inet.0", "inet.0"): "5",
+                                                  ("inet6.0", "inet6.0"): "7"})])
+        self.assertEqual(extract_values(
+            '<bgp-information><bgp-rib name="inet.0"><active-prefix-count>5'
+            '</active-prefix-count></bgp-rib></bgp-information>',
+            'bgp-rib', ['@name'], 'active-prefix-count'), {("inet.0",): "5"})
+        with patch('logging.Logger.error') as mock_log:
+            self.assertEqual(extr.get_history(
+                "10.216.193.114", "show_version", "bgp-rib", ["name"], "active-prefix-count"), [])
+            err = "ERROR!! Complete message is: No previous snapshots exists for command = show version"
+            self.assertNotEqual(mock_log.call_args[0][0].find(err), -1)
 
 if __name__ == "__main__":
     suite = unittest.TestLoader().loadTestsFromTestCase(TestSqlite)